@@ -0,0 +1,55 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+
+def build_hierarchy(apps, schema_editor):
+    # AccountHierarchy.rebuild on the historical models
+    BranchAccount = apps.get_model('accounts', 'BranchAccount')
+    RootAccount = apps.get_model('accounts', 'RootAccount')
+    AccountHierarchy = apps.get_model('accounts', 'AccountHierarchy')
+    branches, roots = defaultdict(list), defaultdict(list)
+    for account_id, branch_id in BranchAccount.accounts.through.objects.values_list('account', 'branchaccount'):
+        branches[account_id].append(branch_id)
+    for branch_id, root_id in RootAccount.branch_accounts.through.objects.values_list('branchaccount', 'rootaccount'):
+        roots[branch_id].append(root_id)
+    AccountHierarchy.objects.bulk_create(
+        AccountHierarchy(account_id=account_id, branch_account_id=branch_id, root_account_id=root_id,
+                         weight=round(Decimal(1) / len(branch_ids) / len(roots[branch_id] or [None]), 8))
+        for account_id, branch_ids in branches.items()
+        for branch_id in branch_ids
+        for root_id in roots[branch_id] or [None]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountHierarchy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.DecimalField(decimal_places=8, max_digits=9)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hierarchy', to='accounts.account')),
+                ('branch_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_hierarchy', to='accounts.branchaccount')),
+                ('root_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='account_hierarchy', to='accounts.rootaccount')),
+            ],
+            options={
+                'verbose_name': 'Account Hierarchy',
+                'verbose_name_plural': 'Account Hierarchy',
+                'indexes': [models.Index(fields=['branch_account', 'account'], name='accounts_ac_branch__2b03b9_idx'), models.Index(fields=['root_account', 'account'], name='accounts_ac_root_ac_54a93a_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='accounthierarchy',
+            constraint=models.UniqueConstraint(fields=('account', 'branch_account', 'root_account'), name='unique_account_path'),
+        ),
+        migrations.RunPython(build_hierarchy, migrations.RunPython.noop),
+    ]
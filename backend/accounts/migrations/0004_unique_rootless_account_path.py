@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:27
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_paths(apps, schema_editor):
+    # Keep the first of the duplicated paths of branches without a root
+    AccountHierarchy = apps.get_model('accounts', 'AccountHierarchy')
+    first_ids = (AccountHierarchy.objects.filter(root_account__isnull=True)
+                 .values('account', 'branch_account').annotate(first_id=Min('id')).values('first_id'))
+    AccountHierarchy.objects.filter(root_account__isnull=True).exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_account_hierarchy'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_paths, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='accounthierarchy',
+            constraint=models.UniqueConstraint(condition=models.Q(('root_account__isnull', True)), fields=('account', 'branch_account'), name='unique_rootless_account_path'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+from django.db import models, transaction
 from reps.models import SalesRep  # Import SalesRep model
 
 
@@ -94,3 +96,64 @@ class RootAccount(models.Model):
         verbose_name = "Root Account"
         verbose_name_plural = "Root Accounts"
         ordering = ['name']
+
+
+# AccountHierarchy model (closure of the memberships: every branch and root an account rolls up to)
+class AccountHierarchy(models.Model):
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='hierarchy')
+    branch_account = models.ForeignKey(BranchAccount, on_delete=models.CASCADE, related_name='account_hierarchy')
+    root_account = models.ForeignKey(RootAccount, on_delete=models.CASCADE, null=True, blank=True, related_name='account_hierarchy')  # None when the branch has no root
+
+    # Share of the account's sales attributed to this branch and root: split evenly between the
+    # account's branches, then between the branch's roots, so an account's weights add up to 1
+    weight = models.DecimalField(max_digits=9, decimal_places=8)
+
+    def __str__(self):
+        return f"{self.account} -> {self.branch_account} -> {self.root_account or '-'} ({self.weight})"
+
+    @classmethod
+    def rebuild(cls, account_ids=None):
+        """
+        Recompute the rows of the given accounts (every account when None) from the
+        BranchAccount.accounts and RootAccount.branch_accounts memberships.
+        """
+        memberships = BranchAccount.accounts.through.objects.all()
+        if account_ids is not None:
+            account_ids = set(account_ids)
+            memberships = memberships.filter(account__in=account_ids)
+        branches = defaultdict(list)  # Account id -> branch ids
+        for account_id, branch_id in memberships.values_list('account', 'branchaccount'):
+            branches[account_id].append(branch_id)
+
+        roots = defaultdict(list)  # Branch id -> root ids
+        links = RootAccount.branch_accounts.through.objects.filter(
+            branchaccount__in={branch for ids in branches.values() for branch in ids})
+        for branch_id, root_id in links.values_list('branchaccount', 'rootaccount'):
+            roots[branch_id].append(root_id)
+
+        rows = []
+        for account_id, branch_ids in branches.items():
+            for branch_id in branch_ids:
+                root_ids = roots[branch_id] or [None]
+                weight = Decimal(1) / len(branch_ids) / len(root_ids)
+                rows.extend(cls(account_id=account_id, branch_account_id=branch_id, root_account_id=root_id,
+                                weight=round(weight, 8)) for root_id in root_ids)
+
+        with transaction.atomic():
+            stale = cls.objects.all() if account_ids is None else cls.objects.filter(account__in=account_ids)
+            stale.delete()
+            cls.objects.bulk_create(rows)
+
+    class Meta:
+        verbose_name = "Account Hierarchy"
+        verbose_name_plural = "Account Hierarchy"
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'branch_account', 'root_account'], name='unique_account_path'),
+            # NULLs are distinct in the one above, so the paths of branches without a root need their own
+            models.UniqueConstraint(fields=['account', 'branch_account'], condition=models.Q(root_account__isnull=True),
+                                    name='unique_rootless_account_path'),
+        ]
+        indexes = [
+            models.Index(fields=['branch_account', 'account']),
+            models.Index(fields=['root_account', 'account']),
+        ]
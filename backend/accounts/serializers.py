@@ -3,9 +3,9 @@ from .models import Account, RootAccount, BranchAccount
 from reps.serializers import SalesRepSerializer
 from reps.serializers import BranchSalesRepSerializer
 from sales.serializers import ProductSerializer
-from sales.models import Invoice, Sale
-from django.db.models import Sum, F, DecimalField, Value, ExpressionWrapper
-from django.db.models.functions import Coalesce, TruncYear
+from sales.models import Invoice, Sale, MonthlySales
+from django.db.models import Sum
+from django.db.models.functions import TruncYear
 from django.db.models import Min, Max, Count
 from datetime import datetime
 from django.utils.timezone import now 
@@ -21,11 +21,8 @@ class SaleSerializer(serializers.ModelSerializer):
         fields = ['id', 'sale_date', 'product', 'quantity_sold', 'quantity_invoiced', 'sell_price', 'line_price']
 
     def get_line_price(self, obj):
-        quantity = (
-            obj.quantity_invoiced if obj.quantity_invoiced and obj.quantity_invoiced > 0
-            else obj.quantity_sold if obj.quantity_sold and obj.quantity_sold > 0 else 1
-        )
-        return float(quantity) * float(obj.sell_price) if obj.sell_price else 0
+        # The line total stored with the sale
+        return float(obj.line_total) if obj.line_total else 0
 
 
 # Serializer for Invoice model (to calculate invoice_sum)
@@ -38,13 +35,8 @@ class InvoiceSerializer(serializers.ModelSerializer):
         fields = ['invoice_sum', 'id', 'invoice_date', 'invoice_number', 'customer_po', 'sales_rep', 'account', 'sales']
 
     def get_invoice_sum(self, obj):
-        sales = Sale.objects.filter(invoice=obj).annotate(
-            line_price=ExpressionWrapper(
-                F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-                output_field=DecimalField()
-            )
-        )
-        return sales.aggregate(total=Sum('line_price', output_field=DecimalField()))['total'] or 0
+        # The total stored with the invoice
+        return obj.total_amount
 
 
 # Serializer for Account model
@@ -64,12 +56,8 @@ class AccountSerializer(serializers.ModelSerializer):
         return Invoice.objects.filter(account=obj).count()
 
     def get_gross_sum(self, obj):
-        gross_sum = Sale.objects.filter(invoice__account=obj).annotate(
-            line_price=ExpressionWrapper(
-                F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-                output_field=DecimalField()
-            )
-        ).aggregate(total=Sum('line_price', output_field=DecimalField()))['total'] or 0
+        # Read from the monthly sales facts rather than the account's sales
+        gross_sum = MonthlySales.objects.filter(account=obj).aggregate(total=Sum('revenue'))['total'] or 0
         return gross_sum
 
 
@@ -104,12 +92,8 @@ class AccountSalesInvoiceSerializer(serializers.ModelSerializer):
         return Invoice.objects.filter(account=obj).count()
 
     def get_gross_sum(self, obj):
-        gross_sum = Sale.objects.filter(invoice__account=obj).annotate(
-            line_price=ExpressionWrapper(
-                F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-                output_field=DecimalField()
-            )
-        ).aggregate(total=Sum('line_price', output_field=DecimalField()))['total'] or 0
+        # Read from the monthly sales facts rather than the account's sales
+        gross_sum = MonthlySales.objects.filter(account=obj).aggregate(total=Sum('revenue'))['total'] or 0
         return gross_sum
 
     def get_average_time_between_sales(self, obj):
@@ -144,10 +128,7 @@ class AccountSalesInvoiceSerializer(serializers.ModelSerializer):
     def get_product_sales(self, obj):
         product_sales = Sale.objects.filter(invoice__account=obj).values('product__product_code', 'product__product_description') \
             .annotate(
-                total_sales=ExpressionWrapper(
-                    Sum(F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1))),
-                    output_field=DecimalField()
-                ),
+                total_sales=Sum('line_total'),
                 first_sale=Min('sale_date'),
                 last_sale=Max('sale_date'),
                 sale_count=Count('id')
@@ -192,13 +173,10 @@ class BranchAccountSalesInvoiceSerializer(serializers.ModelSerializer):
     def get_gross_sales_by_year(self, obj):
         # Aggregating gross sales by year across all related accounts
         sales_by_year = (
-            Sale.objects.filter(invoice__account__branch_accounts=obj)
-            .annotate(year=TruncYear('invoice__invoice_date'))  # Group by year
+            MonthlySales.objects.filter(branch_account=obj)
+            .annotate(year=TruncYear('month'))  # Group by year
             .values('year')  # Get each year
-            .annotate(total_sales=Sum(ExpressionWrapper(
-                F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-                output_field=DecimalField()
-            )))
+            .annotate(total_sales=Sum('revenue'))
             .order_by('year')
         )
 
@@ -206,12 +184,9 @@ class BranchAccountSalesInvoiceSerializer(serializers.ModelSerializer):
 
     def get_total_gross_sum(self, obj):
         # Sum the gross_sum of all accounts under this branch
-        total_gross_sum = Sale.objects.filter(invoice__account__branch_accounts=obj).annotate(
-            line_price=ExpressionWrapper(
-                F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-                output_field=DecimalField()
-            )
-        ).aggregate(total=Sum('line_price'))['total'] or 0
+        total_gross_sum = MonthlySales.objects.filter(branch_account=obj).aggregate(
+            total=Sum('revenue')
+        )['total'] or 0
         return float(total_gross_sum)
 
     def get_branch_invoices(self, obj):
@@ -264,12 +239,9 @@ class BranchAccountSerializer(serializers.ModelSerializer):
 
     def get_branch_gross_sum(self, obj):
         # Calculate the sum of gross_sum from all accounts related to this branch account
-        gross_sum = Sale.objects.filter(invoice__account__branch_accounts=obj).annotate(
-            line_price=ExpressionWrapper(
-                F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-                output_field=DecimalField()
-            )
-        ).aggregate(total_gross_sum=Sum('line_price'))['total_gross_sum'] or 0
+        gross_sum = MonthlySales.objects.filter(branch_account=obj).aggregate(
+            total_gross_sum=Sum('revenue')
+        )['total_gross_sum'] or 0
         return float(gross_sum)  # Ensure it's returned as a float
 
     def get_branch_total_invoices(self, obj):
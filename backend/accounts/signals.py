@@ -0,0 +1,64 @@
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import Signal, receiver
+from .models import Account, AccountHierarchy, BranchAccount, RootAccount
+
+# Sent with the ids of the accounts whose AccountHierarchy rows were rebuilt
+hierarchy_changed = Signal()
+
+
+def rebuild_hierarchy(account_ids):
+    account_ids = set(account_ids)
+    if account_ids:
+        AccountHierarchy.rebuild(account_ids)
+        hierarchy_changed.send(sender=AccountHierarchy, accounts=account_ids)
+
+
+def accounts_of_branches(branch_ids):
+    return Account.objects.filter(branch_accounts__in=branch_ids).values_list('pk', flat=True)
+
+
+@receiver(m2m_changed, sender=BranchAccount.accounts.through)
+def sync_branch_accounts(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        accounts = [instance.pk]  # account.branch_accounts changed
+    elif action == 'pre_clear':
+        instance._cleared_accounts = list(instance.accounts.values_list('pk', flat=True))
+        return
+    elif action == 'post_clear':
+        accounts = instance._cleared_accounts
+    else:
+        accounts = pk_set
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        rebuild_hierarchy(accounts)
+
+
+@receiver(m2m_changed, sender=RootAccount.branch_accounts.through)
+def sync_root_branches(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        branches = [instance.pk]  # branch.root_accounts changed
+    elif action == 'pre_clear':
+        instance._cleared_branches = list(instance.branch_accounts.values_list('pk', flat=True))
+        return
+    elif action == 'post_clear':
+        branches = instance._cleared_branches
+    else:
+        branches = pk_set
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        rebuild_hierarchy(accounts_of_branches(branches))
+
+
+@receiver(pre_delete, sender=BranchAccount)
+def remember_branch_accounts(sender, instance, **kwargs):
+    # Deleting a branch removes its memberships without m2m_changed, and its accounts' other paths get more weight
+    instance._hierarchy_accounts = list(instance.accounts.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=RootAccount)
+def remember_root_accounts(sender, instance, **kwargs):
+    instance._hierarchy_accounts = list(accounts_of_branches(instance.branch_accounts.values_list('pk', flat=True)))
+
+
+@receiver(post_delete, sender=BranchAccount)
+@receiver(post_delete, sender=RootAccount)
+def sync_deleted_hierarchy(sender, instance, **kwargs):
+    rebuild_hierarchy(instance._hierarchy_accounts)
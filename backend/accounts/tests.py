@@ -1,3 +1,92 @@
+from collections import defaultdict
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import DataVersion
+from users.models import UserProfile
+from .models import Account, AccountHierarchy, BranchAccount, RootAccount
+
+
+class AccountHierarchyTests(TestCase):
+    """The hierarchy paths each account's sales are split between."""
+
+    def setUp(self):
+        self.duke = Account.objects.create(name='Duke Hospital', customer_number='C1')
+        self.unc = Account.objects.create(name='UNC Rex', customer_number='C2')
+        self.alone = Account.objects.create(name='Wake Med', customer_number='C3')
+        self.north = BranchAccount.objects.create(name='North')
+        self.south = BranchAccount.objects.create(name='South')
+        self.atrium = RootAccount.objects.create(name='Atrium')
+        self.novant = RootAccount.objects.create(name='Novant')
+
+        # Duke is in both branches, North is in both roots and South in none
+        self.north.accounts.add(self.duke, self.unc)
+        self.south.accounts.add(self.duke)
+        self.atrium.branch_accounts.add(self.north)
+        self.novant.branch_accounts.add(self.north)
+
+    def weights(self):
+        weights = defaultdict(Decimal)
+        for account, weight in AccountHierarchy.objects.values_list('account', 'weight'):
+            weights[account] += weight
+        return weights
+
+    def paths(self, account):
+        return sorted((row.branch_account.name, row.root_account and row.root_account.name, row.weight)
+                      for row in AccountHierarchy.objects.filter(account=account))
+
+    def test_rebuild(self):
+        AccountHierarchy.objects.all().delete()
+        AccountHierarchy.rebuild()
+
+        self.assertEqual(self.paths(self.duke), [
+            ('North', 'Atrium', Decimal('0.25')), ('North', 'Novant', Decimal('0.25')), ('South', None, Decimal('0.5')),
+        ])
+        self.assertEqual(self.paths(self.unc), [('North', 'Atrium', Decimal('0.5')), ('North', 'Novant', Decimal('0.5'))])
+        # Accounts outside any branch have no rows and keep their whole sales
+        self.assertEqual(self.weights(), {self.duke.pk: 1, self.unc.pk: 1})
+
+    def test_rebuild_some_accounts(self):
+        AccountHierarchy.objects.filter(account=self.unc).update(weight=0)
+        AccountHierarchy.rebuild([self.duke.pk])
+        self.assertEqual(self.weights()[self.unc.pk], 0)
+
+        AccountHierarchy.rebuild([self.unc.pk])
+        self.assertEqual(self.weights()[self.unc.pk], 1)
+
+    def test_kept_up_to_date(self):
+        # The memberships' signals rebuild the paths of the accounts they change
+        self.south.accounts.add(self.alone)
+        self.assertEqual(self.paths(self.alone), [('South', None, Decimal('1'))])
+
+        self.novant.delete()
+        self.assertEqual(self.paths(self.unc), [('North', 'Atrium', Decimal('1'))])
+
+        self.north.accounts.clear()
+        self.assertEqual(self.paths(self.duke), [('South', None, Decimal('1'))])
+        self.assertEqual(self.weights(), {self.duke.pk: 1, self.alone.pk: 1})
+
+
+class AccountListConditionalTests(TestCase):
+    """The account listing answers requests for a copy that is still current with 304 Not Modified."""
+
+    def setUp(self):
+        Account.objects.create(name='Duke Hospital', customer_number='C1')
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(UserProfile.objects.create_user(username='analyst', password='x'))
+
+    def test_not_modified_until_the_data_changes(self):
+        response = self.client.get('/marathon/api/accounts/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get('/marathon/api/accounts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
 
-# Create your tests here.
+        DataVersion.bump()
+        response = self.client.get('/marathon/api/accounts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
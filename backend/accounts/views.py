@@ -2,9 +2,10 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import Account, RootAccount, BranchAccount
-from sales.models import Sale
-from django.db.models import Sum, F, DecimalField, ExpressionWrapper, Value
-from django.db.models.functions import TruncYear, Coalesce
+from sales.models import MonthlySales
+from sales.response_cache import conditional_response
+from django.db.models import Sum
+from django.db.models.functions import TruncYear
 from .serializers import (
     AccountSerializer,
     RootAccountSerializer,
@@ -19,6 +20,10 @@ class AccountListCreateView(generics.ListCreateAPIView):
     queryset = Account.objects.all()
     serializer_class = AccountSerializer
 
+    @conditional_response
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
 class AccountDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Account.objects.all()
     serializer_class = AccountSerializer
@@ -96,23 +101,17 @@ class BranchAccountSalesInvoiceView(APIView):
         except BranchAccount.DoesNotExist:
             return Response({"error": "Branch account not found"}, status=404)
 
-        # Fetch all sales for this branch account's associated accounts
-        sales = Sale.objects.filter(invoice__account__branch_accounts=branch_account)
-
-        # Calculate the total sales value: sell_price * quantity_invoiced (or quantity_sold if invoiced is null)
-        total_sales_value = ExpressionWrapper(
-            F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-            output_field=DecimalField()
-        )
+        # The branch account's share of its accounts' sales, from the monthly sales facts
+        sales = MonthlySales.objects.filter(branch_account=branch_account)
 
         # Aggregate sales by year and calculate total gross sales by year
-        gross_sales_by_year = sales.annotate(year=TruncYear('invoice__invoice_date')).values('year').annotate(
-            total_sales=Sum(total_sales_value)
+        gross_sales_by_year = sales.annotate(year=TruncYear('month')).values('year').annotate(
+            total_sales=Sum('revenue')
         ).order_by('year')
 
         # Calculate total gross sales for the branch account
         total_gross_sum = sales.aggregate(
-            total_sum=Sum(total_sales_value)
+            total_sum=Sum('revenue')
         )['total_sum'] or 0
 
         # Serialize the branch account data with custom context
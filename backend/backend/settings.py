@@ -89,6 +89,30 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Custom user model
 AUTH_USER_MODEL = 'users.UserProfile'
 
+# Parse cache of the sales import commands (parsed vendor spreadsheets, keyed by content hash)
+IMPORT_CACHE_DIR = os.getenv('IMPORT_CACHE_DIR', BASE_DIR / 'import_cache')
+IMPORT_CACHE_MAX_BYTES = int(os.getenv('IMPORT_CACHE_MAX_MB', '512')) * 1024 * 1024
+
+# Vendor files uploaded through the import API, until the import worker has processed them
+IMPORT_UPLOAD_DIR = os.getenv('IMPORT_UPLOAD_DIR', BASE_DIR / 'uploads')
+
+# Cache of the analytics responses (see sales.response_cache). Entries are replaced when the
+# data version changes rather than expiring; they are kept in each process's memory unless
+# RESPONSE_CACHE_DIR names a directory shared by the gunicorn workers.
+RESPONSE_CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '1000'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache' if os.getenv('RESPONSE_CACHE_DIR')
+        else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.getenv('RESPONSE_CACHE_DIR', 'responses'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': RESPONSE_CACHE_ENTRIES},
+    },
+}
+
 # Templates configuration
 TEMPLATES = [
     {
@@ -20,6 +20,10 @@ if [ -f /app/data.json ]; then
   python manage.py loaddata data.json
 fi
 
+# Build the monthly sales facts the dashboards read, on the first start
+echo "Building monthly sales facts..."
+python manage.py rebuild_sales_facts --if-empty
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
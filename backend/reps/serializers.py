@@ -1,11 +1,8 @@
 from rest_framework import serializers
 from .models import SalesRep, SalesRepZipCode
 from users.models import UserProfile
-from sales.models import Invoice, Sale
-from django.db.models import Sum, F
-from collections import defaultdict
-from datetime import datetime
-from decimal import Decimal 
+from sales.models import Invoice, MonthlySales
+from django.db.models import Sum
 
 # Serializer for SalesRepZipCode model
 class SalesRepZipCodeSerializer(serializers.ModelSerializer):
@@ -51,8 +48,8 @@ class SalesRepSerializer(serializers.ModelSerializer):
             # Fetch all invoices related to the accounts under this branch
             invoices = Invoice.objects.filter(account__in=accounts)
 
-            # Calculate gross sales and count of invoices for each branch account
-            gross_sales = invoices.aggregate(total_sales=Sum('sales__sell_price'))['total_sales'] or 0
+            # Calculate gross sales (the branch's share in the monthly sales facts) and count of invoices for each branch account
+            gross_sales = MonthlySales.objects.filter(branch_account=branch_account).aggregate(total_sales=Sum('amount'))['total_sales'] or 0
             invoice_count = invoices.count()
 
             # Append summarized branch account data
@@ -71,10 +68,10 @@ class SalesRepSerializer(serializers.ModelSerializer):
         return branch_accounts_data
 
     def get_top_ten_items_by_volume(self, obj):
-        sales = Sale.objects.filter(invoice__account__branch_accounts__sales_rep=obj)
+        sales = MonthlySales.objects.filter(branch_account__sales_rep=obj)
 
         top_items_by_volume = sales.values('product__product_code', 'product__product_description').annotate(
-            total_quantity=Sum('quantity_sold')
+            total_quantity=Sum('quantity')
         ).order_by('-total_quantity')[:10]  # Top 10 items by volume
 
         return [{
@@ -84,10 +81,10 @@ class SalesRepSerializer(serializers.ModelSerializer):
         } for item in top_items_by_volume]
 
     def get_top_ten_items_by_price(self, obj):
-        sales = Sale.objects.filter(invoice__account__branch_accounts__sales_rep=obj)
+        sales = MonthlySales.objects.filter(branch_account__sales_rep=obj)
 
         top_items_by_price = sales.values('product__product_code', 'product__product_description').annotate(
-            total_sales=Sum(F('quantity_sold') * F('sell_price'))
+            total_sales=Sum('revenue')
         ).order_by('-total_sales')[:10]  # Top 10 items by price
 
         return [{
@@ -97,27 +94,12 @@ class SalesRepSerializer(serializers.ModelSerializer):
         } for item in top_items_by_price]
 
     def get_monthly_gross_sales(self, obj):
-        # Monthly gross sales calculation
-        branch_accounts = obj.branch_accounts.all()
-        monthly_gross_sales = defaultdict(Decimal)  # Use Decimal to ensure proper precision handling
-
-        for branch_account in branch_accounts:
-            accounts = branch_account.accounts.all()
-            invoices = Invoice.objects.filter(account__in=accounts)
-
-            # Calculate gross sales per month
-            monthly_sales = invoices.values('invoice_date').annotate(
-                monthly_gross_sales=Sum('sales__sell_price')
-            )
-
-            for entry in monthly_sales:
-                invoice_date = entry['invoice_date']
-                gross_sales = entry['monthly_gross_sales'] or Decimal(0)  # Ensure gross_sales is a Decimal
-                if invoice_date:
-                    month_year = invoice_date.strftime('%Y-%m')  # Format as 'YYYY-MM'
-                    monthly_gross_sales[month_year] += gross_sales  # Add Decimal to Decimal
+        # Monthly gross sales of the rep's branch accounts, from the monthly sales facts
+        monthly_sales = MonthlySales.objects.filter(
+            branch_account__sales_rep=obj, month__isnull=False
+        ).values('month').annotate(monthly_gross_sales=Sum('amount')).order_by('month')
 
-        return dict(monthly_gross_sales)  # Convert defaultdict to dict
+        return {entry['month'].strftime('%Y-%m'): entry['monthly_gross_sales'] for entry in monthly_sales}
 
     def create(self, validated_data):
         zip_codes_data = validated_data.pop('zip_codes', [])
@@ -1,3 +1,79 @@
+from decimal import Decimal
+
+from django.core.cache import caches
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import Account, BranchAccount
+from brands.models import Brand
+from sales.importers.bulk import BulkImporter
+from sales.importers.reps import SalesRepResolver
+from sales.models import DataVersion, Invoice, Product, Sale
+from users.models import UserProfile
+from .models import SalesRep
+
+
+class SalesRepResolverTests(TestCase):
+    """Grace's Sub Rep names resolved to SalesReps once per run."""
+
+    def test_resolve(self):
+        jane = UserProfile.objects.create_user(username='jane', email='jane_doe@example.com')
+        resolver = SalesRepResolver()
+
+        reps = resolver.resolve({'Jane Doe', 'John Roe', None})
+        self.assertEqual(set(reps), {'Jane Doe', 'John Roe'})
+        # Users are matched by email, else by username, else created
+        self.assertEqual(reps['Jane Doe'].user, jane)
+        self.assertEqual(reps['John Roe'].user.username, 'john_roe')
+        self.assertEqual(SalesRep.objects.count(), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.resolve({'Jane Doe'}), {'Jane Doe': reps['Jane Doe']})
+
+    def test_stored_invoices_are_given_their_rep(self):
+        rep = SalesRepResolver().resolve({'Jane Doe'})['Jane Doe']
+        brand = Brand.objects.create(name='Grace')
+        record = {'row': 1, 'customer_number': 'C1', 'customer_name': 'Duke Hospital', 'invoice_number': '100',
+                  'product_code': 'P-1', 'line_number': 1, 'occurrence': 1, 'sell_price': Decimal('10.00')}
+        BulkImporter(brand).run([record])
+        invoice = Invoice.objects.get()
+        self.assertIsNone(invoice.sales_rep)
+
+        importer = BulkImporter(brand)
+        importer.run([dict(record, sales_rep=rep)])
+        self.assertEqual(Invoice.objects.get().sales_rep, rep)
+        # Their sales' facts are refreshed by the command
+        self.assertEqual(importer.stamped_invoices, {invoice.pk})
+
+
+class SalesRepDetailCacheTests(TestCase):
+    """The sales rep page is served from the response cache until the data version changes."""
+
+    def setUp(self):
+        caches['responses'].clear()
+        user = UserProfile.objects.create_user(username='jane_doe', first_name='Jane', last_name='Doe')
+        self.rep = SalesRep.objects.create(user=user, code='JD')
+        account = Account.objects.create(name='Duke Hospital', customer_number='C1')
+        branch = BranchAccount.objects.create(name='North', sales_rep=self.rep)
+        branch.accounts.add(account)
+        invoice = Invoice.objects.create(invoice_number='100', account=account)
+        product = Product.objects.create(product_code='P-1')
+        Sale.objects.create(invoice=invoice, product=product, customer=account, sell_price=Decimal('10.00'))
+
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(user)
+
+    def gross_sales(self):
+        response = self.client.get(f'/marathon/api/reps/{self.rep.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['branch_accounts'][0]['gross_sales']
+
+    def test_cached_until_the_data_version_changes(self):
+        self.assertEqual(self.gross_sales(), Decimal('10.00'))
+
+        # A bulk write that doesn't bump the version isn't seen
+        Sale.objects.update(sell_price=Decimal('12.00'))
+        self.assertEqual(self.gross_sales(), Decimal('10.00'))
 
-# Create your tests here.
+        DataVersion.bump()
+        self.assertEqual(self.gross_sales(), Decimal('12.00'))
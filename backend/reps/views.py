@@ -5,7 +5,8 @@ from rest_framework import status
 from .models import SalesRep
 from .serializers import SalesRepSerializer
 from accounts.models import BranchAccount, Account
-from sales.models import Invoice
+from sales.models import Invoice, Sale
+from sales.response_cache import cached_response
 from accounts.serializers import BranchAccountSerializer, InvoiceSerializer
 from django.db.models import Sum
 from collections import defaultdict
@@ -19,6 +20,7 @@ class SalesRepDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = SalesRep.objects.all()
     serializer_class = SalesRepSerializer
 
+    @cached_response
     def retrieve(self, request, *args, **kwargs):
         # Retrieve the SalesRep instance
         instance = self.get_object()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Invoice, Sale, Category, SubCategory, Tag
+from .models import Product, Invoice, Sale, Category, SubCategory, Tag, ImportedFile, ImportBatch, ImportJob, QuarantinedRow, MonthlySales
 
 # Inline for displaying sales attached to an invoice
 class SaleInline(admin.TabularInline):
@@ -33,7 +33,7 @@ class ProductAdmin(admin.ModelAdmin):
 
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
-    list_display = ('invoice_number', 'invoice_date', 'sales_rep', 'account', 'notes')
+    list_display = ('invoice_number', 'invoice_date', 'sales_rep', 'account', 'total_amount', 'line_count', 'notes')
     search_fields = ('invoice_number', 'account__name', 'sales_rep__user__first_name', 'sales_rep__user__last_name')
     list_filter = ('invoice_date', 'sales_rep', 'account')
 
@@ -42,6 +42,48 @@ class InvoiceAdmin(admin.ModelAdmin):
 
 @admin.register(Sale)
 class SaleAdmin(admin.ModelAdmin):
-    list_display = ('product', 'invoice', 'customer', 'quantity_sold', 'sell_price', 'commission_percentage', 'sale_date')
+    list_display = ('product', 'invoice', 'customer', 'quantity_sold', 'sell_price', 'line_total', 'commission_percentage', 'sale_date')
     search_fields = ('product__product_code', 'invoice__invoice_number', 'customer__name')
     list_filter = ('sale_date', 'commission_percentage', 'product')
+
+
+@admin.register(ImportedFile)
+class ImportedFileAdmin(admin.ModelAdmin):
+    list_display = ('path', 'vendor', 'status', 'row_count', 'committed_rows', 'size', 'imported_at')
+    search_fields = ('path', 'content_hash')
+    list_filter = ('vendor', 'status')
+    readonly_fields = ('path', 'vendor', 'content_hash', 'size', 'row_count', 'committed_rows', 'status', 'message',
+                       'imported_at')
+
+
+@admin.register(ImportBatch)
+class ImportBatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'path', 'vendor', 'created_at')
+    search_fields = ('path', 'content_hash')
+    list_filter = ('vendor',)
+    readonly_fields = ('path', 'vendor', 'content_hash', 'created_at')
+
+
+@admin.register(QuarantinedRow)
+class QuarantinedRowAdmin(admin.ModelAdmin):
+    list_display = ('import_batch', 'source_row', 'reason', 'created_at')
+    search_fields = ('import_batch__path', 'reason')
+    list_filter = ('import_batch__vendor', 'reason')
+    readonly_fields = ('import_batch', 'source_row', 'reason', 'values', 'created_at')
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'file', 'vendor', 'status', 'uploaded_by', 'created_at', 'finished_at')
+    list_filter = ('vendor', 'status')
+    readonly_fields = ('import_batch', 'report', 'message', 'created_at', 'started_at', 'updated_at', 'finished_at')
+
+
+@admin.register(MonthlySales)
+class MonthlySalesAdmin(admin.ModelAdmin):
+    list_display = ('month', 'brand', 'product', 'account', 'branch_account', 'sales_rep', 'revenue', 'quantity', 'lines')
+    list_filter = ('month', 'brand')
+    search_fields = ('product__product_code', 'account__name', 'branch_account__name')
+    # Maintained by sales.facts, rebuilt with the rebuild_sales_facts command
+    readonly_fields = ('month', 'brand', 'product', 'account', 'branch_account', 'root_account', 'sales_rep',
+                       'revenue', 'amount', 'quantity', 'lines')
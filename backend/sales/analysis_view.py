@@ -1,21 +1,120 @@
+from datetime import date
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import F
-from .models import Sale
+from django.db.models import Q
+from accounts.models import AccountHierarchy
+from .models import Product, Sale
 from .serializers import AnalysisSerializer
+from .renderers import BULK_RENDERERS
+from .response_cache import conditional_response
+
+# Query parameters filtering the analysis rows by ids (comma separated or repeated), and the sales they match
+ID_FILTERS = {
+    'brand': lambda ids: Q(product__brand__in=ids),
+    'category': lambda ids: Q(product__category__in=ids),
+    'sub_category': lambda ids: Q(product__sub_category__in=ids),
+    'tag': lambda ids: Q(product__in=Product.objects.filter(tags__in=ids).values('pk')),
+    'sales_rep': lambda ids: Q(invoice__sales_rep__in=ids),
+    'account': lambda ids: Q(invoice__account__in=ids),
+    # Accounts anywhere below the branch or root accounts, through the account hierarchy
+    'branch_account': lambda ids: Q(invoice__account__in=AccountHierarchy.objects.filter(branch_account__in=ids).values('account')),
+    'root_account': lambda ids: Q(invoice__account__in=AccountHierarchy.objects.filter(root_account__in=ids).values('account')),
+}
+
+# Fields the rows can be sorted by with 'ordering' (comma separated, '-' for descending), and their model fields
+ORDERING_FIELDS = {
+    'id': ['id'],
+    'invoice_date': ['invoice__invoice_date'],
+    'sale_date': ['sale_date'],
+    'sell_price': ['sell_price'],
+    'quantity_sold': ['quantity_sold'],
+    'quantity_invoiced': ['quantity_invoiced'],
+    'product_code': ['product__product_code'],
+    'brand': ['product__brand__name'],
+    'category': ['product__category__name'],
+    'sub_category': ['product__sub_category__name'],
+    'account': ['invoice__account__name'],
+    'sales_rep': ['invoice__sales_rep__user__first_name', 'invoice__sales_rep__user__last_name'],
+}
+
+
+def param_values(request, name):
+    """Values of a query parameter given comma separated, repeated or both."""
+    return [value.strip() for param in request.query_params.getlist(name) for value in param.split(',') if value.strip()]
+
+
+def filter_sales(sales, request):
+    """Apply the filters of the request to sales. Raises ValueError for invalid values."""
+    for name, lookup in ID_FILTERS.items():
+        values = param_values(request, name)
+        if values:
+            try:
+                sales = sales.filter(lookup([int(value) for value in values]))
+            except ValueError:
+                raise ValueError(f"'{name}' must be ids")
+
+    states = param_values(request, 'state')
+    if states:
+        sales = sales.filter(invoice__account__state__in=states)
+
+    for name, lookup in [('start_date', 'invoice__invoice_date__gte'), ('end_date', 'invoice__invoice_date__lte')]:
+        if request.query_params.get(name):
+            try:
+                sales = sales.filter(**{lookup: date.fromisoformat(request.query_params[name])})
+            except ValueError:
+                raise ValueError(f"'{name}' must be a date as YYYY-MM-DD")
+    return sales
+
+
+def sort_sales(sales, request):
+    """Order sales by the request's 'ordering', then by id. Raises ValueError for unknown fields."""
+    ordering = []
+    for name in param_values(request, 'ordering'):
+        descending = name.startswith('-')
+        fields = ORDERING_FIELDS.get(name.lstrip('-'))
+        if not fields:
+            raise ValueError(f"Cannot order by '{name}', use one of: {', '.join(ORDERING_FIELDS)}")
+        ordering.extend(f'-{field}' if descending else field for field in fields)
+    return sales.order_by(*ordering, 'id')
+
+
+class AnalysisPagination(PageNumberPagination):
+    """Pages of the analysis rows with their total count, when 'page' or 'page_size' is given."""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        # Without either parameter the endpoint returns every row, as the frontend expects
+        if self.page_query_param not in request.query_params and self.page_size_query_param not in request.query_params:
+            return None
+        return super().get_page_size(request)
+
 
 class AnalysisView(APIView):
+    """
+    Sales rows for the analytics page, filtered by the ID_FILTERS parameters, 'state',
+    'start_date' and 'end_date' (invoice dates), sorted by 'ordering' and paginated by
+    'page' and 'page_size'. 'format' may be 'columnar' or 'arrow' (see sales.renderers).
+    """
+    renderer_classes = BULK_RENDERERS
+    numeric_columns = ['quantity_sold', 'quantity_invoiced', 'sell_price']
+
+    @conditional_response
     def get(self, request):
         # Query only the necessary fields from Sale and related models
         sales_data = (
             Sale.objects.select_related(
-                'product__brand', 
-                'product__category', 
+                'product__brand',
+                'product__category',
                 'product__sub_category',
                 'invoice__account',
-                'invoice__sales_rep'
+                'invoice__sales_rep__user'
             )
-            # Removed prefetch for root_accounts since it's causing the error
+            # The tags and the root accounts of the account's branches, fetched in bulk for the rows served
+            .prefetch_related('product__tags', 'invoice__account__branch_accounts__root_accounts')
             .only(
                 'id', 'quantity_sold', 'quantity_invoiced', 'sell_price', 'sale_date',
                 'product__product_code', 'product__product_description', 'product__brand__name',
@@ -25,5 +124,13 @@ class AnalysisView(APIView):
             )
         )
 
-        serializer = AnalysisSerializer(sales_data, many=True)
-        return Response(serializer.data)
+        try:
+            sales_data = sort_sales(filter_sales(sales_data, request), request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = AnalysisPagination()
+        page = paginator.paginate_queryset(sales_data, request, view=self)
+        if page is None:
+            return Response(AnalysisSerializer(sales_data, many=True).data)
+        return paginator.get_paginated_response(AnalysisSerializer(page, many=True).data)
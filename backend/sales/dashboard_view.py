@@ -1,264 +1,378 @@
+from collections import defaultdict
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, F, DecimalField, ExpressionWrapper, Value
+from django.db.models import F, Func, Q, Sum, Window
 from reps.serializers import BranchSalesRepSerializer
-from django.db.models.functions import Coalesce, TruncYear, TruncMonth
-from sales.models import Sale
-from accounts.models import BranchAccount
-from datetime import datetime
+from django.db.models.functions import ExtractYear, TruncYear
+from sales.models import MonthlySales
+from sales.response_cache import cached_response
+from reps.models import SalesRep
+from datetime import date
 from django.utils.timezone import now
 
+
+# SUM() of an aggregate, usable as the source of a Window
+class AggregateSum(Func):
+    function = 'SUM'
+    window_compatible = True
+
+
+def ytd_as_of(request):
+    """
+    Date the dashboard widgets report up to: the 'as_of' date (YYYY-MM-DD), else the end
+    of 'year' (today for the current year), else today. Raises ValueError for invalid values.
+    """
+    today = now().date()
+    if request.query_params.get('as_of'):
+        try:
+            return date.fromisoformat(request.query_params['as_of'])
+        except ValueError:
+            raise ValueError("'as_of' must be a date as YYYY-MM-DD")
+    if request.query_params.get('year'):
+        try:
+            year = int(request.query_params['year'])
+            return min(date(year, 12, 31), today)
+        except ValueError:
+            raise ValueError("'year' must be a year as YYYY")
+    return today
+
+
+def facts_as_of(as_of):
+    """Monthly sales facts up to as_of (the facts are monthly, so with the whole month of as_of)."""
+    return MonthlySales.objects.filter(Q(month__lte=as_of) | Q(month__isnull=True))
+
+
+def is_ytd(month, as_of):
+    return month is not None and date(as_of.year, 1, 1) <= month <= as_of
+
+
+def top_yearly_sales(sales, key, fields, as_of, limit=10):
+    """
+    Return the facts of the limit entities (key) with the highest YTD revenue as of as_of,
+    with their yearly revenue up to as_of, in one query.
+
+    Rows are (entity, year) sums carrying the entity's YTD revenue through a window over
+    its rows, ordered by YTD revenue, entity and year.
+    """
+    ytd = Q(month__gte=date(as_of.year, 1, 1), month__lte=as_of)
+    top = (
+        sales.filter(ytd).values(key)
+        .annotate(ytd_total_sales=Sum('revenue'))
+        .order_by('-ytd_total_sales', key)
+        .values(key)[:limit]
+    )
+    return (
+        sales.filter(Q(month__lte=as_of) | Q(month__isnull=True), **{f'{key}__in': top})
+        .values(key, *fields, year=ExtractYear('month'))
+        .annotate(
+            total_sales=Sum('revenue'),
+            year_ytd=Sum('revenue', filter=ytd),
+        )
+        .annotate(ytd_total_sales=Window(AggregateSum('year_ytd'), partition_by=[F(key)]))
+        .order_by('-ytd_total_sales', key, 'year')
+    )
+
+
+def group_yearly_sales(rows, key):
+    """Group the rows of top_yearly_sales by entity: (first row, yearly sales) in rank order."""
+    groups = {}
+    for row in rows:
+        _, yearly_sales = groups.setdefault(row[key], (row, []))
+        yearly_sales.append({
+            'year': row['year'],  # Year as YYYY (e.g., 2024)
+            'total_sales': row['total_sales']
+        })
+    return groups.values()
+
+
+def gross_sales_data(sales_by_year, ytd_sales):
+    return {
+        'gross_sales_by_year': [
+            {'year': entry['year'], 'total_sales': entry['total_sales']} for entry in sales_by_year
+        ],
+        'year_to_date_sales': ytd_sales
+    }
+
+
+def top_branches_data(rows, sales_reps):
+    """Top branch accounts from top_yearly_sales rows, with their sales reps from sales_reps (by id)."""
+    top_branch_yearly_sales = []
+    for branch, yearly_sales in group_yearly_sales(rows, 'branch_account__id'):
+        # Serialize the SalesRep data
+        sales_rep = sales_reps.get(branch['branch_account__sales_rep'])
+        sales_rep_data = BranchSalesRepSerializer(sales_rep).data if sales_rep else None
+
+        # Append the branch account with its yearly sales and sales rep info
+        top_branch_yearly_sales.append({
+            'branch_account': {
+                'id': branch['branch_account__id'],
+                'name': branch['branch_account__name'],
+                'ytd_total_sales': branch['ytd_total_sales'],
+                'sales_rep': sales_rep_data  # Include sales rep details
+            },
+            'yearly_sales': yearly_sales
+        })
+    return top_branch_yearly_sales
+
+
+def top_sales_reps_data(rows):
+    top_sales_rep_yearly_sales = []
+    for sales_rep, yearly_sales in group_yearly_sales(rows, 'sales_rep__id'):
+        # Add the sales rep details
+        full_name = f"{sales_rep['sales_rep__user__first_name']} {sales_rep['sales_rep__user__last_name']}"
+        profile_pic = sales_rep['sales_rep__profile_pic']
+
+        # Append the sales rep data with its yearly sales
+        top_sales_rep_yearly_sales.append({
+            'sales_rep': {
+                'id': sales_rep['sales_rep__id'],
+                'full_name': full_name,
+                'profile_pic': profile_pic,
+                'ytd_total_sales': sales_rep['ytd_total_sales']
+            },
+            'yearly_sales': yearly_sales
+        })
+    return top_sales_rep_yearly_sales
+
+
+def top_brands_data(rows):
+    top_brand_yearly_sales = []
+    for brand, yearly_sales in group_yearly_sales(rows, 'brand__id'):
+        # Append the brand data with its yearly sales
+        top_brand_yearly_sales.append({
+            'brand': {
+                'id': brand['brand__id'],
+                'name': brand['brand__name'],
+                'ytd_total_sales': brand['ytd_total_sales']
+            },
+            'yearly_sales': yearly_sales
+        })
+    return top_brand_yearly_sales
+
+
+def monthly_sales_by_rep_data(monthly_sales, sales_reps):
+    """Monthly sales grouped by sales rep, from (month, sales rep id, total) rows ordered by month."""
+    sales_by_rep = {}
+    for sale in monthly_sales:
+        sales_rep_id = sale['sales_rep__id']
+
+        # Serialize the sales rep the first time we see it
+        if sales_rep_id not in sales_by_rep:
+            sales_rep_data = BranchSalesRepSerializer(sales_reps[sales_rep_id]).data
+            sales_by_rep[sales_rep_id] = {
+                'sales_rep': sales_rep_data,  # Include serialized sales rep data
+                'sales': []
+            }
+
+        # Add the sales data (by month and year) to the rep's sales
+        sales_by_rep[sales_rep_id]['sales'].append({
+            'year': sale['month'].year,
+            'month': sale['month'].month,
+            'total_sales': sale['total_sales']
+        })
+    return list(sales_by_rep.values())
+
+
+def sales_reps_by_id(ids):
+    return SalesRep.objects.select_related('user').in_bulk(set(ids) - {None})
+
+
 # Gross Sales Yearly and YTD (first view)
 class GrossSalesYearlyYTDView(APIView):
+    @cached_response
     def get(self, request):
-        sales = Sale.objects.filter(invoice__account__branch_accounts__isnull=False)
+        try:
+            as_of = ytd_as_of(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-        total_sales_value = ExpressionWrapper(
-            F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-            output_field=DecimalField()
-        )
-
-        current_year = now().year
+        # Monthly sales facts of accounts that belong to a branch
+        sales = facts_as_of(as_of).filter(branch_account__isnull=False)
 
         # Gross sales by year
         sales_by_year = sales.annotate(
-            year=TruncYear('invoice__invoice_date')
+            year=TruncYear('month')
         ).values('year').annotate(
-            total_sales=Sum(total_sales_value)
+            total_sales=Sum('revenue')
         ).order_by('year')
 
-        # YTD sales for the current year
-        ytd_sales = sales.filter(invoice__invoice_date__year=current_year).aggregate(
-            ytd_total_sales=Sum(total_sales_value)
+        # YTD sales as of as_of
+        ytd_sales = sales.filter(month__gte=date(as_of.year, 1, 1)).aggregate(
+            ytd_total_sales=Sum('revenue')
         )['ytd_total_sales'] or 0
 
-        response_data = {
-            'gross_sales_by_year': [
-                {'year': entry['year'], 'total_sales': entry['total_sales']} for entry in sales_by_year
-            ],
-            'year_to_date_sales': ytd_sales
-        }
+        return Response(gross_sales_data(sales_by_year, ytd_sales), status=status.HTTP_200_OK)
 
-        return Response(response_data, status=status.HTTP_200_OK)
 
 class TopTenBranchAccountsYTDView(APIView):
+    @cached_response
     def get(self, request):
-        current_year = now().year
+        try:
+            as_of = ytd_as_of(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get all branch accounts and related sales
-        sales = Sale.objects.filter(invoice__account__branch_accounts__isnull=False)
+        # Top 10 branch accounts by YTD sales, with their yearly sales
+        sales = MonthlySales.objects.filter(branch_account__isnull=False)
+        rows = list(top_yearly_sales(sales, 'branch_account__id', ['branch_account__name', 'branch_account__sales_rep'], as_of))
 
-        total_sales_value = ExpressionWrapper(
-            F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-            output_field=DecimalField()
-        )
+        # The branch accounts' sales reps, fetched at once
+        sales_reps = sales_reps_by_id(row['branch_account__sales_rep'] for row in rows)
+        return Response(top_branches_data(rows, sales_reps), status=status.HTTP_200_OK)
 
-        # YTD sales per branch account
-        branch_ytd_sales = sales.filter(invoice__invoice_date__year=current_year).values(
-            'invoice__account__branch_accounts__id', 'invoice__account__branch_accounts__name'
-        ).annotate(
-            ytd_total_sales=Sum(total_sales_value)
-        ).order_by('-ytd_total_sales')[:10]  # Top 10 branch accounts by YTD sales
-
-        # Yearly gross sales for each of the top 10 branch accounts
-        top_branch_yearly_sales = []
-        for branch in branch_ytd_sales:
-            # Get the yearly sales for each branch account
-            yearly_sales = sales.filter(invoice__account__branch_accounts=branch['invoice__account__branch_accounts__id']).annotate(
-                year=TruncYear('invoice__invoice_date')
-            ).values('year').annotate(
-                total_sales=Sum(total_sales_value)
-            ).order_by('year')
-
-            # Format the year to display only the year part (YYYY)
-            formatted_yearly_sales = []
-            for entry in yearly_sales:
-                year_value = entry['year'].year if entry['year'] else None  # Extract just the year part
-                formatted_yearly_sales.append({
-                    'year': year_value,  # Year as YYYY (e.g., 2024)
-                    'total_sales': entry['total_sales']
-                })
-
-            # Get the SalesRep details for the branch account
-            branch_account_id = branch['invoice__account__branch_accounts__id']
-            branch_account = BranchAccount.objects.get(pk=branch_account_id)
-            sales_rep = branch_account.sales_rep
-
-            # Serialize the SalesRep data
-            sales_rep_data = None
-            if sales_rep:
-                sales_rep_data = BranchSalesRepSerializer(sales_rep).data
-
-            # Append the branch account with its formatted yearly sales and sales rep info
-            top_branch_yearly_sales.append({
-                'branch_account': {
-                    'id': branch['invoice__account__branch_accounts__id'],
-                    'name': branch['invoice__account__branch_accounts__name'],
-                    'ytd_total_sales': branch['ytd_total_sales'],
-                    'sales_rep': sales_rep_data  # Include sales rep details
-                },
-                'yearly_sales': formatted_yearly_sales  # Use formatted yearly sales
-            })
-
-        return Response(top_branch_yearly_sales, status=status.HTTP_200_OK)
-    
 
 class TopTenSalesRepYTDView(APIView):
+    @cached_response
     def get(self, request):
-        current_year = now().year
-
-        # Get all sales related to branch accounts that have a sales rep
-        sales = Sale.objects.filter(invoice__account__branch_accounts__sales_rep__isnull=False)
+        try:
+            as_of = ytd_as_of(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Top 10 sales reps by YTD sales, with their yearly sales
+        sales = MonthlySales.objects.filter(sales_rep__isnull=False)
+        rows = top_yearly_sales(sales, 'sales_rep__id', [
+            'sales_rep__user__first_name',  # SalesRep first name
+            'sales_rep__user__last_name',  # SalesRep last name
+            'sales_rep__profile_pic'  # SalesRep profile picture
+        ], as_of)
+        return Response(top_sales_reps_data(rows), status=status.HTTP_200_OK)
 
-        # Expression to calculate the total sale value (sell_price * quantity_invoiced or quantity_sold)
-        total_sales_value = ExpressionWrapper(
-            F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-            output_field=DecimalField()
-        )
-
-        # YTD sales per sales rep
-        sales_rep_ytd_sales = sales.filter(invoice__invoice_date__year=current_year).values(
-            'invoice__account__branch_accounts__sales_rep__id',  # SalesRep ID
-            'invoice__account__branch_accounts__sales_rep__user__first_name',  # SalesRep first name
-            'invoice__account__branch_accounts__sales_rep__user__last_name',  # SalesRep last name
-            'invoice__account__branch_accounts__sales_rep__profile_pic'  # SalesRep profile picture
-        ).annotate(
-            ytd_total_sales=Sum(total_sales_value)
-        ).order_by('-ytd_total_sales')[:10]  # Top 10 sales reps by YTD sales
-
-        # For each sales rep, calculate their yearly sales as well
-        top_sales_rep_yearly_sales = []
-        for sales_rep in sales_rep_ytd_sales:
-            # Get the yearly sales for each sales rep
-            yearly_sales = sales.filter(invoice__account__branch_accounts__sales_rep=sales_rep['invoice__account__branch_accounts__sales_rep__id']).annotate(
-                year=TruncYear('invoice__invoice_date')
-            ).values('year').annotate(
-                total_sales=Sum(total_sales_value)
-            ).order_by('year')
-
-            # Format the year to display only the year part (YYYY)
-            formatted_yearly_sales = []
-            for entry in yearly_sales:
-                year_value = entry['year'].year if entry['year'] else None  # Extract just the year part
-                formatted_yearly_sales.append({
-                    'year': year_value,  # Year as YYYY (e.g., 2024)
-                    'total_sales': entry['total_sales']
-                })
-
-            # Add the sales rep details
-            full_name = f"{sales_rep['invoice__account__branch_accounts__sales_rep__user__first_name']} {sales_rep['invoice__account__branch_accounts__sales_rep__user__last_name']}"
-            profile_pic = sales_rep['invoice__account__branch_accounts__sales_rep__profile_pic']
-
-            # Append the sales rep data with its formatted yearly sales
-            top_sales_rep_yearly_sales.append({
-                'sales_rep': {
-                    'id': sales_rep['invoice__account__branch_accounts__sales_rep__id'],
-                    'full_name': full_name,
-                    'profile_pic': profile_pic,
-                    'ytd_total_sales': sales_rep['ytd_total_sales']
-                },
-                'yearly_sales': formatted_yearly_sales  # Use formatted yearly sales
-            })
-
-        return Response(top_sales_rep_yearly_sales, status=status.HTTP_200_OK)
-    
 class TopBrandsYTDView(APIView):
+    @cached_response
     def get(self, request):
-        current_year = now().year
-
-        # Get all sales related to products that have a brand
-        sales = Sale.objects.filter(product__brand__isnull=False)
-
-        # Expression to calculate the total sale value (sell_price * quantity_invoiced or quantity_sold)
-        total_sales_value = ExpressionWrapper(
-            F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-            output_field=DecimalField()
-        )
+        try:
+            as_of = ytd_as_of(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # YTD sales per brand
-        brand_ytd_sales = sales.filter(invoice__invoice_date__year=current_year).values(
-            'product__brand__id',  # Brand ID
-            'product__brand__name'  # Brand Name
-        ).annotate(
-            ytd_total_sales=Sum(total_sales_value)
-        ).order_by('-ytd_total_sales')[:10]  # Top 10 brands by YTD sales
-
-        # For each brand, calculate their yearly sales as well
-        top_brand_yearly_sales = []
-        for brand in brand_ytd_sales:
-            # Get the yearly sales for each brand
-            yearly_sales = sales.filter(product__brand=brand['product__brand__id']).annotate(
-                year=TruncYear('invoice__invoice_date')
-            ).values('year').annotate(
-                total_sales=Sum(total_sales_value)
-            ).order_by('year')
-
-            # Format the year to display only the year part (YYYY)
-            formatted_yearly_sales = []
-            for entry in yearly_sales:
-                year_value = entry['year'].year if entry['year'] else None  # Extract just the year part
-                formatted_yearly_sales.append({
-                    'year': year_value,  # Year as YYYY (e.g., 2024)
-                    'total_sales': entry['total_sales']
-                })
-
-            # Append the brand data with its formatted yearly sales
-            top_brand_yearly_sales.append({
-                'brand': {
-                    'id': brand['product__brand__id'],
-                    'name': brand['product__brand__name'],
-                    'ytd_total_sales': brand['ytd_total_sales']
-                },
-                'yearly_sales': formatted_yearly_sales  # Use formatted yearly sales
-            })
-
-        return Response(top_brand_yearly_sales, status=status.HTTP_200_OK)
+        # Top 10 brands by YTD sales, with their yearly sales
+        sales = MonthlySales.objects.filter(brand__isnull=False)
+        rows = top_yearly_sales(sales, 'brand__id', ['brand__name'], as_of)
+        return Response(top_brands_data(rows), status=status.HTTP_200_OK)
 
 
 class MonthlySalesBySalesRepView(APIView):
+    @cached_response
     def get(self, request):
-        # Get all sales related to branch accounts that have a sales rep
-        sales = Sale.objects.filter(invoice__account__branch_accounts__sales_rep__isnull=False)
+        try:
+            as_of = ytd_as_of(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Expression to calculate the total sale value (sell_price * quantity_invoiced or quantity_sold)
-        total_sales_value = ExpressionWrapper(
-            F('sell_price') * Coalesce(F('quantity_invoiced'), F('quantity_sold'), Value(1)),
-            output_field=DecimalField()
-        )
+        # Monthly sales facts credited to a sales rep
+        sales = facts_as_of(as_of).filter(sales_rep__isnull=False)
 
-        # Annotate sales by month and year across all sales reps
-        monthly_sales = sales.annotate(
-            year=TruncYear('invoice__invoice_date'),
-            month=TruncMonth('invoice__invoice_date')
-        ).values('year', 'month', 'invoice__account__branch_accounts__sales_rep__id').annotate(
-            total_sales=Sum(total_sales_value)
-        ).filter(month__isnull=False).order_by('year', 'month')
-
-        # Serialize sales by sales rep
-        sales_by_rep = {}
-        for sale in monthly_sales:
-            sales_rep_id = sale['invoice__account__branch_accounts__sales_rep__id']
-            
-            # Fetch the sales rep object if we don't have it yet
-            if sales_rep_id not in sales_by_rep:
-                sales_rep_obj = BranchAccount.objects.filter(
-                    sales_rep__id=sales_rep_id
-                ).first().sales_rep
-                
-                # Serialize the sales rep object using BranchSalesRepSerializer
-                sales_rep_data = BranchSalesRepSerializer(sales_rep_obj).data
-                sales_by_rep[sales_rep_id] = {
-                    'sales_rep': sales_rep_data,  # Include serialized sales rep data
-                    'sales': []
-                }
-
-            # Add the sales data (by month and year) to the rep's sales
-            sales_by_rep[sales_rep_id]['sales'].append({
-                'year': sale['year'].year,
-                'month': sale['month'].month,
-                'total_sales': sale['total_sales']
-            })
+        # Sum the facts by month across all sales reps
+        monthly_sales = sales.values('month', 'sales_rep__id').annotate(
+            total_sales=Sum('revenue')
+        ).filter(month__isnull=False).order_by('month', 'sales_rep__id')
+
+        # The reps credited with sales, fetched at once
+        sales_reps = sales_reps_by_id(sale['sales_rep__id'] for sale in monthly_sales)
 
         # Return the sales data serialized by sales rep
-        return Response(sales_by_rep.values(), status=status.HTTP_200_OK)
+        return Response(monthly_sales_by_rep_data(monthly_sales, sales_reps), status=status.HTTP_200_OK)
+
+
+class DashboardCube:
+    """
+    Revenue of the monthly sales facts up to a date, summed by month, branch account, sales
+    rep and brand in one query, which every dashboard widget is rolled up from.
+    """
+    # Fields of the facts' branch accounts, sales reps and brands the widgets show
+    fields = [
+        'branch_account__id', 'branch_account__name', 'branch_account__sales_rep',
+        'sales_rep__id', 'sales_rep__user__first_name', 'sales_rep__user__last_name', 'sales_rep__profile_pic',
+        'brand__id', 'brand__name',
+    ]
+
+    def __init__(self, as_of):
+        self.as_of = as_of
+        self.rows = list(facts_as_of(as_of).values('month', *self.fields).annotate(total_sales=Sum('revenue')).order_by())
+
+    def yearly(self, key):
+        """Return the revenue of each entity (key) by year, its YTD revenue and its first row."""
+        by_year, ytd, first = defaultdict(lambda: defaultdict(int)), defaultdict(int), {}
+        for row in self.rows:
+            entity = row[key]
+            if entity is None:
+                continue
+            first.setdefault(entity, row)
+            month = row['month']
+            by_year[entity][month.year if month else None] += row['total_sales']
+            if is_ytd(month, self.as_of):
+                ytd[entity] += row['total_sales']
+        return by_year, ytd, first
+
+    def top_yearly_sales(self, key, limit=10):
+        """The rows top_yearly_sales returns, for the facts of the cube."""
+        by_year, ytd, first = self.yearly(key)
+        rows = []
+        for entity in sorted(ytd, key=lambda entity: (-ytd[entity], entity))[:limit]:
+            # Undated sales sort last, as in SQL
+            for year in sorted(by_year[entity], key=lambda year: (year is None, year)):
+                rows.append({**first[entity], 'year': year, 'total_sales': by_year[entity][year],
+                             'ytd_total_sales': ytd[entity]})
+        return rows
+
+    def gross_sales(self):
+        by_year, ytd, _ = self.yearly('branch_account__id')
+        totals, ytd_sales = defaultdict(int), sum(ytd.values())
+        for years in by_year.values():
+            for year, total in years.items():
+                totals[year] += total
+        sales_by_year = [{'year': date(year, 1, 1) if year else None, 'total_sales': totals[year]}
+                         for year in sorted(totals, key=lambda year: (year is None, year))]
+        return sales_by_year, ytd_sales
+
+    def monthly_sales_by_rep(self):
+        totals = defaultdict(int)
+        for row in self.rows:
+            if row['sales_rep__id'] is not None and row['month'] is not None:
+                totals[row['month'], row['sales_rep__id']] += row['total_sales']
+        return [{'month': month, 'sales_rep__id': sales_rep, 'total_sales': total}
+                for (month, sales_rep), total in sorted(totals.items())]
+
+
+class DashboardSummaryView(APIView):
+    """
+    Every dashboard widget in one response, keyed by widget name; 'widgets' selects some
+    of them (comma separated). Takes the 'as_of' / 'year' parameters of the widget views.
+    """
+    widgets = ['gross_sales', 'top_ten_branch_ytd', 'top_ten_sales_rep_ytd', 'top_brands_ytd', 'monthly_sales_by_sales_rep']
+
+    @cached_response
+    def get(self, request):
+        try:
+            as_of = ytd_as_of(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        widgets = [name.strip() for name in request.query_params.get('widgets', '').split(',') if name.strip()] or self.widgets
+        unknown = [name for name in widgets if name not in self.widgets]
+        if unknown:
+            return Response({"error": f"Unknown widgets: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One pass over the facts, rolled up into each widget
+        cube = DashboardCube(as_of)
+        branches = cube.top_yearly_sales('branch_account__id') if 'top_ten_branch_ytd' in widgets else []
+        monthly_sales = cube.monthly_sales_by_rep() if 'monthly_sales_by_sales_rep' in widgets else []
+
+        # The sales reps both widgets serialize, fetched at once
+        sales_reps = sales_reps_by_id([row['branch_account__sales_rep'] for row in branches]
+                                      + [sale['sales_rep__id'] for sale in monthly_sales])
+
+        data = {}
+        if 'gross_sales' in widgets:
+            data['gross_sales'] = gross_sales_data(*cube.gross_sales())
+        if 'top_ten_branch_ytd' in widgets:
+            data['top_ten_branch_ytd'] = top_branches_data(branches, sales_reps)
+        if 'top_ten_sales_rep_ytd' in widgets:
+            data['top_ten_sales_rep_ytd'] = top_sales_reps_data(cube.top_yearly_sales('sales_rep__id'))
+        if 'top_brands_ytd' in widgets:
+            data['top_brands_ytd'] = top_brands_data(cube.top_yearly_sales('brand__id'))
+        if 'monthly_sales_by_sales_rep' in widgets:
+            data['monthly_sales_by_sales_rep'] = monthly_sales_by_rep_data(monthly_sales, sales_reps)
+        return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,134 @@
+import threading
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from .importers.bulk import lock_model
+from .models import DataVersion, MonthlySales, Sale
+
+# Batch size of the fact rows written by a refresh
+FACT_BATCH_SIZE = 2000
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_filter(months, date_field):
+    """Q matching rows whose date_field falls in one of months (None matches undated rows)."""
+    query = Q(pk__in=[])
+    for month in months:
+        if month is None:
+            query |= Q(**{f'{date_field}__isnull': True})
+        else:
+            query |= Q(**{f'{date_field}__gte': month, f'{date_field}__lt': next_month(month)})
+    return query
+
+
+def sales_months(sales):
+    """Return the invoice months of a Sale queryset."""
+    return set(
+        sales.annotate(fact_month=TruncMonth('invoice__invoice_date'))
+        .values_list('fact_month', flat=True).distinct().order_by()
+    )
+
+
+def fact_rows(sales):
+    """
+    Aggregate a Sale queryset into MonthlySales values.
+
+    Sales are attributed through their invoice account's AccountHierarchy paths: the sales of
+    an account in several branches or roots are split between them by the path weights, so
+    roll-ups never count them twice. Accounts outside any branch keep their whole sales, with
+    no branch or root. The effective sales rep of a path is the branch's, else the root's,
+    the account's or the invoice's.
+    """
+    path = 'invoice__account__hierarchy__'
+    return (
+        sales.annotate(
+            fact_month=TruncMonth('invoice__invoice_date'),
+            fact_brand=F('product__brand'),
+            fact_account=F('invoice__account'),
+            fact_branch=F(path + 'branch_account'),
+            fact_root=F(path + 'root_account'),
+            fact_rep=Coalesce(
+                F(path + 'branch_account__sales_rep'),
+                F(path + 'root_account__sales_rep'),
+                F('invoice__account__sales_rep'),
+                F('invoice__sales_rep'),
+            ),
+            fact_weight=Coalesce(F(path + 'weight'), Value(Decimal(1)), output_field=DecimalField()),
+        )
+        .values('fact_month', 'fact_brand', 'product', 'fact_account', 'fact_branch', 'fact_root', 'fact_rep')
+        .annotate(
+            revenue=Sum(F('line_total') * F('fact_weight')),
+            amount=Sum(F('sell_price') * F('fact_weight')),
+            quantity=Sum(Coalesce(F('quantity_invoiced'), F('quantity_sold'), output_field=DecimalField())
+                         * F('fact_weight')),
+            lines=Sum('fact_weight'),
+        )
+        .order_by()
+    )
+
+
+def refresh_sales_facts(months=None, accounts=None):
+    """
+    Recompute the MonthlySales rows of the given invoice months (first days, or None for
+    undated sales) or of the given account ids; every row when neither is given.
+
+    Returns the number of fact rows written.
+    """
+    if months is not None and not months or accounts is not None and not accounts:
+        return 0
+
+    facts = MonthlySales.objects.all()
+    sales = Sale.objects.all()
+    if months is not None:
+        facts = facts.filter(month_filter(months, 'month'))
+        sales = sales.filter(month_filter(months, 'invoice__invoice_date'))
+    if accounts is not None:
+        facts = facts.filter(account__in=accounts)
+        sales = sales.filter(invoice__account__in=accounts)
+
+    with transaction.atomic():
+        # Concurrent refreshes of the same months would write their rows twice
+        lock_model(MonthlySales)
+        facts.delete()
+        rows = [
+            MonthlySales(
+                month=row['fact_month'], brand_id=row['fact_brand'], product_id=row['product'],
+                account_id=row['fact_account'], branch_account_id=row['fact_branch'],
+                root_account_id=row['fact_root'], sales_rep_id=row['fact_rep'],
+                revenue=row['revenue'] or 0, amount=row['amount'] or 0,
+                quantity=row['quantity'] or 0, lines=row['lines'],
+            )
+            for row in fact_rows(sales).iterator()
+        ]
+        MonthlySales.objects.bulk_create(rows, batch_size=FACT_BATCH_SIZE)
+        # Covers the bulk writes of the importers, which send no signals
+        DataVersion.bump()
+    return len(rows)
+
+
+# Months and accounts whose facts changed in this thread's transaction, refreshed once it commits
+_pending = threading.local()
+
+
+def schedule_refresh(months=(), accounts=()):
+    """Refresh the facts of months and account ids once the current transaction commits."""
+    if not hasattr(_pending, 'months'):
+        _pending.months, _pending.accounts = set(), set()
+    _pending.months.update(months)
+    _pending.accounts.update(account for account in accounts if account is not None)
+    # Callbacks after the first find nothing left to refresh
+    transaction.on_commit(refresh_pending)
+
+
+def refresh_pending():
+    months, accounts = _pending.months, _pending.accounts
+    _pending.months, _pending.accounts = set(), set()
+    if months:
+        refresh_sales_facts(months=months)
+    if accounts:
+        refresh_sales_facts(accounts=accounts)
@@ -0,0 +1,25 @@
+from rest_framework import generics, status
+from rest_framework.parsers import FormParser, MultiPartParser
+from .models import ImportJob
+from .serializers import ImportJobSerializer
+
+# Upload a vendor spreadsheet and queue its import, or list the import jobs
+class ImportJobListCreateView(generics.ListCreateAPIView):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    parser_classes = [MultiPartParser, FormParser]
+
+    def perform_create(self, serializer):
+        # The run_import_worker command picks the job up from the queue
+        serializer.save(uploaded_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+
+# Status, progress and outcome of an import job
+class ImportJobDetailView(generics.RetrieveAPIView):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
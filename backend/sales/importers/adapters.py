@@ -0,0 +1,325 @@
+from functools import partial
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from .bulk import as_key
+from .cleaning import (
+    capitalize, clean_name, expand_hospital, is_blank, parse_dates, parse_decimals, parse_integers,
+    parse_numbers, remove_part_ids, split_city_state_zip, strip_prefix, to_decimal,
+)
+
+# Registry of the vendor formats by vendor key
+FORMATS = {}
+
+
+def register(format_class):
+    """Class decorator adding a VendorFormat to the registry."""
+    FORMATS[format_class.vendor] = format_class()
+    return format_class
+
+
+class MissingColumns(KeyError):
+    """Raised when a file lacks columns its format needs."""
+
+
+class VendorFormat:
+    """
+    Declarative description of one manufacturer's sales export.
+
+    A format names its files, where the header row is, which source column feeds each
+    record key and how those columns are cleaned. Cleaning runs on whole columns, and the
+    rows that fail one of the required checks are rejected with that check's reason; dates
+    that couldn't be parsed are set to blank with a warning. Record keys starting with an
+    underscore are helper columns and don't end up in the records.
+
+    A sale line is identified by its invoice, product and line number. Formats map the
+    vendor's line number to 'line_number' where the files have one; otherwise lines are
+    numbered by the occurrence of their product on their invoice in the file.
+    """
+    vendor = None  # Registry key, also stored in the import manifest
+    brand_name = None
+    folder_path = None
+
+    # Where the data starts in the files, see readers.read_batches
+    skiprows = 0
+    header_marker = None
+
+    columns = {}  # Record key -> source column; files missing one of these are skipped
+    optional_columns = {}  # Record key -> (source column, value used when the file lacks the column)
+    constants = {}  # Record key -> value set on every record
+    coercions = {}  # Record key -> function cleaning that column, run in order
+    required = []  # (record keys or frame check, reason) in order; rows with blank keys or a True check are skipped
+
+    # Record keys rows are matched on, whose columns are read as text (see readers.read_batches)
+    key_columns = ['customer_number', 'invoice_number', 'product_code', 'line_number']
+
+    # How the BulkImporter treats this vendor's rows
+    match_accounts_by_name = True
+    update_account_fields = True
+
+    # Whether sell_price is the line's extended amount rather than the unit price, for the
+    # price and commission outlier checks of the validation stage
+    extended_prices = True
+
+    def clean(self, df):
+        """
+        Clean a DataFrame of rows into record dicts.
+
+        Returns the records, the (row, reason, source values) of every rejected row and
+        (row, message) warnings about values that were replaced.
+        """
+        df = df.rename(columns=lambda name: name.strip() if isinstance(name, str) else name)
+        missing = [source for source in self.columns.values() if source not in df.columns]
+        if missing:
+            raise MissingColumns(missing)
+
+        frame = pd.DataFrame({key: df[source] for key, source in self.columns.items()}, index=df.index)
+        for key, (source, default) in self.optional_columns.items():
+            frame[key] = df[source] if source in df.columns else default
+        for key, value in self.constants.items():
+            frame[key] = value
+        raw = {}
+        for key, coerce in self.coercions.items():
+            raw[key] = frame[key]
+            frame[key] = coerce(frame[key])
+
+        warnings = []
+        frame = self.derive(frame, warnings)
+
+        # The first failed check of each row is its skip reason
+        reasons = pd.Series(None, index=frame.index, dtype=object)
+        for check, reason in self.required:
+            if callable(check):
+                failed = check(frame).fillna(False).astype(bool)
+            else:
+                failed = pd.concat([is_blank(frame[key]) for key in check], axis=1).any(axis=1)
+            reasons = reasons.mask(reasons.isna() & failed, reason)
+        # Rows kept with a date that couldn't be parsed import it as blank, warned once per source column
+        sources = set()
+        for key, values in raw.items():
+            source = self.source_column(key)
+            if is_datetime64_any_dtype(frame[key]) and source not in sources:
+                sources.add(source)
+                failed = frame[key].isna() & ~is_blank(values) & reasons.isna()
+                warnings.extend((index + 1, f"unparseable '{source}' value, setting to blank") for index in frame.index[failed])
+
+        rejected = reasons.dropna()
+        skipped = [(index + 1, reason, values) for (index, reason), values
+                   in zip(rejected.items(), df.loc[rejected.index].to_dict('records'))]
+
+        frame = frame.loc[reasons.isna(), [key for key in frame.columns if not key.startswith('_')]]
+        frame = frame.astype(object).where(frame.notna(), None)
+        frame.insert(0, 'row', frame.index + 1)
+        return frame.to_dict('records'), skipped, warnings
+
+    def derive(self, frame, warnings):
+        """Fill in record keys that need several columns; formats override this as needed."""
+        return frame
+
+    @property
+    def text_columns(self):
+        """Names of the source columns of the key_columns."""
+        return sorted({self.source_column(key) for key in self.key_columns
+                       if key in self.columns or key in self.optional_columns})
+
+    def source_column(self, key):
+        """Name of the column a record key is read from."""
+        return self.columns.get(key) or self.optional_columns[key][0]
+
+    def number_lines(self, records, lines):
+        """
+        Set every record's 'occurrence', of its product on its invoice in the file, continuing
+        the counts in lines from the file's earlier batches. It numbers the records without a
+        vendor line number, and matches vendor lines to the sales stored before sales were
+        keyed on them, which were numbered that way (see BulkImporter.reconcile_legacy_lines).
+        """
+        for record in records:
+            key = (as_key(record['invoice_number']), as_key(record['product_code']))
+            lines[key] += 1
+            record['occurrence'] = lines[key]
+            if record.get('line_number') is None:
+                record['line_number'] = lines[key]
+
+
+@register
+class BossFormat(VendorFormat):
+    vendor = 'boss'
+    brand_name = 'Boss'
+    folder_path = 'files/boss/'
+
+    columns = {
+        'invoice_number': 'Inv#',
+        'invoice_date': 'Date',
+        'customer_number': 'C#',
+        'customer_name': 'Name',
+        '_city_state_zip': 'CSV',
+        'product_code': 'Item#',
+        'product_description': 'Desc',
+        'quantity_sold': 'Qty',
+        'sell_price': 'Ext Prc',
+        'commission_amount': 'Comm',
+        'commission_percentage': '%',
+    }
+    coercions = {
+        'customer_name': lambda names: expand_hospital(clean_name(names)),
+        'invoice_date': partial(parse_dates, formats=['%m/%d/%y', '%m/%d/%Y'], excel_serials=True),
+    }
+    required = [
+        (('customer_number', 'invoice_number'), "missing 'Customer Number' or 'Invoice Number'"),
+        (('customer_name',), "missing 'Name'"),
+        (('city', 'state', 'zip_code'), "invalid 'CSV' format"),
+        (('invoice_date',), "invalid 'Invoice Date'"),
+    ]
+
+    def derive(self, frame, warnings):
+        frame['city'], frame['state'], frame['zip_code'] = split_city_state_zip(frame['_city_state_zip'])
+        return frame
+
+
+@register
+class GraceFormat(VendorFormat):
+    vendor = 'grace'
+    brand_name = 'Grace'
+    folder_path = 'files/grace/'
+
+    # The header row is the one where 'Invoice Date' appears, preceding rows are skipped
+    header_marker = 'Invoice Date'
+
+    columns = {
+        'invoice_date': 'Invoice Date',
+        '_sales_rep': 'Sales Rep',
+        'sub_rep': 'Sub Rep',  # Resolved to a SalesRep when writing
+        '_customer_order': 'Customer Order',
+        'customer_number': 'Customer ID',
+        'customer_name': 'Customer Name',
+        'city': 'City',
+        'state': 'State',
+        'zip_code': 'ZIP',
+        '_country': 'Country',
+        'invoice_number': 'Invoice Number',
+        '_invoice_line': 'Invoice Line',
+        'product_code': 'Part ID',
+        '_product': 'Product',
+        '_reference': 'Reference',
+        'quantity_sold': 'Invoice Quantity',
+        'sell_price': 'Invoice Amount',
+        'commission_percentage': 'Comm Percentage',
+        'commission_amount': 'Commission Due',
+    }
+    optional_columns = {
+        'line_number': ('Invoice Line', None),
+    }
+    constants = {'sku_code': ''}
+    coercions = {
+        'line_number': parse_integers,
+        'customer_name': clean_name,
+        'sub_rep': clean_name,
+    }
+    required = [
+        (lambda frame: frame['_product'] == 'ZZ', "'ZZ' found in 'Product'"),
+        (('customer_number', 'invoice_number'), "missing 'Customer ID' or 'Invoice Number'"),
+        (('customer_name',), "missing 'Customer Name'"),
+        (lambda frame: frame['product_description'].isna(), "invalid 'Reference' or 'Part ID'"),
+        (lambda frame: frame['category'].isna(), "invalid 'Product'"),
+    ]
+
+    # Grace accounts are matched on Customer ID only and never updated
+    match_accounts_by_name = False
+    update_account_fields = False
+
+    def derive(self, frame, warnings):
+        # The reference without the part ID it usually starts with
+        frame['product_description'] = remove_part_ids(frame['_reference'], frame['product_code'])
+        # Category from the 'Product' column without the 'G-' prefix, in proper case
+        frame['category'] = capitalize(strip_prefix(frame['_product'], 'G-'))
+        return frame
+
+
+@register
+class HemostasisFormat(VendorFormat):
+    vendor = 'hemostasis'
+    brand_name = 'Hemostasis'
+    folder_path = 'files/hemostasis/'
+
+    # Skip first 4 rows to get the actual data
+    skiprows = 4
+    extended_prices = False  # 'Part Price' is per unit
+
+    columns = {
+        'customer_number': 'Order #',
+        'customer_name': 'Customer',
+        'city': 'City',
+        'state': 'State',
+        'product_code': 'Part',
+        'product_description': 'Description',
+        'invoice_number': 'Order #',
+        'invoice_date': 'Ship Date',
+        'quantity_sold': 'Quantity',
+        'sell_price': 'Part Price',
+    }
+    coercions = {
+        'quantity_sold': parse_integers,
+        'sell_price': parse_decimals,
+        'customer_name': lambda names: clean_name(names).fillna(''),
+        'city': lambda cities: capitalize(cities).fillna(''),
+        'invoice_date': partial(parse_dates, formats=['%Y-%m-%d']),
+    }
+    required = [
+        (('quantity_sold', 'sell_price'), "invalid 'Quantity' or 'Part Price'"),
+    ]
+
+
+@register
+class KirwanFormat(VendorFormat):
+    vendor = 'kirwan'
+    brand_name = 'Kirwan'
+    folder_path = 'files/kirwan/'
+
+    extended_prices = False  # 'Price' is per unit
+
+    # Amount columns, replaced by 0 when they hold something other than a number
+    amount_columns = {
+        'quantity_invoiced': 'Qty Invoiced',
+        'sell_price': 'Price',
+        'commission_amount': 'Commission Earned',
+        'commission_percentage': 'Slsp Comm Base',
+    }
+
+    columns = {
+        'customer_number': 'Customer',
+        'customer_name': 'Name',
+        'product_code': 'Item',
+        'product_description': 'Description',
+        'invoice_number': 'Invoice',
+        'invoice_date': 'Invoice Date',
+        'sale_date': 'Invoice Date',
+    }
+    optional_columns = {
+        'address': ('Address [2]', ''),
+        'city': ('Address [3]', ''),
+        'zip_code': ('Postal/ZIP', ''),
+        'phone_number': ('Phone', ''),
+        'customer_po': ('Cust PO', ''),
+        'ship_to_city': ('Address [3]', ''),
+        'ship_to_postal_code': ('Postal/ZIP', ''),
+        'line_number': ('Line', None),
+        **{key: (source, 0) for key, source in amount_columns.items()},
+    }
+    coercions = {
+        'line_number': parse_integers,
+        'customer_name': clean_name,
+        'invoice_date': parse_dates,
+        'sale_date': parse_dates,
+    }
+    required = [
+        (('customer_number', 'product_code'), "missing 'Customer' or 'Item'"),
+        (('customer_name',), "missing 'Name'"),
+        *(((key,), f"missing '{source}' value") for key, source in amount_columns.items()),
+    ]
+
+    def derive(self, frame, warnings):
+        for key, source in self.amount_columns.items():
+            numbers = parse_numbers(frame[key])
+            invalid = numbers.isna() & frame[key].notna()
+            warnings.extend((index + 1, f"invalid '{source}' value, setting to 0") for index in frame.index[invalid])
+            frame[key] = to_decimal(numbers.mask(invalid, 0))
+        return frame
@@ -0,0 +1,360 @@
+import os
+import pickle
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from functools import cached_property
+from io import StringIO
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from brands.models import Brand
+from sales.facts import refresh_sales_facts, sales_months
+from sales.models import DataVersion, ImportBatch, ImportedFile, QuarantinedRow, Sale
+from .adapters import FORMATS, MissingColumns
+from .bulk import AccountResolver, BulkImporter
+from .cache import cached_batches
+from .copy_loader import CopyImporter
+from .manifest import file_fingerprint, is_imported, record_checkpoint, record_import, resume_point
+from .readers import read_batches
+from .report import ImportReport
+from .validation import BatchValidator, plain_values
+
+
+class VendorImportCommand(BaseCommand):
+    """
+    Shared file loop for the vendor import commands.
+
+    Subclasses name their vendor, whose format in the adapters registry says where the files
+    are and how their rows are cleaned into records. Each file is streamed in batches of
+    batch_size rows. The records of every batch are checked by the BatchValidator and
+    written by the BulkImporter in a transaction of their own, together with the rows either
+    stage rejected, in the quarantine, and a checkpoint in the import manifest. Files whose
+    content the manifest already lists as imported are skipped, and with --resume an
+    interrupted file continues after its last committed batch.
+
+    Totals go to an ImportReport that is written as one summary at the end; the rows that
+    were skipped or created are only listed one by one with --verbosity 2. A dry run does
+    all the same work and rolls it back, so its summary shows exactly what would change.
+    """
+    vendor = None  # Key of the vendor's format in the adapters registry
+    batch_size = 5000  # Rows read, cleaned and written at a time
+
+    use_copy = False  # Write sales through the COPY staging loader (PostgreSQL only)
+    use_cache = True  # Read files parsed before from the parse cache
+    dry_run = False  # Roll back everything and leave the manifest alone
+    resume = False  # Continue interrupted files from their checkpoint
+    import_batch = None  # ImportBatch of the file being imported, the lineage of what it writes
+    stamped_invoices = frozenset()  # Ids of the stored invoices the file gave their sales rep
+    updated_accounts = frozenset()  # Ids of the stored accounts whose fields the file filled in
+    verbosity = 1
+
+    @cached_property
+    def format(self):
+        return FORMATS[self.vendor]
+
+    @cached_property
+    def report(self):
+        return ImportReport()
+
+    @cached_property
+    def validator(self):
+        return BatchValidator(self.format)
+
+    @cached_property
+    def account_resolver(self):
+        # Shared by every batch and file of the run, so accounts are loaded only once
+        return AccountResolver(self.format.match_accounts_by_name, self.format.update_account_fields)
+
+    def reset_resolvers(self):
+        """Drop the rows the run has cached; commands with resolvers of their own reset those too."""
+        self.account_resolver.reset()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-import files the manifest lists as already imported')
+        parser.add_argument('--copy', action='store_true', help='Load sales through a COPY staging table (PostgreSQL only)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be created, updated or skipped without writing anything')
+        parser.add_argument('--no-cache', action='store_true', help='Parse every file again instead of using the parse cache')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue files an earlier run didn\'t finish after their last committed batch')
+
+    def handle(self, *args, **kwargs):
+        self.configure(copy=kwargs.get('copy', False), dry_run=kwargs.get('dry_run', False),
+                       cache=not kwargs.get('no_cache', False), resume=kwargs.get('resume', False),
+                       verbosity=kwargs.get('verbosity', 1))
+        with dry_run_rollback(self.dry_run):
+            self.import_pending(kwargs.get('force', False))
+        self.write_summary()
+
+    def configure(self, copy=False, dry_run=False, cache=True, resume=False, verbosity=1):
+        if copy and connection.vendor != 'postgresql':
+            raise CommandError("--copy needs a PostgreSQL database")
+        self.use_copy = copy
+        self.dry_run = dry_run
+        self.use_cache = cache
+        self.resume = resume
+        self.verbosity = verbosity
+
+    def import_pending(self, force=False):
+        """Import every file of the vendor that still needs importing."""
+        brand = self.get_brand()
+        for file_path, content_hash, size, start_row in self.pending_files(force):
+            self.import_file(file_path, brand, content_hash, size, start_row)
+
+    def write_summary(self):
+        title = f"{self.format.brand_name} {'dry run' if self.dry_run else 'import'} summary:"
+        for line in self.report.summary(title):
+            self.stdout.write(line)
+
+    def get_brand(self):
+        brand, _ = Brand.objects.get_or_create(name=self.format.brand_name)
+        return brand
+
+    def pending_files(self, force=False):
+        """Return (file_path, content_hash, size, start_row) for every file that still needs importing."""
+        pending = []
+        for file_name in self.list_files():
+            file_path = os.path.join(self.format.folder_path, file_name)
+
+            # Skip files whose exact content was already imported
+            content_hash, size = file_fingerprint(file_path)
+            if not force and is_imported(file_path, content_hash):
+                self.report.files['unchanged'] += 1
+                if self.verbosity >= 2:
+                    self.stdout.write(f"Skipping unchanged file: {file_name}")
+                continue
+            start_row = resume_point(file_path, content_hash) if self.resume else 0
+            pending.append((file_path, content_hash, size, start_row))
+        return pending
+
+    def import_file(self, file_path, brand, content_hash, size, start_row=0, parse=None, progress=None):
+        """
+        Import one file from row start_row on, record the outcome in the import manifest and
+        return whether it succeeded.
+
+        Every batch is committed with a checkpoint, so a file that fails halfway keeps the
+        batches before the failure and --resume picks it up from there. What the file writes
+        is tagged with a new ImportBatch, and the MonthlySales facts of the months it wrote to
+        are refreshed at the end. parse(file_path, content_hash, start_row) yields the
+        (records, rejected rows, row_count) batches and defaults to parse_file; import_all
+        passes one that reads the batches a worker process parsed. progress(committed_rows) is
+        called after each committed batch.
+        """
+        file_name = os.path.basename(file_path)
+        self.stdout.write(f"Processing file: {file_name}")
+        if start_row:
+            self.stdout.write(f"Resuming after row {start_row}")
+        committed, created, updated, skipped = start_row, 0, 0, 0
+        self.import_batch = None
+        self.stamped_invoices, self.updated_accounts = set(), set()
+        try:
+            for records, rejected, rows in (parse or self.parse_file)(file_path, content_hash, start_row):
+                if records is None:
+                    # The file was reported while building records
+                    self.record_outcome(file_path, content_hash, size, ImportedFile.STATUS_FAILED,
+                                        committed, 'Missing expected columns', committed)
+                    return False
+
+                with transaction.atomic():
+                    if self.import_batch is None:
+                        self.import_batch = ImportBatch.objects.create(path=file_path, vendor=self.vendor,
+                                                                       content_hash=content_hash)
+                        if not start_row:
+                            # The file is imported from the top again, so are its rejected rows
+                            QuarantinedRow.objects.filter(import_batch__path=file_path).delete()
+                    records = self.validate_records(records, brand)
+                    self.quarantine(rejected)
+                    batch_created, batch_updated, batch_skipped = self.write_records(records, brand)
+                    if not self.dry_run:
+                        record_checkpoint(file_path, self.vendor, content_hash, size, committed + rows)
+                committed += rows
+                created += batch_created
+                updated += batch_updated
+                skipped += batch_skipped
+                if progress:
+                    progress(committed)
+
+            verb = 'Would import' if self.dry_run else 'Imported'
+            message = f"{verb} {created} sales from {file_name} ({updated} updated, {skipped} unchanged)"
+            if self.import_batch:
+                message += f" as batch {self.import_batch.pk}"
+            self.record_outcome(file_path, content_hash, size, ImportedFile.STATUS_SUCCESS, committed, message, committed)
+            self.stdout.write(message)
+            return True
+        except Exception as e:
+            # The batch's writes were rolled back, so the resolvers may hold rows that are gone
+            self.reset_resolvers()
+            self.record_outcome(file_path, content_hash, size, ImportedFile.STATUS_FAILED, committed, str(e), committed)
+            self.stdout.write(self.style.ERROR(f"Error processing file {file_name}: {e}"))
+            return False
+        finally:
+            self.refresh_facts()
+
+    def refresh_facts(self):
+        """
+        Recompute the MonthlySales facts of the months the file's committed sales fall in (all
+        the sales of the invoices it created), of the invoices it gave their sales rep and of
+        the accounts whose fields it filled in. Those are bulk writes that send no signals and
+        may leave the sales unchanged on their old batch. The data version is bumped either way,
+        so the response cache and ETags move on from what the file changed.
+        """
+        if self.import_batch is None or self.dry_run:
+            return
+        months = sales_months(Sale.objects.filter(Q(import_batch=self.import_batch) | Q(invoice__in=self.stamped_invoices)))
+        with self.report.phase('facts', 0):
+            self.report.rows['facts'] += refresh_sales_facts(months=months)
+            self.report.rows['facts'] += refresh_sales_facts(accounts=self.updated_accounts)
+        DataVersion.bump()
+
+    def record_outcome(self, file_path, content_hash, size, status, row_count, message, committed_rows):
+        """Count the file's outcome and, unless this is a dry run, record it in the import manifest."""
+        self.report.files['imported' if status == ImportedFile.STATUS_SUCCESS else 'failed'] += 1
+        if not self.dry_run:
+            record_import(file_path, self.vendor, content_hash, size, status, row_count, message, committed_rows)
+
+    def parse_file(self, file_path, content_hash=None, start_row=0):
+        """
+        Stream and clean one file, yielding (records, rejected rows, row_count) for every batch
+        of rows from row start_row on.
+
+        The rows before start_row were written by an earlier run. They are still read and
+        cleaned, as the lines numbered after them depend on them, but not yielded; the parse
+        cache makes reading them again cheap.
+        """
+        batches = self.read_file(file_path, content_hash)
+        lines = Counter()  # (invoice, product) -> lines numbered so far in this file
+        for df in self.report.timed('parse', batches):
+            with self.report.phase('clean', len(df)):
+                records, rejected = self.build_records(df)
+                if records is not None:
+                    self.format.number_lines(records, lines)
+                    records = [record for record in records if record['row'] > start_row]
+                    rejected = [row for row in rejected if row[0] > start_row]
+
+            rows = len(df) - min(max(start_row - df.index[0], 0), len(df))
+            if rows or records is None:
+                yield records, rejected, rows
+
+    def read_file(self, file_path, content_hash=None):
+        """Stream the raw batches of a file, through the parse cache when its content hash is known."""
+        options = (self.batch_size, self.format.skiprows, self.format.header_marker, self.format.text_columns)
+        if not self.use_cache or content_hash is None:
+            return read_batches(file_path, *options)
+        return cached_batches(file_path, content_hash, *options,
+                              on_hit=lambda hit: self.report.cache.update(['hits' if hit else 'misses']))
+
+    def list_files(self):
+        """List the spreadsheets in the vendor folder."""
+        return sorted(f for f in os.listdir(self.format.folder_path) if self.is_import_file(f))
+
+    @staticmethod
+    def is_import_file(file_name):
+        """Whether a file name is a spreadsheet to import, rather than a hidden system file (like ._ files)."""
+        return file_name.endswith(('.xlsx', '.csv')) and not file_name.startswith(('._', '.~lock'))
+
+    def build_records(self, df):
+        """
+        Clean the DataFrame into a list of record dicts with the vendor's format and the
+        (row, reason, values) of the rows it rejected; records is None to skip the file.
+        """
+        try:
+            records, rejected, warnings = self.format.clean(df)
+        except MissingColumns as e:
+            self.stdout.write(f"Error: Missing expected columns. {e}")
+            return None, []  # Skip this file and move to the next
+
+        self.count_rejected(rejected)
+        for row, message in warnings:
+            self.report.warn(message)
+            if self.verbosity >= 2:
+                self.stdout.write(self.style.WARNING(f"Row {row}: {message}"))
+        return records, rejected
+
+    def validate_records(self, records, brand):
+        """Return the records the BatchValidator accepts, quarantining the rest."""
+        with self.report.phase('validate', len(records)):
+            records, rejected = self.validator.validate(records, brand)
+        self.count_rejected(rejected)
+        self.quarantine(rejected)
+        return records
+
+    def count_rejected(self, rejected):
+        for row, reason, _ in rejected:
+            self.report.skip(reason)
+            if self.verbosity >= 2:
+                self.stdout.write(f"Row {row} quarantined: {reason}")
+
+    def quarantine(self, rejected):
+        """Store the (row, reason, values) of rejected rows in the quarantine, under the file's import batch."""
+        QuarantinedRow.objects.bulk_create([
+            QuarantinedRow(import_batch=self.import_batch, source_row=row, reason=reason[:255], values=plain_values(values))
+            for row, reason, values in rejected
+        ], batch_size=1000)
+
+    def write_records(self, records, brand):
+        """Write a batch of records and return (created, updated, skipped) sale counts."""
+        importer_class = CopyImporter if self.use_copy else BulkImporter
+        importer = importer_class(
+            brand,
+            match_accounts_by_name=self.format.match_accounts_by_name,
+            update_account_fields=self.format.update_account_fields,
+            log=self.stdout.write if self.verbosity >= 2 else None,
+            report=self.report,
+            account_resolver=self.account_resolver,
+            import_batch=self.import_batch,
+        )
+        counts = importer.run(records)
+        self.stamped_invoices |= importer.stamped_invoices
+        self.updated_accounts |= importer.updated_accounts
+        return counts
+
+
+@contextmanager
+def dry_run_rollback(dry_run):
+    """
+    On a dry run, run the block in a transaction that is rolled back at the end. The files
+    imported in the block still see each other's rows, as they would in a real run.
+    """
+    if not dry_run:
+        yield
+        return
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def parse_in_worker(command_class, file_path, content_hash, start_row=0, verbosity=1, use_cache=True):
+    """
+    Parse one file with a fresh command in a worker process.
+
+    The batches of parse_file are pickled one after another into a spool file, so neither
+    process holds a whole file. Returns the spool path, the output the command wrote and
+    its report of the parse and clean phases.
+    """
+    output = StringIO()
+    command = command_class(stdout=output)
+    command.verbosity = verbosity
+    command.use_cache = use_cache
+    spool = tempfile.NamedTemporaryFile(suffix='.pickle', delete=False)
+    try:
+        with spool:
+            for batch in command.parse_file(file_path, content_hash, start_row):
+                pickle.dump(batch, spool)
+    except Exception:
+        os.remove(spool.name)
+        raise
+    return spool.name, output.getvalue(), command.report
+
+
+def read_spool(spool_path):
+    """Yield the batches parse_in_worker spooled, removing the spool file afterwards."""
+    try:
+        with open(spool_path, 'rb') as spool:
+            while True:
+                try:
+                    yield pickle.load(spool)
+                except EOFError:
+                    return
+    finally:
+        os.remove(spool_path)
@@ -0,0 +1,460 @@
+import re
+import zlib
+from collections import defaultdict
+from django.db import connection, transaction
+from psycopg2.extras import execute_values
+from accounts.models import Account
+from sales.models import Sale, Invoice, Product, Category
+from .report import ImportReport
+
+# Optional Account fields a vendor record may carry besides the customer number and name
+ACCOUNT_FIELDS = ['address', 'city', 'state', 'zip_code', 'phone_number']
+
+# Sale fields copied straight from a record onto the new Sale row
+SALE_FIELDS = [
+    'quantity_sold', 'quantity_invoiced', 'sell_price', 'commission_percentage', 'commission_amount',
+    'ship_to_city', 'ship_to_state', 'ship_to_postal_code', 'sale_date',
+]
+
+# Sale fields derived from a record's values when it's written, see sale_values
+DERIVED_SALE_FIELDS = ['line_total']
+
+# Natural key of a sale line, enforced by the unique_sale_line constraint
+SALE_KEY = ['invoice_id', 'product_id', 'line_number']
+
+# Lineage of a sale line: the import batch that wrote it and its row in the file
+LINEAGE_COLUMNS = ['import_batch_id', 'source_row']
+
+# Offset of the line numbers stored sales are parked at while their lines are renumbered
+PARKED_LINES = 1000000
+
+# Abbreviations vendors use in customer names, matched as whole words after normalizing
+ABBREVIATIONS = {
+    'hosp': 'hospital',
+    'ctr': 'center',
+    'cntr': 'center',
+    'med': 'medical',
+    'mem': 'memorial',
+    'reg': 'regional',
+    'univ': 'university',
+    'assoc': 'associates',
+    '&': 'and',
+}
+
+def as_key(value):
+    """
+    Return the string a CharField stores for value, so lookups and map keys agree: without
+    surrounding spaces, and whole numbers without a '.0', however the reader typed them.
+    """
+    if value is None:
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    value = str(value).strip()
+    return value[:-2] if value.endswith('.0') and value[:-2].isdigit() else value
+
+
+def create_missing(model, objects, unique_field, batch_size=None):
+    """
+    Insert objects, leaving rows another import created concurrently alone, and return the
+    stored rows by unique_field value. Conflicting inserts wait for the other transaction and
+    are then skipped, so two imports never fail or duplicate on the same key.
+    """
+    if not objects:
+        return {}
+
+    model.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+    keys = [getattr(obj, unique_field) for obj in objects]
+    return {getattr(obj, unique_field): obj for obj in model.objects.filter(**{f'{unique_field}__in': keys})}
+
+
+def sale_values(record, sale_fields):
+    """
+    Return the database values of a record's sale_fields (the SALE_FIELDS), followed by
+    those of the DERIVED_SALE_FIELDS.
+    """
+    values = [field.get_db_prep_save(record.get(field.name), connection) for field in sale_fields]
+    line_total = Sale.line_total_of(record.get('sell_price'), record.get('quantity_invoiced'), record.get('quantity_sold'))
+    values.append(Sale._meta.get_field('line_total').get_db_prep_save(line_total, connection))
+    return values
+
+
+def upsert_sales_sql(source):
+    """
+    Build the statement all importers write sales with. It inserts the (SALE_KEY, customer_id,
+    SALE_FIELDS, DERIVED_SALE_FIELDS, LINEAGE_COLUMNS) rows of source, a VALUES list or a SELECT, and updates the
+    stored sale with the same natural key instead, unless none of its values change and it
+    already has a lineage. It returns whether each written row was inserted; source must not
+    repeat a key.
+    """
+    table = Sale._meta.db_table
+    columns = ['customer_id', *SALE_FIELDS, *DERIVED_SALE_FIELDS]
+    return f"""
+        INSERT INTO {table} ({', '.join(SALE_KEY + columns + LINEAGE_COLUMNS)})
+        {source}
+        ON CONFLICT ({', '.join(SALE_KEY)}) DO UPDATE
+        SET {', '.join(f'{column} = EXCLUDED.{column}' for column in columns + LINEAGE_COLUMNS)}
+        WHERE ({', '.join(f'{table}.{column}' for column in columns)})
+            IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in columns)})
+            OR {table}.import_batch_id IS NULL
+        RETURNING (xmax = 0) AS inserted
+    """
+
+
+def count_upserts(inserted, total):
+    """Turn the rows upsert_sales_sql returned for total records into (created, updated, skipped)."""
+    created = sum(1 for row in inserted if row[0])
+    return created, len(inserted) - created, total - len(inserted)
+
+
+def lock_model(model):
+    """Hold a transaction-level advisory lock on model's table, serializing imports that create its rows."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(model._meta.db_table.encode())])
+
+
+def normalize_name(name):
+    """
+    Reduce a customer name to the form accounts are matched on: lowercase, without
+    punctuation, with single spaces and abbreviations spelled out, so 'St. Mary's Hosp'
+    and 'St Marys Hospital' match.
+    """
+    if not name:
+        return ''
+    words = re.sub(r"[.'’]", '', name.lower()).replace('&', ' & ')
+    words = re.sub(r'[^a-z0-9&]+', ' ', words).split()
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+class AccountResolver:
+    """
+    Map customer numbers to Accounts from an index loaded once per run.
+
+    The first resolve loads every account's customer number and normalized name, and later
+    batches and files look their customers up in memory. A customer number that isn't
+    stored goes to the account with the same normalized name, if matching by name is on,
+    and keeps that account for the rest of the run. Only empty fields a record has a value
+    for are filled in, and they are written with one bulk_update per field.
+
+    The index follows what the run writes, so reset it when a transaction it saw writes in
+    is rolled back.
+    """
+
+    def __init__(self, match_by_name=True, update_fields=True, chunk_size=1000):
+        self.match_by_name = match_by_name
+        self.update_fields = update_fields
+        self.chunk_size = chunk_size
+        self.by_number = None
+        self.by_name = None
+
+    def reset(self):
+        """Drop the index, it's reloaded on the next resolve."""
+        self.by_number = None
+        self.by_name = None
+
+    def load(self):
+        self.by_number, self.by_name = {}, {}
+        for account in Account.objects.only('customer_number', 'name', *ACCOUNT_FIELDS).order_by('pk'):
+            self.by_number[account.customer_number] = account
+            self.index_name(account)
+
+    def index_name(self, account):
+        # The oldest account with a name wins, like the first match of a name lookup
+        key = normalize_name(account.name)
+        if key:
+            self.by_name.setdefault(key, account)
+
+    def resolve(self, records):
+        """
+        Map every customer number in records to an Account, creating or filling in as needed.
+
+        Returns the map, the accounts that were created and the ones that were updated.
+        """
+        if self.by_number is None:
+            self.load()
+
+        accounts, new_accounts, changed_accounts = {}, [], {}
+        for record in records:
+            number = as_key(record['customer_number'])
+            account = accounts.get(number) or self.by_number.get(number)
+            if account is None and self.match_by_name:
+                account = self.by_name.get(normalize_name(record['customer_name']))
+
+            if account is None:
+                account = Account(customer_number=number, name=record['customer_name'])
+                for field in ACCOUNT_FIELDS:
+                    if field in record:
+                        setattr(account, field, record[field])
+                new_accounts.append(account)
+                if self.match_by_name:
+                    self.index_name(account)
+            elif self.update_fields:
+                # Fill in only the fields that are still empty
+                for field in ACCOUNT_FIELDS:
+                    if record.get(field) and not getattr(account, field):
+                        setattr(account, field, record[field])
+                        if account.pk:
+                            changed_accounts.setdefault(field, {})[account.pk] = account
+
+            accounts[number] = account
+
+        # Swap in the stored rows, which may come from an import that created them concurrently
+        created = create_missing(Account, new_accounts, 'customer_number', self.chunk_size)
+        for number, account in accounts.items():
+            if account.pk is None:
+                accounts[number] = created[account.customer_number]
+        for key, account in self.by_name.items():
+            if account.pk is None:
+                self.by_name[key] = created[account.customer_number]
+        self.by_number.update(accounts)
+
+        # Write each filled-in field on its own, so fields other imports filled meanwhile are kept
+        for field, changed in changed_accounts.items():
+            Account.objects.bulk_update(changed.values(), [field], batch_size=self.chunk_size)
+
+        updated = list({account.pk: account for changed in changed_accounts.values() for account in changed.values()}.values())
+        return accounts, new_accounts, updated
+
+
+class BulkImporter:
+    """
+    Write the cleaned rows of one vendor file with a handful of set-based queries.
+
+    Each record is a dict holding the account, invoice, product and sale values of one
+    spreadsheet line. Accounts are resolved by an AccountResolver, which a command shares
+    between the batches and files of a run. Categories, products and invoices are resolved
+    for the whole batch up front into in-memory key maps, missing ones are created with
+    bulk_create, and the Sale rows are upserted on their natural key (invoice, product, line
+    number) in chunks, so importing a file again doesn't duplicate its sales; those stored
+    before sales were keyed on their line are renumbered to it first. New invoices
+    and written sales record the import_batch and their row in the file, and the stored totals
+    of the batch's invoices are recomputed once its sales are written. What was created,
+    updated or skipped is counted in an ImportReport.
+    """
+
+    def __init__(self, brand, match_accounts_by_name=True, update_account_fields=True, chunk_size=1000,
+                 log=None, report=None, account_resolver=None, import_batch=None):
+        self.brand = brand
+        self.import_batch = import_batch
+        self.match_accounts_by_name = match_accounts_by_name
+        self.update_account_fields = update_account_fields
+        self.chunk_size = chunk_size
+        self.log = log  # Callable reporting new rows one by one, e.g. a command's stdout.write
+        self.report = report or ImportReport()
+        self.account_resolver = account_resolver or AccountResolver(match_accounts_by_name, update_account_fields, chunk_size)
+        self.stamped_invoices = set()  # Ids of the stored invoices given their sales rep, whose sales' facts change
+        self.updated_accounts = set()  # Ids of the stored accounts whose empty fields were filled in
+
+    def run(self, records):
+        """Import the records in one transaction and return (created, updated, skipped) sale counts."""
+        with transaction.atomic():
+            with self.report.phase('resolve', len(records)):
+                accounts = self.resolve_accounts(records)
+                categories = self.resolve_categories(records)
+                products = self.resolve_products(records, categories)
+                invoices, stamped = self.resolve_invoices(records, accounts)
+                self.stamped_invoices |= stamped
+            with self.report.phase('write', len(records)):
+                self.reconcile_legacy_lines(records, products, invoices)
+                created, updated, skipped = self.write_sales(records, accounts, products, invoices)
+                Invoice.refresh_totals({invoice.pk for invoice in invoices.values()})
+
+        self.report.count('sales', 'created', created)
+        self.report.count('sales', 'updated', updated)
+        self.report.count('sales', 'unchanged', skipped)
+        return created, updated, skipped
+
+    def log_new(self, kind, keys):
+        """Report the rows about to be created, one line each, when the caller asked for them."""
+        if self.log:
+            for key in keys:
+                self.log(f"New {kind}: {key}")
+
+    def resolve_accounts(self, records):
+        """Map every customer number in records to an Account, creating or filling in as needed."""
+        accounts, new_accounts, updated_accounts = self.account_resolver.resolve(records)
+        self.updated_accounts.update(account.pk for account in updated_accounts)
+        self.log_new('account', [account.customer_number for account in new_accounts])
+        self.report.count('accounts', 'created', len(new_accounts))
+        self.report.count('accounts', 'updated', len(updated_accounts))
+        return accounts
+
+    def resolve_categories(self, records):
+        """Map every category name in records to a Category, creating the missing ones."""
+        names = {record['category'] for record in records if record.get('category')}
+        if not names:
+            return {}
+
+        categories = {category.name: category for category in Category.objects.filter(name__in=names)}
+        new_categories = [Category(name=name) for name in names if name not in categories]
+        self.log_new('category', [category.name for category in new_categories])
+        self.report.count('categories', 'created', len(new_categories))
+        categories.update(create_missing(Category, new_categories, 'name'))
+        return categories
+
+    def resolve_products(self, records, categories):
+        """Map every product code in records to a Product, creating the missing ones for this brand."""
+        # Product codes aren't unique in the database, so concurrent imports take turns creating them
+        lock_model(Product)
+
+        codes = {as_key(record['product_code']) for record in records}
+        products = {}
+        for product in Product.objects.filter(product_code__in=codes).order_by('pk'):
+            products.setdefault(product.product_code, product)
+
+        new_products = []
+        for record in records:
+            code = as_key(record['product_code'])
+            if code in products:
+                continue
+            product = Product(
+                product_code=code,
+                product_description=record.get('product_description'),
+                sku_code=record.get('sku_code'),
+                brand=self.brand,
+                category=categories.get(record.get('category')),
+            )
+            products[code] = product
+            new_products.append(product)
+
+        self.log_new('product', [product.product_code for product in new_products])
+        self.report.count('products', 'created', len(new_products))
+        Product.objects.bulk_create(new_products, batch_size=self.chunk_size)
+        return products
+
+    def resolve_invoices(self, records, accounts):
+        """
+        Map every invoice number in records to an Invoice, creating the missing ones and giving
+        stored ones without a sales rep the record's. Returns the map and the ids of the stored
+        invoices given a sales rep: bulk_update sends no signals, so the caller refreshes their facts.
+        """
+        numbers = {as_key(record['invoice_number']) for record in records}
+        invoices = {invoice.invoice_number: invoice for invoice in Invoice.objects.filter(invoice_number__in=numbers)}
+
+        new_invoices = []
+        stamped = {}  # Invoice number -> stored invoice given the sales rep it was missing
+        for record in records:
+            number = as_key(record['invoice_number'])
+            if number in invoices:
+                invoice = invoices[number]
+                if invoice.sales_rep_id is None and record.get('sales_rep'):
+                    invoice.sales_rep = record['sales_rep']
+                    if invoice.pk:
+                        stamped[number] = invoice
+                continue
+            invoice = Invoice(
+                invoice_number=number,
+                invoice_date=record.get('invoice_date'),
+                customer_po=record.get('customer_po'),
+                sales_rep=record.get('sales_rep'),
+                account=accounts[as_key(record['customer_number'])],
+                import_batch=self.import_batch,
+                source_row=record.get('row'),
+            )
+            invoices[number] = invoice
+            new_invoices.append(invoice)
+
+        self.log_new('invoice', [invoice.invoice_number for invoice in new_invoices])
+        self.report.count('invoices', 'created', len(new_invoices))
+        self.report.count('invoices', 'updated', len(stamped))
+        Invoice.objects.bulk_update(stamped.values(), ['sales_rep'], batch_size=self.chunk_size)
+        invoices.update(create_missing(Invoice, new_invoices, 'invoice_number', self.chunk_size))
+        return invoices, {invoice.pk for invoice in stamped.values()}
+
+    def reconcile_legacy_lines(self, records, products, invoices):
+        """
+        Give the sales stored before sales were keyed on their line (those without an import
+        batch) the line number of the record they were imported from, so the upsert updates
+        them instead of adding the vendor's lines a second time.
+
+        Those sales were numbered by the occurrence of their product on their invoice, so the
+        sale numbered like a record's 'occurrence' is the record's line. Sales whose number
+        another is moved to are parked past PARKED_LINES, keeping their occurrence, until their
+        own record comes; one whose line is already stored with a batch is a duplicate and
+        deleted. The upsert then gives the reconciled sales their lineage, so each is
+        reconciled once.
+        """
+        legacy = Sale.objects.filter(import_batch__isnull=True,
+                                     invoice__in={invoice.pk for invoice in invoices.values()})
+        legacy = {(sale.invoice_id, sale.product_id, sale.line_number % PARKED_LINES): sale
+                  for sale in legacy.only('invoice_id', 'product_id', 'line_number')}
+        if not legacy:
+            return
+
+        # Every stored line of the invoices and products concerned: (invoice, product) -> line -> sale
+        groups = {(invoice, product) for invoice, product, _ in legacy}
+        stored = defaultdict(dict)
+        for sale in Sale.objects.filter(invoice__in={invoice for invoice, _ in groups},
+                                        product__in={product for _, product in groups}).only(
+                'invoice_id', 'product_id', 'line_number', 'import_batch_id'):
+            stored[sale.invoice_id, sale.product_id][sale.line_number] = sale
+
+        moves = {}  # Sale id -> (sale, line number it moves to, or None to park it)
+        taken = defaultdict(set)  # (invoice, product) -> line numbers sales move to
+        duplicates = []
+        for record in records:
+            group = (invoices[as_key(record['invoice_number'])].pk, products[as_key(record['product_code'])].pk)
+            sale = legacy.get((*group, record['occurrence']))
+            line_number = record.get('line_number') or 1
+            if sale is None or moves.get(sale.pk, (None, None))[1] is not None:
+                continue
+
+            holder = stored[group].get(line_number)
+            if holder is not None and holder.pk == sale.pk:
+                holder = None
+                if sale.pk not in moves:
+                    continue  # Already numbered like the vendor's line
+            if line_number in taken[group] or holder is not None and holder.import_batch_id is not None:
+                # The line is stored already, this sale is a second copy of it
+                duplicates.append(sale.pk)
+                moves.pop(sale.pk, None)
+                continue
+            if holder is not None and holder.pk not in moves:
+                moves[holder.pk] = (holder, None)
+            moves[sale.pk] = (sale, line_number)
+            taken[group].add(line_number)
+
+        if duplicates:
+            Sale.objects.filter(pk__in=duplicates).delete()
+            self.report.count('sales', 'deleted as duplicates', len(duplicates))
+        if not moves:
+            return
+
+        # Park the sales first, so no two share a line number in between
+        for sale, _ in moves.values():
+            sale.line_number = PARKED_LINES + sale.line_number % PARKED_LINES
+        Sale.objects.bulk_update([sale for sale, _ in moves.values()], ['line_number'], batch_size=self.chunk_size)
+        moved = []
+        for sale, line_number in moves.values():
+            if line_number is not None:
+                sale.line_number = line_number
+                moved.append(sale)
+        Sale.objects.bulk_update(moved, ['line_number'], batch_size=self.chunk_size)
+        self.report.count('sales', 'renumbered', len(moved))
+
+    def write_sales(self, records, accounts, products, invoices):
+        """Upsert a Sale for every record and return (created, updated, unchanged) counts."""
+        line_field = Sale._meta.get_field('line_number')
+        sale_fields = [Sale._meta.get_field(field) for field in SALE_FIELDS]
+
+        # A line repeated in the batch is written once, with its last values
+        rows = {}
+        for record in records:
+            key = (
+                invoices[as_key(record['invoice_number'])].pk,
+                products[as_key(record['product_code'])].pk,
+                line_field.get_db_prep_save(record.get('line_number') or 1, connection),
+            )
+            rows[key] = (
+                *key,
+                accounts[as_key(record['customer_number'])].pk,
+                *sale_values(record, sale_fields),
+                self.import_batch and self.import_batch.pk,
+                record.get('row'),
+            )
+
+        with connection.cursor() as cursor:
+            inserted = execute_values(cursor.cursor, upsert_sales_sql('VALUES %s'), list(rows.values()),
+                                      page_size=self.chunk_size, fetch=True)
+        return count_upserts(inserted, len(records))
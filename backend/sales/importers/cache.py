@@ -0,0 +1,102 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from django.conf import settings
+from .readers import read_batches
+
+# Bump when the readers change what they return, so older cache entries are ignored
+READER_VERSION = 2
+
+
+def cache_key(content_hash, batch_size, skiprows, header_marker, text_columns=()):
+    """Key of a file's parsed batches: its content and the options it was read with."""
+    options = f'{READER_VERSION}|{content_hash}|{batch_size}|{skiprows}|{header_marker}|{sorted(text_columns)}'
+    return hashlib.sha256(options.encode()).hexdigest()
+
+
+def cache_path(key):
+    return os.path.join(settings.IMPORT_CACHE_DIR, f'{key}.pickle')
+
+
+def cached_batches(file_path, content_hash, batch_size, skiprows=0, header_marker=None, text_columns=(), on_hit=None):
+    """
+    Yield the batches of read_batches, from the parse cache when the same file content was
+    read with the same options before.
+
+    The raw DataFrames are stored before any cleaning, so changes to the vendor formats
+    take effect without reparsing. They are pickled rather than written to Parquet or
+    Feather, since their object columns mix dates, numbers and text, which Arrow can't
+    round-trip as the cleaning expects them. on_hit is called with whether the file was
+    found in the cache.
+    """
+    path = cache_path(cache_key(content_hash, batch_size, skiprows, header_marker, text_columns))
+    if os.path.exists(path):
+        if on_hit:
+            on_hit(True)
+        os.utime(path)  # Mark as recently used for eviction
+        yield from read_cache(path)
+        return
+
+    if on_hit:
+        on_hit(False)
+    os.makedirs(settings.IMPORT_CACHE_DIR, exist_ok=True)
+    entry = tempfile.NamedTemporaryFile(dir=settings.IMPORT_CACHE_DIR, suffix='.tmp', delete=False)
+    try:
+        with entry:
+            for df in read_batches(file_path, batch_size, skiprows, header_marker, text_columns):
+                pickle.dump(df, entry, protocol=pickle.HIGHEST_PROTOCOL)
+                yield df
+    except BaseException:
+        # Only files that were read to the end are cached
+        os.remove(entry.name)
+        raise
+
+    os.replace(entry.name, path)
+    evict(settings.IMPORT_CACHE_MAX_BYTES)
+
+
+def read_cache(path):
+    with open(path, 'rb') as entry:
+        while True:
+            try:
+                yield pickle.load(entry)
+            except EOFError:
+                return
+
+
+def cache_entries():
+    """Return the (path, size, last used) of every cache entry, least recently used first."""
+    if not os.path.isdir(settings.IMPORT_CACHE_DIR):
+        return []
+    entries = []
+    for entry in os.scandir(settings.IMPORT_CACHE_DIR):
+        if entry.is_file() and entry.name.endswith('.pickle'):
+            stat = entry.stat()
+            entries.append((entry.path, stat.st_size, stat.st_mtime))
+    return sorted(entries, key=lambda entry: entry[2])
+
+
+def evict(max_bytes):
+    """Remove the least recently used entries until the cache fits in max_bytes."""
+    entries = cache_entries()
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Evicted by a concurrent import
+        total -= size
+
+
+def clear_cache():
+    """Remove every cache entry and return how many there were and their total size."""
+    entries = cache_entries()
+    for path, _, _ in entries:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return len(entries), sum(size for _, size, _ in entries)
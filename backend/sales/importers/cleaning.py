@@ -0,0 +1,106 @@
+from datetime import datetime
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_object_dtype, is_string_dtype
+
+# Column-wise cleaning helpers for the vendor formats. Each takes a Series and returns a
+# cleaned Series with the same index, leaving NaN where a value can't be cleaned.
+
+
+def as_text(series):
+    """Return series ready for .str methods; a column without any text becomes all NaN."""
+    if is_object_dtype(series) or is_string_dtype(series):
+        return series
+    return pd.Series(float('nan'), index=series.index, dtype=object)
+
+
+def clean_name(series):
+    """Remove periods and commas and capitalize each word."""
+    return as_text(series).str.replace('.', '', regex=False).str.replace(',', '', regex=False).str.title()
+
+
+def expand_hospital(series):
+    """Spell out the 'Hosp' abbreviation in names that don't already say 'Hospital'."""
+    return series.where(series.str.contains('Hospital', regex=False),
+                        series.str.replace('Hosp', 'Hospital', regex=False))
+
+
+def capitalize(series):
+    """Capitalize the first letter and lowercase the rest."""
+    return as_text(series).str.capitalize()
+
+
+def strip_prefix(series, prefix):
+    """Remove prefix from the values that start with it."""
+    text = as_text(series)
+    return text.where(~text.str.startswith(prefix, na=False), text.str[len(prefix):])
+
+
+def remove_part_ids(references, part_ids):
+    """Remove each row's part ID and any leading dash from its reference; NaN unless both are text."""
+    cleaned = pd.Series(
+        [reference.replace(part_id, '') if isinstance(reference, str) and isinstance(part_id, str) else None
+         for reference, part_id in zip(references, part_ids)],
+        index=references.index, dtype=object,
+    ).str.strip()
+    return cleaned.where(~cleaned.str.startswith('-', na=False), cleaned.str.lstrip('-').str.strip())
+
+
+def split_city_state_zip(series):
+    """
+    Split 'City, State Zip' values into city, state and zip Series, with NaN for the parts
+    a value doesn't have.
+    """
+    city_state_zip = as_text(series).str.extract(r'^([^,]*),([^,]*)$')
+    state_zip = city_state_zip[1].str.strip().str.extract(r'^(?:(.*) )?([^ ]*)$')
+    return city_state_zip[0].str.strip(), state_zip[0].str.strip(), state_zip[1].str.strip()
+
+
+def parse_dates(series, formats=None, excel_serials=False):
+    """
+    Parse a column into Timestamps, NaT where a value isn't a date.
+
+    Dates pass through, text is parsed with each of formats in turn (any format when None)
+    and, with excel_serials, numbers are read as Excel serial day counts.
+    """
+    if is_datetime64_any_dtype(series):
+        return series
+
+    is_date = series.map(lambda value: isinstance(value, datetime))
+    is_text = series.map(lambda value: isinstance(value, str))
+    dates = pd.to_datetime(series.where(is_date), errors='coerce')
+
+    text = series.where(is_text)
+    for date_format in formats or ['mixed']:
+        dates = dates.fillna(pd.to_datetime(text, format=date_format, errors='coerce'))
+
+    if excel_serials:
+        numbers = pd.to_numeric(series.where(~is_date & ~is_text), errors='coerce')
+        dates = dates.fillna(pd.to_datetime(numbers, unit='D', origin='1899-12-30', errors='coerce'))
+    return dates
+
+
+def parse_numbers(series):
+    """Parse a column into floats, NaN where a value isn't a number."""
+    return pd.to_numeric(series, errors='coerce')
+
+
+def parse_integers(series):
+    """Parse a column into whole numbers, truncating fractions, NaN where a value isn't a number."""
+    return np.trunc(parse_numbers(series))
+
+
+def to_decimal(series):
+    """Convert a column of numbers to Decimals, keeping NaN."""
+    return series.map(lambda value: value if pd.isna(value) else Decimal(value))
+
+
+def parse_decimals(series):
+    """Parse a column into Decimals, NaN where a value isn't a number."""
+    return to_decimal(parse_numbers(series))
+
+
+def is_blank(series):
+    """Mark the values that are missing or empty strings."""
+    return series.isna() | (series.astype(object) == '')
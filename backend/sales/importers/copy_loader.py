@@ -0,0 +1,103 @@
+from io import StringIO
+from django.db import connection
+from accounts.models import Account
+from sales.models import Sale, Invoice, Product
+from .bulk import BulkImporter, DERIVED_SALE_FIELDS, SALE_FIELDS, as_key, count_upserts, sale_values, upsert_sales_sql
+
+# Staging table the rows of one batch are copied into. Temporary tables are never WAL-logged,
+# like unlogged ones, and are private to the session so concurrent imports can't collide.
+STAGING_TABLE = 'sales_sale_staging'
+
+
+def copy_value(value):
+    """Format a database value for COPY's text format."""
+    if value is None:
+        return r'\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class CopyImporter(BulkImporter):
+    """
+    BulkImporter that writes the sales of a batch with PostgreSQL's COPY.
+
+    Accounts, categories, products and invoices are still resolved by the BulkImporter. The
+    sale rows are then copied into a staging table with their customer's id, product code,
+    invoice number, line number and lineage, and one INSERT ... SELECT resolves those keys
+    to ids with joins and upserts the rows like the BulkImporter does.
+    """
+
+    def write_sales(self, records, accounts, products, invoices):
+        """Copy the records into the staging table and upsert them into sales_sale in one statement."""
+        with connection.cursor() as cursor:
+            self.create_staging_table(cursor)
+            self.copy_records(cursor, records, accounts)
+            cursor.execute(self.insert_sql())
+            inserted = cursor.fetchall()
+        return count_upserts(inserted, len(records))
+
+    def staging_columns(self):
+        """Return the (name, db type) of the staging table's columns."""
+        columns = [
+            ('seq', 'integer'),
+            ('customer_id', Account._meta.pk.db_type(connection)),
+            ('product_code', Product._meta.get_field('product_code').db_type(connection)),
+            ('invoice_number', Invoice._meta.get_field('invoice_number').db_type(connection)),
+            ('line_number', Sale._meta.get_field('line_number').db_type(connection)),
+            ('import_batch_id', Sale._meta.get_field('import_batch').db_type(connection)),
+            ('source_row', Sale._meta.get_field('source_row').db_type(connection)),
+        ]
+        columns.extend((field, Sale._meta.get_field(field).db_type(connection))
+                       for field in SALE_FIELDS + DERIVED_SALE_FIELDS)
+        return columns
+
+    def create_staging_table(self, cursor):
+        """Create the session's staging table for this transaction, or empty it for the next batch."""
+        columns = ', '.join(f'{name} {db_type}' for name, db_type in self.staging_columns())
+        cursor.execute(f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} ({columns}) ON COMMIT DROP')
+        cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+
+    def copy_records(self, cursor, records, accounts):
+        """Stream the records into the staging table with COPY."""
+        line_field = Sale._meta.get_field('line_number')
+        sale_fields = [Sale._meta.get_field(field) for field in SALE_FIELDS]
+        buffer = StringIO()
+        for seq, record in enumerate(records):
+            values = [
+                seq,
+                accounts[as_key(record['customer_number'])].pk,
+                as_key(record['product_code']),
+                as_key(record['invoice_number']),
+                line_field.get_db_prep_save(record.get('line_number') or 1, connection),
+                self.import_batch and self.import_batch.pk,
+                record.get('row'),
+            ]
+            # Prepare the values exactly as the ORM would for an insert
+            values.extend(sale_values(record, sale_fields))
+            buffer.write('\t'.join(copy_value(value) for value in values) + '\n')
+
+        buffer.seek(0)
+        columns = ', '.join(name for name, _ in self.staging_columns())
+        cursor.copy_expert(f'COPY {STAGING_TABLE} ({columns}) FROM STDIN', buffer)
+
+    def insert_sql(self):
+        """Build the INSERT ... SELECT that resolves the staged keys and upserts the sales."""
+        fields = ', '.join(SALE_FIELDS + DERIVED_SALE_FIELDS)
+
+        # A line repeated in the batch is written once, with its last values
+        resolved = f"""
+            SELECT DISTINCT ON (i.id, p.id, s.line_number)
+                s.seq, i.id AS invoice_id, p.id AS product_id, s.line_number, s.customer_id, {fields},
+                s.import_batch_id, s.source_row
+            FROM {STAGING_TABLE} s
+            JOIN {Invoice._meta.db_table} i ON i.invoice_number = s.invoice_number
+            JOIN LATERAL (
+                SELECT id FROM {Product._meta.db_table}
+                WHERE product_code = s.product_code ORDER BY id LIMIT 1
+            ) p ON true
+            ORDER BY i.id, p.id, s.line_number, s.seq DESC"""
+
+        return upsert_sales_sql(
+            f'SELECT invoice_id, product_id, line_number, customer_id, {fields}, import_batch_id, source_row '
+            f'FROM ({resolved}) r ORDER BY seq'
+        )
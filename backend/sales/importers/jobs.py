@@ -0,0 +1,77 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import load_command_class
+from django.core.management.base import OutputWrapper
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from sales.models import ImportJob
+from .manifest import file_fingerprint, resume_point
+
+# How long a running job may go without saving progress before its worker is taken for dead
+STALE_AFTER = timedelta(minutes=30)
+
+
+def requeue_stale_jobs(stale_after=STALE_AFTER):
+    """
+    Queue again the running jobs that saved no progress for stale_after, whose worker
+    crashed or was killed, and return how many there were. They are saved after every
+    committed batch, so stale_after must be longer than the slowest batch takes.
+    """
+    cutoff = timezone.now() - stale_after
+    return ImportJob.objects.filter(
+        Q(updated_at__lt=cutoff) | Q(updated_at__isnull=True, started_at__lt=cutoff),
+        status=ImportJob.STATUS_RUNNING,
+    ).update(status=ImportJob.STATUS_QUEUED, updated_at=timezone.now())
+
+
+def claim_next_job(stale_after=STALE_AFTER):
+    """
+    Mark the oldest queued job as running and return it, or None when the queue is empty.
+    Rows locked by another worker are skipped, so several workers can share the queue.
+    Stale running jobs are queued again first (see requeue_stale_jobs).
+    """
+    requeue_stale_jobs(stale_after)
+    with transaction.atomic():
+        job = (ImportJob.objects.select_for_update(skip_locked=True)
+               .filter(status=ImportJob.STATUS_QUEUED).order_by('created_at').first())
+        if job is None:
+            return None
+        job.status = ImportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+def run_job(job, stdout=None):
+    """Import the job's file with its vendor's import command and store the outcome on the job."""
+    command = load_command_class('sales', f'import_{job.vendor}')
+    output = StringIO()
+    command.stdout = OutputWrapper(output)
+    command.configure()
+
+    def save_progress(committed_rows):
+        # The status endpoint shows the phase timings and counts so far
+        job.report = command.report.as_dict()
+        job.save(update_fields=['report', 'updated_at'])
+
+    try:
+        content_hash, size = file_fingerprint(job.path)
+        # A job queued again after its worker died continues after its last committed batch
+        start_row = resume_point(job.path, content_hash)
+        succeeded = command.import_file(job.path, command.get_brand(), content_hash, size, start_row,
+                                        progress=save_progress)
+        lines = output.getvalue().strip().splitlines()
+        job.message = lines[-1] if lines else None
+    except Exception as e:
+        succeeded = False
+        job.message = str(e)
+
+    job.status = ImportJob.STATUS_SUCCESS if succeeded else ImportJob.STATUS_FAILED
+    job.import_batch = command.import_batch
+    job.report = command.report.as_dict()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'import_batch', 'report', 'message', 'finished_at', 'updated_at'])
+    if stdout:
+        stdout.write(output.getvalue())
+    return job
@@ -0,0 +1,56 @@
+from sales.facts import refresh_sales_facts, sales_months
+from sales.models import ImportBatch, ImportedFile, Invoice, Sale
+
+
+def delete_batches(batches):
+    """
+    Delete the sales the import batches wrote and the invoices they created that no longer
+    have sales, each in one set-based DELETE, then refresh the totals of the invoices left and
+    the MonthlySales facts of the months they were in. Returns the number of sales and
+    invoices deleted.
+
+    Sales belong to the batch that wrote them last, so lines a later import updated are kept.
+    """
+    sales = Sale.objects.filter(import_batch__in=batches)
+    months = sales_months(sales)
+    invoice_ids = set(sales.values_list('invoice', flat=True).distinct().order_by())
+    # Nothing cascades from sales, and the totals and facts are refreshed below rather than
+    # by the per-sale delete signals, so the sales don't need to be collected first
+    sales = sales._raw_delete(sales.db)
+    invoices = Invoice.objects.filter(import_batch__in=batches, sales__isnull=True)
+    invoices = invoices._raw_delete(invoices.db)
+    Invoice.refresh_totals(invoice_ids - {None})
+    refresh_sales_facts(months=months)
+    return sales, invoices
+
+
+def delete_legacy_sales(batch):
+    """
+    Delete the sales stored before lineage existed (without an import batch) on the invoices
+    the import batch wrote sales to, then refresh the totals and MonthlySales facts they were
+    in. Returns the number of sales deleted.
+
+    An import stamps the legacy sales it writes again with its batch, so after a fresh import
+    of a file the legacy sales left on its invoices are lines the file no longer has.
+    """
+    invoices = Sale.objects.filter(import_batch=batch).values('invoice')
+    sales = Sale.objects.filter(import_batch__isnull=True, invoice__in=invoices)
+    months = sales_months(sales)
+    invoice_ids = set(sales.values_list('invoice', flat=True).distinct().order_by())
+    sales = sales._raw_delete(sales.db)
+    Invoice.refresh_totals(invoice_ids)
+    refresh_sales_facts(months=months)
+    return sales
+
+
+def mark_rolled_back(batches, message):
+    """Mark the manifest entries of the batches' files as rolled back, so imports skip them."""
+    for path, content_hash in batches.values_list('path', 'content_hash').distinct():
+        ImportedFile.objects.filter(path=path, content_hash=content_hash).update(
+            status=ImportedFile.STATUS_ROLLED_BACK, committed_rows=0, message=message,
+        )
+
+
+def batches_of_file(file_path):
+    """Return the import batches of every import of a file."""
+    return ImportBatch.objects.filter(path=file_path)
@@ -0,0 +1,54 @@
+import hashlib
+import os
+from sales.models import ImportedFile
+
+
+def file_fingerprint(file_path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest and size of a file, reading it in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest(), os.path.getsize(file_path)
+
+
+def is_imported(file_path, content_hash):
+    """
+    Whether the manifest shows this exact file content was already imported successfully.
+    Files whose import was rolled back count as imported until their content changes.
+    """
+    return ImportedFile.objects.filter(
+        path=file_path, content_hash=content_hash,
+        status__in=[ImportedFile.STATUS_SUCCESS, ImportedFile.STATUS_ROLLED_BACK],
+    ).exists()
+
+
+def resume_point(file_path, content_hash):
+    """Return how many leading rows of this exact file content an interrupted import committed."""
+    entry = ImportedFile.objects.filter(path=file_path, content_hash=content_hash).exclude(
+        status=ImportedFile.STATUS_SUCCESS
+    ).first()
+    return entry.committed_rows if entry else 0
+
+
+def record_import(file_path, vendor, content_hash, size, status, row_count=None, message=None, committed_rows=0):
+    """Create or update the manifest entry of a file with the outcome of its import."""
+    entry, _ = ImportedFile.objects.update_or_create(
+        path=file_path,
+        defaults={
+            'vendor': vendor,
+            'content_hash': content_hash,
+            'size': size,
+            'row_count': row_count,
+            'committed_rows': committed_rows,
+            'status': status,
+            'message': message,
+        }
+    )
+    return entry
+
+
+def record_checkpoint(file_path, vendor, content_hash, size, committed_rows):
+    """Mark a file as in progress with its first committed_rows rows committed."""
+    return record_import(file_path, vendor, content_hash, size, ImportedFile.STATUS_IN_PROGRESS,
+                         row_count=committed_rows, committed_rows=committed_rows)
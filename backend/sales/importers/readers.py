@@ -0,0 +1,118 @@
+import csv
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+
+def read_batches(file_path, batch_size, skiprows=0, header_marker=None, text_columns=()):
+    """
+    Stream a vendor spreadsheet as DataFrames of at most batch_size rows.
+
+    The first skiprows rows are dropped and the next row is the header, or, with a
+    header_marker, the header is the first row holding that cell value. Every batch keeps
+    the file's row numbers as its index. The text_columns (names without surrounding
+    spaces), which hold the keys rows are matched on, are read as text, whole numbers
+    without a decimal part, so a key reads the same in every batch. The other columns are
+    typed per batch, like pd.read_csv does with a chunksize, so their values come out as
+    pd.read_excel / pd.read_csv would give them whenever the file fits in one batch.
+    """
+    if file_path.endswith('.xlsx'):
+        return read_xlsx_batches(file_path, batch_size, skiprows, header_marker, text_columns)
+    return read_csv_batches(file_path, batch_size, skiprows, header_marker, text_columns)
+
+
+def text_dtypes(header, text_columns):
+    """The dtype argument reading the header's text_columns as str."""
+    return {name: str for name in header if isinstance(name, str) and name.strip() in text_columns}
+
+
+def read_xlsx_batches(file_path, batch_size, skiprows=0, header_marker=None, text_columns=()):
+    """Stream the first worksheet of an .xlsx file with openpyxl's read-only mode."""
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()  # Don't trust the stored dimensions, read every row
+        rows = (convert_row(row) for row in sheet.rows)
+
+        header = find_header(rows, skiprows, header_marker)
+        dtype = text_dtypes(header, text_columns)
+
+        start, batch, blank_rows = 0, [], []
+        for row in rows:
+            # Blank rows are held back so trailing ones are dropped, as pd.read_excel does
+            if not row:
+                blank_rows.append(row)
+                continue
+            batch.extend(blank_rows)
+            blank_rows = []
+            batch.append(row)
+
+            if len(batch) >= batch_size:
+                yield build_frame(header, batch, start, dtype)
+                start += len(batch)
+                batch = []
+
+        if batch:
+            yield build_frame(header, batch, start, dtype)
+    finally:
+        workbook.close()
+
+
+def convert_row(row):
+    """Convert worksheet cells the way pandas' openpyxl reader does, trimming trailing empty cells."""
+    values = []
+    for cell in row:
+        if cell.value is None:
+            values.append('')
+        elif cell.data_type == TYPE_ERROR:
+            values.append(float('nan'))
+        elif cell.data_type == TYPE_NUMERIC and int(cell.value) == cell.value:
+            values.append(int(cell.value))
+        elif cell.data_type == TYPE_NUMERIC:
+            values.append(float(cell.value))
+        else:
+            values.append(cell.value)
+
+    while values and values[-1] == '':
+        values.pop()
+    return values
+
+
+def find_header(rows, skiprows=0, header_marker=None):
+    """Consume rows up to and including the header row and return it."""
+    for index, row in enumerate(rows):
+        if header_marker is None and index >= skiprows:
+            return row
+        if header_marker is not None and header_marker in row:
+            return row
+    if header_marker is not None:
+        raise ValueError(f"No '{header_marker}' column found")
+    return []
+
+
+def build_frame(header, rows, start, dtype=None):
+    """Type one batch of converted rows with the same parser pd.read_excel uses."""
+    width = max(len(header), *(len(row) for row in rows))
+    data = [row + [''] * (width - len(row)) for row in [header, *rows]]
+    frame = TextParser(data, header=0, skip_blank_lines=False, dtype=dtype).read()
+    frame.index = pd.RangeIndex(start, start + len(frame))
+    return frame
+
+
+def read_csv_batches(file_path, batch_size, skiprows=0, header_marker=None, text_columns=()):
+    """Stream a CSV file with pandas' chunked reader."""
+    if header_marker is not None:
+        skiprows = find_csv_header(file_path, header_marker)
+
+    header = pd.read_csv(file_path, skiprows=skiprows, nrows=0).columns
+    yield from pd.read_csv(file_path, skiprows=skiprows, chunksize=batch_size, dtype=text_dtypes(header, text_columns))
+
+
+def find_csv_header(file_path, header_marker):
+    """Return the number of lines before the CSV row holding header_marker."""
+    with open(file_path, newline='') as csv_file:
+        for index, row in enumerate(csv.reader(csv_file)):
+            if header_marker in row:
+                return index
+    raise ValueError(f"No '{header_marker}' column found")
@@ -0,0 +1,127 @@
+import resource
+import sys
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+# Phases an import spends its time in, in the order the summary lists them
+PHASES = ['parse', 'clean', 'validate', 'resolve', 'write', 'facts']
+
+# Entities the importers count outcomes for, in the order the summary lists them
+ENTITIES = ['accounts', 'categories', 'products', 'invoices', 'sales']
+
+
+def peak_memory_mb(who=resource.RUSAGE_SELF):
+    """Return the peak resident memory of this process (or its largest child) in MB."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class ImportReport:
+    """
+    Totals of one import run: files by outcome, created/updated/unchanged counts per entity,
+    rejected (quarantined) rows by reason, replaced values by message and the time spent in each phase.
+
+    The commands and the BulkImporter add to it instead of printing a line per row, and it
+    is written out as one summary at the end of the run. Worker processes fill a report of
+    their own, which is merged into the writing process's one.
+    """
+
+    def __init__(self):
+        self.files = Counter()  # Outcome -> files
+        self.counts = defaultdict(Counter)  # Entity -> outcome -> rows
+        self.skip_reasons = Counter()  # Reason -> rejected rows, which are quarantined
+        self.warnings = Counter()  # Message -> rows with a replaced value
+        self.seconds = defaultdict(float)  # Phase -> seconds spent in it
+        self.rows = Counter()  # Phase -> rows it handled
+        self.cache = Counter()  # 'hits' / 'misses' -> files looked up in the parse cache
+        self.from_workers = False  # Whether reports of worker processes were merged in
+
+    def count(self, entity, outcome, number=1):
+        if number:
+            self.counts[entity][outcome] += number
+
+    def skip(self, reason, number=1):
+        self.skip_reasons[reason] += number
+
+    def warn(self, message, number=1):
+        self.warnings[message] += number
+
+    @contextmanager
+    def phase(self, name, rows):
+        """Time the block as part of phase name, which handled rows rows."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += perf_counter() - start
+            self.rows[name] += rows
+
+    def timed(self, name, batches):
+        """Yield from batches, timing the reads as phase name."""
+        batches = iter(batches)
+        while True:
+            start = perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                return
+            self.seconds[name] += perf_counter() - start
+            self.rows[name] += len(batch)
+            yield batch
+
+    def merge(self, other):
+        """Add the totals of a report filled in a worker process."""
+        self.from_workers = True
+        self.files.update(other.files)
+        for entity, outcomes in other.counts.items():
+            self.counts[entity].update(outcomes)
+        self.skip_reasons.update(other.skip_reasons)
+        self.warnings.update(other.warnings)
+        for name, seconds in other.seconds.items():
+            self.seconds[name] += seconds
+        self.rows.update(other.rows)
+        self.cache.update(other.cache)
+
+    def as_dict(self):
+        """Return the totals as JSON-serializable data, as the import jobs store them."""
+        return {
+            'files': dict(self.files),
+            'counts': {entity: dict(outcomes) for entity, outcomes in self.counts.items()},
+            'quarantined_rows': dict(self.skip_reasons),
+            'replaced_values': dict(self.warnings),
+            'phases': {name: {'seconds': round(self.seconds[name], 3), 'rows': self.rows[name]}
+                       for name in PHASES if name in self.seconds},
+        }
+
+    def summary(self, title):
+        """Return the summary lines of the run."""
+        lines = [title]
+        lines.append('  Files: ' + (', '.join(f'{number} {outcome}' for outcome, number in self.files.items()) or 'none'))
+
+        for entity in ENTITIES:
+            outcomes = self.counts.get(entity)
+            if outcomes:
+                lines.append(f'  {entity.capitalize()}: ' + ', '.join(f'{number} {outcome}' for outcome, number in outcomes.items()))
+
+        if self.skip_reasons:
+            lines.append(f'  Quarantined rows: {sum(self.skip_reasons.values())}')
+            lines.extend(f'    {number} {reason}' for reason, number in self.skip_reasons.most_common())
+        if self.warnings:
+            lines.append(f'  Replaced values: {sum(self.warnings.values())}')
+            lines.extend(f'    {number} {message}' for message, number in self.warnings.most_common())
+
+        for name in PHASES:
+            if name in self.seconds:
+                seconds, rows = self.seconds[name], self.rows[name]
+                rate = f'{rows / seconds:,.0f} rows/s' if seconds else '-'
+                lines.append(f'  {name.capitalize()}: {rows} rows in {seconds:.2f}s ({rate})')
+
+        if self.cache:
+            lines.append(f"  Parse cache: {self.cache['hits']} hits, {self.cache['misses']} misses")
+
+        memory = f'  Peak memory: {peak_memory_mb():.0f} MB'
+        if self.from_workers:
+            memory += f' (workers: {peak_memory_mb(resource.RUSAGE_CHILDREN):.0f} MB)'
+        lines.append(memory)
+        return lines
@@ -0,0 +1,69 @@
+from reps.models import SalesRep
+from users.models import UserProfile
+
+
+def rep_username(name):
+    return name.lower().replace(' ', '_')  # Lowercase username, replace spaces
+
+
+def rep_email(name):
+    return f"{rep_username(name)}@example.com"  # Placeholder email
+
+
+class SalesRepResolver:
+    """
+    Map Sub Rep names to SalesReps, each linked to a UserProfile, from a cache kept for the run.
+
+    Only a handful of reps appear across a vendor's files, so the names of a batch that
+    aren't cached yet are resolved together: their users are looked up by email, then by
+    username, and the missing users and reps are created with one bulk_create each.
+
+    Reset it when a transaction it created reps in is rolled back.
+    """
+
+    def __init__(self):
+        self.reps = {}  # Sub Rep name -> SalesRep
+
+    def reset(self):
+        self.reps = {}
+
+    def resolve(self, names):
+        """Return a {name: SalesRep} map of the non-blank names, creating users and reps as needed."""
+        missing = {name for name in names if name and name not in self.reps}
+        if missing:
+            users = self.get_users(missing)
+            self.reps.update(self.get_reps(users))
+        return {name: self.reps[name] for name in names if name}
+
+    def get_users(self, names):
+        """Return {name: UserProfile} for names, matching users by email, then username, then creating them."""
+        by_email = {}
+        for user in UserProfile.objects.filter(email__in=[rep_email(name) for name in names]).order_by('pk'):
+            by_email.setdefault(user.email, user)
+        users = {name: by_email[rep_email(name)] for name in names if rep_email(name) in by_email}
+
+        rest = names - users.keys()
+        by_username = {user.username: user for user in
+                       UserProfile.objects.filter(username__in=[rep_username(name) for name in rest])}
+        new_users = []
+        for name in sorted(rest):
+            user = by_username.get(rep_username(name))
+            if user is None:
+                user = UserProfile(username=rep_username(name), first_name=name, email=rep_email(name))
+                by_username[user.username] = user
+                new_users.append(user)
+            users[name] = user
+        UserProfile.objects.bulk_create(new_users)
+        return users
+
+    def get_reps(self, users):
+        """Return {name: SalesRep} for the users, creating the missing reps with the name as their code."""
+        by_user = {rep.user_id: rep for rep in SalesRep.objects.filter(user__in=users.values())}
+        new_reps = []
+        for name, user in sorted(users.items()):
+            if user.pk not in by_user:
+                rep = SalesRep(user=user, code=name)
+                by_user[user.pk] = rep
+                new_reps.append(rep)
+        SalesRep.objects.bulk_create(new_reps)
+        return {name: by_user[user.pk] for name, user in users.items()}
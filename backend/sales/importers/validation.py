@@ -0,0 +1,173 @@
+from datetime import date, timedelta
+import pandas as pd
+from django.db import models
+from django.db.models import Count, FloatField, Q
+from django.db.models.functions import Cast, Coalesce
+from accounts.models import Account
+from sales.models import Sale, Invoice, Product, Category
+from .bulk import ACCOUNT_FIELDS, SALE_FIELDS, as_key
+
+
+def record_fields():
+    """Map record keys to the model fields their values end up in."""
+    fields = {
+        'customer_number': Account._meta.get_field('customer_number'),
+        'customer_name': Account._meta.get_field('name'),
+        'invoice_number': Invoice._meta.get_field('invoice_number'),
+        'invoice_date': Invoice._meta.get_field('invoice_date'),
+        'customer_po': Invoice._meta.get_field('customer_po'),
+        'product_code': Product._meta.get_field('product_code'),
+        'product_description': Product._meta.get_field('product_description'),
+        'sku_code': Product._meta.get_field('sku_code'),
+        'category': Category._meta.get_field('name'),
+        'line_number': Sale._meta.get_field('line_number'),
+    }
+    fields.update((name, Account._meta.get_field(name)) for name in ACCOUNT_FIELDS)
+    fields.update((name, Sale._meta.get_field(name)) for name in SALE_FIELDS)
+    return fields
+
+
+class Median(models.Aggregate):
+    """PostgreSQL's continuous median of an expression."""
+    function = 'PERCENTILE_CONT'
+    name = 'Median'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+def numbers(frame, key):
+    """Parse a record column into floats; all NaN when the records lack it."""
+    if key not in frame:
+        return pd.Series(float('nan'), index=frame.index)
+    return pd.to_numeric(frame[key], errors='coerce')
+
+
+def plain_values(values):
+    """Return a row's values as JSON-ready Python values, with None for missing ones."""
+    plain = {}
+    for key, value in values.items():
+        if hasattr(value, 'item'):
+            value = value.item()  # NumPy scalar
+        if not isinstance(value, (list, dict)) and pd.isna(value):
+            value = None
+        plain[str(key)] = value
+    return plain
+
+
+class BatchValidator:
+    """
+    Split a batch of cleaned records into the rows to write and the rows to quarantine.
+
+    Every check runs on whole columns of the batch and marks the rows that fail it; a
+    rejected row gets the reason of the first check it failed. The checks are the database
+    constraints of the fields the values end up in (required values, lengths, numbers,
+    dates and their ranges), then unit prices and commission rates far from what the
+    product's stored sales show.
+    """
+    outlier_factor = 10  # How many times above or below the product's median a value is an outlier
+    min_history = 5  # Stored sales a product needs before its values are checked for outliers
+    earliest_date = date(2000, 1, 1)
+    future_days = 366  # How far after today dates may be
+
+    def __init__(self, format):
+        self.format = format
+
+    def validate(self, records, brand):
+        """Return the accepted records and the (row, reason, record) of the rejected ones."""
+        if not records:
+            return records, []
+
+        frame = pd.DataFrame.from_records(records)
+        reasons = pd.Series(None, index=frame.index, dtype=object)
+        for failed, reason in [*self.field_checks(frame), *self.outlier_checks(frame, brand)]:
+            reasons = reasons.mask(reasons.isna() & failed.reindex(frame.index, fill_value=False), reason)
+
+        rejected = reasons.notna().tolist()
+        accepted = [record for record, reject in zip(records, rejected) if not reject]
+        quarantined = [(record.get('row'), reason, record)
+                       for record, reject, reason in zip(records, rejected, reasons) if reject]
+        return accepted, quarantined
+
+    def field_checks(self, frame):
+        """Yield (failed mask, reason) for values the database would reject."""
+        today = date.today()
+        for key, field in record_fields().items():
+            if key not in frame:
+                continue
+            present = frame[key].notna()
+            values = frame[key][present]
+            if not field.null:
+                yield ~present, f"'{field.name}' is required"
+
+            if isinstance(field, models.CharField) and field.max_length:
+                yield values.map(as_key).str.len() > field.max_length, \
+                    f"'{field.name}' is longer than {field.max_length} characters"
+
+            elif isinstance(field, (models.DecimalField, models.IntegerField)):
+                parsed = pd.to_numeric(values, errors='coerce')
+                yield parsed.isna(), f"invalid '{field.name}'"
+                if isinstance(field, models.DecimalField):
+                    limit = 10 ** (field.max_digits - field.decimal_places)
+                    out_of_range = parsed.abs().round(field.decimal_places) >= limit
+                else:
+                    out_of_range = (parsed < -2 ** 31) | (parsed >= 2 ** 31)
+                yield out_of_range, f"'{field.name}' is out of range"
+
+            elif isinstance(field, models.DateField):
+                dates = pd.to_datetime(values, errors='coerce')
+                yield dates.isna(), f"invalid '{field.name}'"
+                yield ((dates < pd.Timestamp(self.earliest_date))
+                       | (dates > pd.Timestamp(today + timedelta(days=self.future_days)))), \
+                    f"'{field.name}' is out of range"
+
+    def outlier_checks(self, frame, brand):
+        """Yield (failed mask, reason) for unit prices and commission rates far from the product's history."""
+        if 'sell_price' not in frame or 'product_code' not in frame:
+            return
+        price = numbers(frame, 'sell_price')
+        quantity = numbers(frame, 'quantity_sold').fillna(numbers(frame, 'quantity_invoiced'))
+        amount = price if self.format.extended_prices else price * quantity
+        unit_price = price / quantity if self.format.extended_prices else price
+        rate = numbers(frame, 'commission_amount') / amount
+
+        codes = frame['product_code'].map(as_key)
+        history = self.product_history(brand, set(codes.dropna()))
+        if history.empty:
+            return
+
+        factor = self.outlier_factor
+        sold = (price > 0) & (quantity > 0)
+        median = codes.map(history['unit_price'])
+        known = sold & (codes.map(history['sales']) >= self.min_history)
+        yield known & ((unit_price > median * factor) | (unit_price < median / factor)), \
+            "unit price far from the product's history"
+
+        median = codes.map(history['commission_rate'])
+        known = sold & (rate > 0) & (codes.map(history['commissions']) >= self.min_history)
+        yield known & (rate > median * factor), "commission rate far above the product's history"
+
+    def product_history(self, brand, codes):
+        """
+        Return the stored sales, median unit price, commissioned sales and median commission
+        rate of the brand's products with codes, indexed by product code.
+        """
+        price = Cast('sell_price', FloatField())
+        quantity = Coalesce(Cast('quantity_sold', FloatField()), Cast('quantity_invoiced', FloatField()))
+        amount = price if self.format.extended_prices else price * quantity
+        unit_price = price / quantity if self.format.extended_prices else price
+        commissioned = Q(commission_amount__gt=0)
+
+        rows = (
+            Sale.objects.filter(product__brand=brand, product__product_code__in=codes, sell_price__gt=0)
+            .annotate(quantity=quantity).filter(quantity__gt=0)
+            .values('product__product_code')
+            .annotate(
+                sales=Count('id'),
+                unit_price=Median(unit_price),
+                commissions=Count('id', filter=commissioned),
+                commission_rate=Median(Cast('commission_amount', FloatField()) / amount, filter=commissioned),
+            )
+        )
+        return pd.DataFrame.from_records(
+            list(rows), columns=['product__product_code', 'sales', 'unit_price', 'commissions', 'commission_rate'],
+        ).set_index('product__product_code')
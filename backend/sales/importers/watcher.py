@@ -0,0 +1,152 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """
+    Report the files written or moved into a set of folders, with Linux's inotify.
+
+    libc's inotify functions are called through ctypes, so no extra package is needed.
+    Raises OSError where inotify isn't available.
+    """
+
+    def __init__(self, folders):
+        library = ctypes.util.find_library('c')
+        if not library:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = {}  # Watch descriptor -> folder
+        for folder in folders:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"Can't watch {folder}")
+            self.folders[wd] = folder
+
+    def changes(self, timeout):
+        """Wait up to timeout seconds (for good when None) and return the paths of the files that changed."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        data = os.read(self.fd, 64 * 1024)
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, so every file of the folders may have changed
+                for folder in self.folders.values():
+                    paths |= list_folder(folder)
+            elif name and wd in self.folders:
+                paths.add(os.path.join(self.folders[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Report the files that changed in a set of folders by comparing their sizes and mtimes."""
+
+    def __init__(self, folders, interval=2):
+        self.folders = folders
+        self.interval = interval
+        self.seen = self.scan()
+
+    def scan(self):
+        """Return the (size, mtime) of every file in the folders; only the directory entries are read."""
+        stats = {}
+        for folder in self.folders:
+            for entry in os.scandir(folder):
+                if entry.is_file():
+                    stat = entry.stat()
+                    stats[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return stats
+
+    def changes(self, timeout):
+        """Wait up to timeout seconds (at most the polling interval) and return the paths that changed."""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self.scan()
+        paths = {path for path, stat in current.items() if self.seen.get(path) != stat}
+        self.seen = current
+        return paths
+
+    def close(self):
+        pass
+
+
+def list_folder(folder):
+    return {entry.path for entry in os.scandir(folder) if entry.is_file()}
+
+
+def open_watcher(folders, polling=False, interval=2):
+    """Return an inotify watcher for the folders, or a polling one where inotify isn't available."""
+    if not polling:
+        try:
+            return InotifyWatcher(folders)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(folders, interval)
+
+
+class Debouncer:
+    """
+    Hold changed files back until they have stopped changing for settle seconds, so a file
+    is only imported once whoever drops it in has finished writing it.
+    """
+
+    def __init__(self, settle=2):
+        self.settle = settle
+        self.pending = {}  # Path -> ((size, mtime), when that stat was first seen)
+
+    def add(self, paths):
+        for path in paths:
+            self.pending.setdefault(path, (None, None))
+
+    def ready(self):
+        """Return the pending files whose size and mtime have been stable for settle seconds."""
+        now = time.monotonic()
+        ready = []
+        for path, (last_stat, since) in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[path]  # Removed or renamed before it settled
+                continue
+            stat = (stat.st_size, stat.st_mtime_ns)
+            if stat != last_stat:
+                self.pending[path] = (stat, now)
+            elif now - since >= self.settle:
+                del self.pending[path]
+                ready.append(path)
+        return sorted(ready)
+
+    def next_check(self):
+        """Seconds to wait for events before checking the pending files again."""
+        return self.settle / 2 if self.pending else None
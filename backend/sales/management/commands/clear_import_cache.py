@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from sales.importers.cache import clear_cache
+
+
+class Command(BaseCommand):
+    help = "Remove the parsed spreadsheets the import commands cache"
+
+    def handle(self, *args, **kwargs):
+        count, size = clear_cache()
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} cached files ({size / (1024 * 1024):.1f} MB)"))
@@ -1,6 +1,8 @@
-import time
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 from django.core.management.base import BaseCommand
+from django.db import connections
+from sales.importers.base import dry_run_rollback, parse_in_worker, read_spool
 
 # Import the individual management commands
 from .import_grace import Command as ImportGraceCommand
@@ -19,11 +21,37 @@ IMPORT_COMMANDS = [
 class Command(BaseCommand):
     help = "Run all the import commands in sequence with a progress bar"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-import files the manifest lists as already imported')
+        parser.add_argument('--copy', action='store_true', help='Load sales through a COPY staging table (PostgreSQL only)')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Parse files in this many worker processes while the main process writes them')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be created, updated or skipped without writing anything')
+        parser.add_argument('--no-cache', action='store_true', help='Parse every file again instead of using the parse cache')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue files an earlier run didn\'t finish after their last committed batch')
+
     def handle(self, *args, **kwargs):
         """Handle the execution of all import commands."""
-        self.run_import_commands()
+        force = kwargs.get('force', False)
+        options = {
+            'copy': kwargs.get('copy', False),
+            'dry_run': kwargs.get('dry_run', False),
+            'cache': not kwargs.get('no_cache', False),
+            'resume': kwargs.get('resume', False),
+            'verbosity': kwargs.get('verbosity', 1),
+        }
+        workers = kwargs.get('workers') or 0
+
+        # A dry run rolls back once at the end, so every vendor sees the rows the previous ones would write
+        if workers > 0:
+            self.run_parallel_imports(workers, force=force, **options)
+        else:
+            with dry_run_rollback(options['dry_run']):
+                self.run_import_commands(force=force, **options)
 
-    def run_import_commands(self):
+    def run_import_commands(self, force=False, **options):
         """Run each import command and update the progress bar."""
         total_commands = len(IMPORT_COMMANDS)
         progress_bar = tqdm(total=total_commands, desc="Overall Progress", unit="step")
@@ -32,15 +60,68 @@ class Command(BaseCommand):
             try:
                 # Initialize and run the command
                 command_instance = CommandClass()
+                command_instance.configure(**options)
                 self.stdout.write(self.style.SUCCESS(f"Running {name} import..."))
-                command_instance.handle()
+                command_instance.import_pending(force)
+                command_instance.write_summary()
 
                 # Update progress bar after each successful import
                 progress_bar.update(1)
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Error running {name}: {e}"))
-            finally:
-                time.sleep(0.5)  # Small delay to visualize progress bar more smoothly
 
         progress_bar.close()
         self.stdout.write(self.style.SUCCESS("All imports completed successfully."))
+
+    def run_parallel_imports(self, workers, force=False, **options):
+        """
+        Parse the files of every vendor in a process pool and write them from this process.
+
+        Parsing (mostly openpyxl) is CPU-bound and runs on several cores, while the database
+        writes stay in one process, in file order, so shared accounts and products are
+        resolved the same way as in a sequential run.
+        """
+        commands, files = [], []
+        for name, CommandClass in IMPORT_COMMANDS:
+            try:
+                command_instance = CommandClass()
+                command_instance.configure(**options)
+                self.stdout.write(self.style.SUCCESS(f"Queueing {name} files..."))
+                for file_path, content_hash, size, start_row in command_instance.pending_files(force):
+                    files.append((command_instance, file_path, content_hash, size, start_row))
+                commands.append(command_instance)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Error running {name}: {e}"))
+
+        # Worker processes are forked from this one and must not share its database connections
+        connections.close_all()
+
+        progress_bar = tqdm(total=len(files), desc="Overall Progress", unit="file")
+        with ProcessPoolExecutor(max_workers=workers) as pool, dry_run_rollback(options['dry_run']):
+            futures = [
+                pool.submit(parse_in_worker, type(command), file_path, content_hash, start_row,
+                            command.verbosity, command.use_cache)
+                for command, file_path, content_hash, _, start_row in files
+            ]
+
+            brands = {}
+            for (command, file_path, content_hash, size, start_row), future in zip(files, futures):
+                if command not in brands:
+                    brands[command] = command.get_brand()
+                command.import_file(file_path, brands[command], content_hash, size, start_row,
+                                    parse=self.collect(command, future))
+                progress_bar.update(1)
+
+        progress_bar.close()
+        for command in commands:
+            command.write_summary()
+        self.stdout.write(self.style.SUCCESS("All imports completed successfully."))
+
+    def collect(self, command, future):
+        """Return a parse callable that waits for the worker, replays its output and report and streams its batches."""
+        def parse(file_path, content_hash, start_row):
+            spool_path, output, report = future.result()
+            command.stdout.write(output, ending='')
+            command.report.merge(report)
+            return read_spool(spool_path)
+        return parse
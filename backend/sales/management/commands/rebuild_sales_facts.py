@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from accounts.models import AccountHierarchy
+from sales.facts import refresh_sales_facts
+from sales.models import MonthlySales
+
+
+class Command(BaseCommand):
+    help = "Recompute the account hierarchy and the MonthlySales facts the dashboards read from the stored sales"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-empty', action='store_true', help='Only build the facts when there are none yet')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['if_empty'] and MonthlySales.objects.exists():
+            self.stdout.write("Monthly sales facts already built")
+            return
+        # The facts are attributed through the hierarchy, which bulk edits may have left behind
+        AccountHierarchy.rebuild()
+        rows = refresh_sales_facts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} monthly sales facts"))
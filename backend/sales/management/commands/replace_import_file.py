@@ -0,0 +1,49 @@
+import os
+from django.core.management import load_command_class
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from sales.importers.adapters import FORMATS
+from sales.importers.lineage import batches_of_file, delete_batches, delete_legacy_sales
+from sales.importers.manifest import file_fingerprint
+
+
+class Command(BaseCommand):
+    help = ("Replace the sales of one vendor file with a fresh import of it, in one transaction. Sales imported "
+            "before lineage was recorded are matched by the invoices the new import writes to, so invoices the "
+            "corrected file drops entirely are kept for those.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the file, e.g. files/boss/2024.xlsx')
+        parser.add_argument('--copy', action='store_true', help='Load sales through a COPY staging table (PostgreSQL only)')
+
+    def handle(self, *args, **kwargs):
+        # Paths are stored relative to the backend folder, as the import commands list them
+        file_path = os.path.relpath(os.path.abspath(kwargs['path']))
+        if not os.path.isfile(file_path):
+            raise CommandError(f"File not found: {file_path}")
+
+        folder = os.path.dirname(file_path) + '/'
+        vendor = next((vendor for vendor, fmt in FORMATS.items() if os.path.normpath(fmt.folder_path) + '/' == folder), None)
+        if vendor is None:
+            raise CommandError(f"{file_path} is not in one of the vendor folders")
+
+        command = load_command_class('sales', f'import_{vendor}')
+        command.stdout, command.stderr = self.stdout, self.stderr
+        command.configure(copy=kwargs.get('copy', False), verbosity=kwargs.get('verbosity', 1))
+
+        # Either the old rows are replaced by the whole new import or nothing changes
+        with transaction.atomic():
+            sales, invoices = delete_batches(batches_of_file(file_path))
+            self.stdout.write(f"Deleted {sales} sales and {invoices} invoices of earlier imports of {file_path}")
+
+            content_hash, size = file_fingerprint(file_path)
+            if not command.import_file(file_path, command.get_brand(), content_hash, size):
+                raise CommandError(f"Import of {file_path} failed, its earlier rows were kept")
+
+            # Lines imported before lineage was recorded and not written again by the new import
+            if command.import_batch is not None:
+                legacy = delete_legacy_sales(command.import_batch)
+                if legacy:
+                    self.stdout.write(f"Deleted {legacy} sales imported before lineage that {file_path} no longer has")
+
+        self.stdout.write(self.style.SUCCESS(f"Replaced the sales of {file_path}"))
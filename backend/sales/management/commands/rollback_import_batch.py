@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from sales.importers.lineage import delete_batches, mark_rolled_back
+from sales.models import ImportBatch
+
+
+class Command(BaseCommand):
+    help = "Delete the sales and invoices written by import batches, in one transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument('batch_ids', nargs='+', type=int, help='IDs of the import batches to roll back')
+
+    def handle(self, *args, **kwargs):
+        batch_ids = kwargs['batch_ids']
+        batches = ImportBatch.objects.filter(pk__in=batch_ids)
+        missing = set(batch_ids) - set(batches.values_list('pk', flat=True))
+        if missing:
+            raise CommandError(f"Unknown import batches: {', '.join(map(str, sorted(missing)))}")
+
+        with transaction.atomic():
+            sales, invoices = delete_batches(batches)
+            message = f"Rolled back batches {', '.join(map(str, batch_ids))}: deleted {sales} sales and {invoices} invoices"
+            # The files are skipped by later imports until their content changes or --force is given
+            mark_rolled_back(batches, message)
+
+        self.stdout.write(self.style.SUCCESS(message))
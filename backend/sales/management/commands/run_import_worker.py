@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from sales.importers.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Process the vendor files uploaded through the import API, polling the job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--stale-after', type=float, default=30,
+                            help='Minutes a running job may save no progress before it is queued again')
+
+    def handle(self, *args, **kwargs):
+        interval = kwargs.get('interval', 5)
+        once = kwargs.get('once', False)
+        stale_after = timedelta(minutes=kwargs.get('stale_after', 30))
+
+        self.stdout.write("Waiting for import jobs...")
+        while True:
+            job = claim_next_job(stale_after)
+            if job is None:
+                if once:
+                    return
+                time.sleep(interval)
+                continue
+
+            self.stdout.write(f"Running import job {job.pk}: {job.file.name}")
+            job = run_job(job, stdout=self.stdout)
+            style = self.style.SUCCESS if job.status == job.STATUS_SUCCESS else self.style.ERROR
+            self.stdout.write(style(f"Import job {job.pk} {job.status}"))
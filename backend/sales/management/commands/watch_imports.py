@@ -0,0 +1,66 @@
+import os
+from django.core.management import load_command_class
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from sales.importers.adapters import FORMATS
+from sales.importers.base import VendorImportCommand
+from sales.importers.manifest import file_fingerprint, is_imported
+from sales.importers.watcher import Debouncer, InotifyWatcher, list_folder, open_watcher
+
+
+class Command(BaseCommand):
+    help = "Watch the vendor folders and import each new or changed file as soon as it has been written"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', action='store_true', help='Poll the folders instead of using inotify')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between scans when polling')
+        parser.add_argument('--settle', type=float, default=2,
+                            help='Seconds a file must stay unchanged before it is imported')
+        parser.add_argument('--copy', action='store_true', help='Load sales through a COPY staging table (PostgreSQL only)')
+
+    def handle(self, *args, **kwargs):
+        self.copy = kwargs.get('copy', False)
+        self.verbosity = kwargs.get('verbosity', 1)
+        # Vendor folder -> vendor
+        self.vendors = {os.path.normpath(fmt.folder_path): vendor for vendor, fmt in FORMATS.items()}
+
+        watcher = open_watcher(list(self.vendors), polling=kwargs.get('poll', False), interval=kwargs.get('interval', 2))
+        debouncer = Debouncer(kwargs.get('settle', 2))
+        method = 'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'
+        self.stdout.write(f"Watching {', '.join(sorted(self.vendors))} ({method})")
+
+        # Files already in the folders are queued too, the manifest skips those imported before
+        for folder in self.vendors:
+            debouncer.add(path for path in list_folder(folder) if VendorImportCommand.is_import_file(os.path.basename(path)))
+
+        try:
+            while True:
+                changed = watcher.changes(debouncer.next_check())
+                debouncer.add(path for path in changed if VendorImportCommand.is_import_file(os.path.basename(path)))
+                for file_path in debouncer.ready():
+                    try:
+                        self.ingest(file_path)
+                    except Exception as e:
+                        # A file removed since it settled, or a database error, mustn't stop the other vendors' imports
+                        self.stderr.write(f"Failed to import {os.path.basename(file_path)}: {e}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+
+    def ingest(self, file_path):
+        """Import one file with its vendor's import command, unless the manifest lists its content as imported."""
+        # Drop connections the database closed while the watcher was idle
+        close_old_connections()
+
+        content_hash, size = file_fingerprint(file_path)
+        if is_imported(file_path, content_hash):
+            if self.verbosity >= 2:
+                self.stdout.write(f"Skipping unchanged file: {os.path.basename(file_path)}")
+            return
+
+        # A fresh command per file, so accounts created since the last file are seen
+        command = load_command_class('sales', f'import_{self.vendors[os.path.dirname(file_path)]}')
+        command.stdout, command.stderr = self.stdout, self.stderr
+        command.configure(copy=self.copy, verbosity=self.verbosity)
+        command.import_file(file_path, command.get_brand(), content_hash, size)
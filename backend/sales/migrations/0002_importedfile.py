@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-18 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('vendor', models.CharField(max_length=50)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('row_count', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('success', 'Success'), ('failed', 'Failed')], max_length=20)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Imported File',
+                'verbose_name_plural': 'Imported Files',
+                'ordering': ['-imported_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_importedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='line_number',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        # Number the sales already stored for the same invoice and product, so none are lost to the constraint
+        migrations.RunSQL(
+            """
+            UPDATE sales_sale SET line_number = numbered.line_number
+            FROM (
+                SELECT id, row_number() OVER (PARTITION BY invoice_id, product_id ORDER BY id) AS line_number
+                FROM sales_sale
+            ) numbered
+            WHERE sales_sale.id = numbered.id AND numbered.line_number > 1
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(fields=('invoice', 'product', 'line_number'), name='unique_sale_line'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_sale_line_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importedfile',
+            name='committed_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='importedfile',
+            name='status',
+            field=models.CharField(choices=[('success', 'Success'), ('failed', 'Failed'), ('in_progress', 'In progress')], max_length=20),
+        ),
+    ]
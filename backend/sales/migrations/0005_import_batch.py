@@ -0,0 +1,54 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_importedfile_committed_rows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(db_index=True, max_length=255)),
+                ('vendor', models.CharField(max_length=50)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Import Batch',
+                'verbose_name_plural': 'Import Batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='source_row',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='source_row',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='importedfile',
+            name='status',
+            field=models.CharField(choices=[('success', 'Success'), ('failed', 'Failed'), ('in_progress', 'In progress'), ('rolled_back', 'Rolled back')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='import_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='sales.importbatch'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='import_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='sales.importbatch'),
+        ),
+    ]
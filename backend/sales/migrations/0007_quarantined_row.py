@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:34
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_import_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarantinedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_row', models.PositiveIntegerField()),
+                ('reason', models.CharField(db_index=True, max_length=255)),
+                ('values', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('import_batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quarantined_rows', to='sales.importbatch')),
+            ],
+            options={
+                'verbose_name': 'Quarantined Row',
+                'verbose_name_plural': 'Quarantined Rows',
+                'ordering': ['import_batch', 'source_row'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brands', '0001_initial'),
+        ('reps', '0002_initial'),
+        ('accounts', '0002_initial'),
+        ('sales', '0007_quarantined_row'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(blank=True, null=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lines', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.account')),
+                ('branch_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.branchaccount')),
+                ('brand', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='brands.brand')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sales.product')),
+                ('root_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.rootaccount')),
+                ('sales_rep', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reps.salesrep')),
+            ],
+            options={
+                'verbose_name': 'Monthly Sales',
+                'verbose_name_plural': 'Monthly Sales',
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['month', 'brand'], name='sales_month_month_4d7964_idx'), models.Index(fields=['branch_account', 'month'], name='sales_month_branch__f9c91f_idx'), models.Index(fields=['sales_rep', 'month'], name='sales_month_sales_r_76577d_idx'), models.Index(fields=['account', 'month'], name='sales_month_account_2c403d_idx')],
+            },
+        ),
+    ]
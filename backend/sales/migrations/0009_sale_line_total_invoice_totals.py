@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:44
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    # Sale.line_total_of in SQL, on the stored values
+    Sale = apps.get_model('sales', 'Sale')
+    Invoice = apps.get_model('sales', 'Invoice')
+    Sale.objects.update(line_total=F('sell_price') * Coalesce('quantity_invoiced', 'quantity_sold', Value(1),
+                                                              output_field=DecimalField()))
+    sales = Sale.objects.filter(invoice=OuterRef('pk')).order_by().values('invoice')
+    Invoice.objects.update(
+        total_amount=Coalesce(Subquery(sales.annotate(total=Sum('line_total')).values('total')), 0,
+                              output_field=DecimalField()),
+        line_count=Coalesce(Subquery(sales.annotate(lines=Count('pk')).values('lines')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_monthlysales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='total_amount',
+            field=models.DecimalField(db_index=True, decimal_places=4, default=0, editable=False, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='line_total',
+            field=models.DecimalField(blank=True, decimal_places=4, editable=False, max_digits=20, null=True),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
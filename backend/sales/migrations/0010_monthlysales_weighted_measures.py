@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+def clear_facts(apps, schema_editor):
+    # The facts were attributed to the first branch of each account; rebuild_sales_facts
+    # --if-empty rebuilds them with the hierarchy weights
+    apps.get_model('sales', 'MonthlySales').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_account_hierarchy'),
+        ('sales', '0009_sale_line_total_invoice_totals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='monthlysales',
+            name='amount',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='monthlysales',
+            name='lines',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='monthlysales',
+            name='quantity',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=18),
+        ),
+        migrations.AlterField(
+            model_name='monthlysales',
+            name='revenue',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=20),
+        ),
+        migrations.RunPython(clear_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    apps.get_model('sales', 'DataVersion').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0010_monthlysales_weighted_measures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Data Version',
+                'verbose_name_plural': 'Data Version',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
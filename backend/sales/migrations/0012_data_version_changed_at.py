@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0011_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,114 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def normalize_key(value):
+    # sales.importers.bulk.as_key on a stored string
+    value = value.strip()
+    return value[:-2] if value.endswith('.0') and value[:-2].isdigit() else value
+
+
+def group_keys(model, field):
+    """
+    Return {row to keep: [rows to merge into it]} for the rows whose key isn't in its normal
+    form, renaming the row kept to the normal form. The row kept is the one imports match:
+    the first row (by pk) already stored with the normal key, else the first row to rename.
+    """
+    candidates = model.objects.filter(Q(**{f'{field}__regex': r'^\s|\s$'}) | Q(**{f'{field}__regex': r'^[0-9]+\.0$'}))
+    groups = defaultdict(list)  # Normal key -> rows stored with another form of it
+    for obj in candidates.order_by('pk'):
+        groups[normalize_key(getattr(obj, field))].append(obj)
+
+    keepers = {}
+    for obj in model.objects.filter(**{f'{field}__in': groups}).order_by('pk'):
+        keepers.setdefault(getattr(obj, field), obj)
+    merges, renamed = {}, []
+    for key, rows in groups.items():
+        if key not in keepers:
+            keepers[key] = rows.pop(0)
+            setattr(keepers[key], field, key)
+            renamed.append(keepers[key])
+        merges[keepers[key]] = rows
+    # Renamed after the merged rows are deleted, so unique keys don't clash
+    return merges, renamed
+
+
+def normalize_keys(apps, schema_editor):
+    # Keys were stored as the readers typed their column ('123', '123.0' or '  123'), so one
+    # customer, invoice or product could be stored twice. Store them the way imports now look
+    # them up, merging the rows of each key into the one imports match.
+    Account = apps.get_model('accounts', 'Account')
+    Invoice = apps.get_model('sales', 'Invoice')
+    Product = apps.get_model('sales', 'Product')
+    Sale = apps.get_model('sales', 'Sale')
+    Memberships = apps.get_model('accounts', 'BranchAccount').accounts.through
+    merged = False
+
+    merges, renamed = group_keys(Account, 'customer_number')
+    for keeper, rows in merges.items():
+        for row in rows:
+            Invoice.objects.filter(account=row).update(account=keeper)
+            Sale.objects.filter(customer=row).update(customer=keeper)
+            branches = Memberships.objects.filter(account=row).exclude(
+                branchaccount__in=Memberships.objects.filter(account=keeper).values('branchaccount'))
+            branches.update(account=keeper)
+            row.delete()
+            merged = True
+    Account.objects.bulk_update(renamed, ['customer_number'], batch_size=1000)
+
+    merges, renamed = group_keys(Product, 'product_code')
+    for keeper, rows in merges.items():
+        for row in rows:
+            # A line stored with both products is the same line
+            Sale.objects.filter(product=row, invoice__sales__product=keeper,
+                                line_number=F('invoice__sales__line_number')).delete()
+            Sale.objects.filter(product=row).update(product=keeper)
+            keeper.tags.add(*row.tags.all())
+            row.delete()
+            merged = True
+    Product.objects.bulk_update(renamed, ['product_code'], batch_size=1000)
+
+    merges, renamed = group_keys(Invoice, 'invoice_number')
+    for keeper, rows in merges.items():
+        for row in rows:
+            # A line stored on both invoices keeps the sale written last, as a reimport would
+            stored = {(product_id, line_number): (batch_id or 0, pk) for pk, product_id, line_number, batch_id in
+                      Sale.objects.filter(invoice=keeper).values_list('pk', 'product', 'line_number', 'import_batch')}
+            for pk, product_id, line_number, batch_id in Sale.objects.filter(invoice=row).values_list(
+                    'pk', 'product', 'line_number', 'import_batch'):
+                kept = stored.get((product_id, line_number))
+                if kept is not None:
+                    Sale.objects.filter(pk=min(kept, (batch_id or 0, pk))[1]).delete()
+            Sale.objects.filter(invoice=row).update(invoice=keeper)
+            row.delete()
+            merged = True
+    Invoice.objects.bulk_update(renamed, ['invoice_number'], batch_size=1000)
+
+    if merged:
+        # Invoice.refresh_totals on the invoices kept
+        sales = Sale.objects.filter(invoice=OuterRef('pk')).order_by().values('invoice')
+        Invoice.objects.filter(pk__in=[keeper.pk for keeper in merges]).update(
+            total_amount=Coalesce(Subquery(sales.annotate(total=Sum('line_total')).values('total')), 0,
+                                  output_field=DecimalField()),
+            line_count=Coalesce(Subquery(sales.annotate(lines=Count('pk')).values('lines')), 0),
+        )
+        # rebuild_sales_facts --if-empty rebuilds the hierarchy and facts of the merged rows
+        apps.get_model('sales', 'MonthlySales').objects.all().delete()
+
+    # Responses cached with the old keys are no longer used
+    apps.get_model('sales', 'DataVersion').objects.filter(pk=1).update(version=F('version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_unique_rootless_account_path'),
+        ('sales', '0013_importjob_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_keys, migrations.RunPython.noop),
+    ]
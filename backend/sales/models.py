@@ -1,7 +1,14 @@
+import os
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from brands.models import Brand  # Import from the brands app for linking the product to a brand
 from reps.models import SalesRep  # Import from the reps app for linking the sales rep
-from accounts.models import Account  # Import from the accounts app for linking the customer account
+from accounts.models import Account, BranchAccount, RootAccount  # Import from the accounts app for linking the customer account
 
 # Category model
 class Category(models.Model):
@@ -71,9 +78,27 @@ class Invoice(models.Model):
     account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='invoices')  # Reference to Account
     notes = models.TextField(null=True, blank=True)  # Additional notes for flexibility
 
+    # Totals of the invoice's sales, kept up to date by refresh_totals
+    total_amount = models.DecimalField(max_digits=20, decimal_places=4, default=0, db_index=True, editable=False)  # Sum of line totals
+    line_count = models.PositiveIntegerField(default=0, editable=False)  # Number of sale lines
+
+    # Lineage: the import that created the invoice and the first file row it came from
+    import_batch = models.ForeignKey('ImportBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='invoices')
+    source_row = models.PositiveIntegerField(null=True, blank=True)
+
     def __str__(self):
         return f"Invoice {self.invoice_number} ({self.invoice_date})"
 
+    @classmethod
+    def refresh_totals(cls, invoice_ids):
+        """Recompute the stored totals of the given invoices from their sales, in one UPDATE."""
+        sales = Sale.objects.filter(invoice=models.OuterRef('pk')).order_by().values('invoice')
+        cls.objects.filter(pk__in=invoice_ids).update(
+            total_amount=Coalesce(models.Subquery(sales.annotate(total=models.Sum('line_total')).values('total')), 0,
+                                  output_field=models.DecimalField()),
+            line_count=Coalesce(models.Subquery(sales.annotate(lines=models.Count('pk')).values('lines')), 0),
+        )
+
     class Meta:
         verbose_name = "Invoice"
         verbose_name_plural = "Invoices"
@@ -85,11 +110,13 @@ class Sale(models.Model):
     invoice = models.ForeignKey(Invoice, related_name='sales', on_delete=models.CASCADE, null=True, blank=True)  # Foreign key to Invoice
     customer = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')  # Foreign key to Customer (Account)
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')  # Foreign key to Product
+    line_number = models.PositiveIntegerField(default=1)  # Vendor line number, or the occurrence of the product on the invoice in the file
 
     # Quantity and pricing details
     quantity_sold = models.IntegerField(null=True, blank=True)  # Quantity sold
     quantity_invoiced = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Quantity invoiced
     sell_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Sell price (Invoice Amount)
+    line_total = models.DecimalField(max_digits=20, decimal_places=4, null=True, blank=True, editable=False)  # Price times quantity, see line_total_of
 
     # Commission details
     commission_percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # Commission Percentage
@@ -106,10 +133,221 @@ class Sale(models.Model):
 
     notes = models.TextField(null=True, blank=True)  # Additional notes for flexibility
 
+    # Lineage: the import that last wrote the sale and the file row it came from
+    import_batch = models.ForeignKey('ImportBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
+    source_row = models.PositiveIntegerField(null=True, blank=True)
+
     def __str__(self):
         return f"Sale for {self.product.product_code} on Invoice {self.invoice.invoice_number}"
 
+    @classmethod
+    def line_total_of(cls, sell_price, quantity_invoiced, quantity_sold):
+        """
+        The total of a sale line: its price times the quantity invoiced, or sold, or 1, taken
+        as they are stored. This is the one definition of a line total; save() and the
+        importers store it with every sale they write.
+        """
+        price = cls.stored_value('sell_price', sell_price)
+        if price is None:
+            return None
+        quantity = cls.stored_value('quantity_invoiced', quantity_invoiced)
+        if quantity is None:
+            quantity = cls.stored_value('quantity_sold', quantity_sold)
+        return price * (quantity if quantity is not None else 1)
+
+    @classmethod
+    def stored_value(cls, name, value):
+        """Return value as field name stores it, rounded like the database rounds numeric columns."""
+        field = cls._meta.get_field(name)
+        value = field.to_python(value)
+        if value is not None and isinstance(field, models.DecimalField):
+            value = value.quantize(Decimal(1).scaleb(-field.decimal_places), rounding=ROUND_HALF_UP)
+        return value
+
+    def save(self, *args, **kwargs):
+        self.line_total = self.line_total_of(self.sell_price, self.quantity_invoiced, self.quantity_sold)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'line_total'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Sale"
         verbose_name_plural = "Sales"
         ordering = ['-sale_date']
+        constraints = [
+            # Natural key of a sale line, the importers upsert on it
+            models.UniqueConstraint(fields=['invoice', 'product', 'line_number'], name='unique_sale_line'),
+        ]
+
+
+# MonthlySales model (sales pre-aggregated per month and dimension, kept up to date by sales.facts)
+class MonthlySales(models.Model):
+    month = models.DateField(null=True, blank=True)  # First day of the invoice month
+    brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # Invoice account
+    branch_account = models.ForeignKey(BranchAccount, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # Branch of the account's hierarchy path
+    root_account = models.ForeignKey(RootAccount, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # Root of that path
+    sales_rep = models.ForeignKey(SalesRep, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # Effective rep: the branch's, else the root's, the account's or the invoice's
+
+    # Measures, weighted by the hierarchy path's share of the account's sales
+    revenue = models.DecimalField(max_digits=20, decimal_places=4, default=0)  # Sum of line totals
+    amount = models.DecimalField(max_digits=20, decimal_places=4, default=0)  # Sum of sell prices as stored
+    quantity = models.DecimalField(max_digits=18, decimal_places=4, default=0)  # Sum of quantities invoiced, or sold
+    lines = models.DecimalField(max_digits=14, decimal_places=4, default=0)  # Sale lines
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} sales" if self.month else "Undated sales"
+
+    class Meta:
+        verbose_name = "Monthly Sales"
+        verbose_name_plural = "Monthly Sales"
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month', 'brand']),
+            models.Index(fields=['branch_account', 'month']),
+            models.Index(fields=['sales_rep', 'month']),
+            models.Index(fields=['account', 'month']),
+        ]
+
+
+# DataVersion model (a single row counting the changes to the sales data, see sales.response_cache)
+class DataVersion(models.Model):
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(null=True, blank=True)  # When the version was last bumped
+
+    def __str__(self):
+        return f"Data version {self.version}"
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def state(cls):
+        """Return the current version and when it was bumped."""
+        return cls.objects.filter(pk=1).values_list('version', 'changed_at').first() or (0, None)
+
+    @classmethod
+    def bump(cls):
+        """Mark the sales data as changed, so responses cached for the previous version are no longer used."""
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1, changed_at=timezone.now()):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1, 'changed_at': timezone.now()})
+
+    class Meta:
+        verbose_name = "Data Version"
+        verbose_name_plural = "Data Version"
+
+
+# ImportedFile model (the import manifest, one entry per vendor file)
+class ImportedFile(models.Model):
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_IN_PROGRESS = 'in_progress'
+    STATUS_ROLLED_BACK = 'rolled_back'
+    STATUS_CHOICES = [
+        (STATUS_SUCCESS, 'Success'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_IN_PROGRESS, 'In progress'),
+        (STATUS_ROLLED_BACK, 'Rolled back'),
+    ]
+
+    path = models.CharField(max_length=255, unique=True)  # Path of the file relative to the backend folder
+    vendor = models.CharField(max_length=50)  # Vendor format the file was imported with
+    content_hash = models.CharField(max_length=64)  # SHA-256 of the file contents
+    size = models.BigIntegerField()  # File size in bytes
+    row_count = models.IntegerField(null=True, blank=True)  # Data rows read from the file
+    committed_rows = models.IntegerField(default=0)  # Checkpoint: leading data rows whose sales are committed
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)  # Outcome of the last import
+    message = models.TextField(null=True, blank=True)  # Summary or error of the last import
+    imported_at = models.DateTimeField(auto_now=True)  # When the file was last imported
+
+    def __str__(self):
+        return f"{self.path} ({self.status})"
+
+    class Meta:
+        verbose_name = "Imported File"
+        verbose_name_plural = "Imported Files"
+        ordering = ['-imported_at']
+
+
+# ImportBatch model (one import of one vendor file, the lineage of the sales and invoices it wrote)
+class ImportBatch(models.Model):
+    path = models.CharField(max_length=255, db_index=True)  # Path of the file relative to the backend folder
+    vendor = models.CharField(max_length=50)  # Vendor format the file was imported with
+    content_hash = models.CharField(max_length=64)  # SHA-256 of the file contents
+    created_at = models.DateTimeField(auto_now_add=True)  # When the import started
+
+    def __str__(self):
+        return f"Batch {self.pk}: {self.path}"
+
+    class Meta:
+        verbose_name = "Import Batch"
+        verbose_name_plural = "Import Batches"
+        ordering = ['-created_at']
+
+
+# QuarantinedRow model (a row an import rejected, kept with the reason so it can be fixed at the source)
+class QuarantinedRow(models.Model):
+    import_batch = models.ForeignKey(ImportBatch, on_delete=models.CASCADE, related_name='quarantined_rows')  # Import that rejected the row
+    source_row = models.PositiveIntegerField()  # Row of the file, counted from the first data row
+    reason = models.CharField(max_length=255, db_index=True)  # First validation check the row failed
+    values = models.JSONField(encoder=DjangoJSONEncoder)  # The row's values as the check saw them
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Row {self.source_row} of {self.import_batch.path}: {self.reason}"
+
+    class Meta:
+        verbose_name = "Quarantined Row"
+        verbose_name_plural = "Quarantined Rows"
+        ordering = ['import_batch', 'source_row']
+
+
+def import_upload_storage():
+    # Uploads are kept out of MEDIA_ROOT, which is served publicly
+    return FileSystemStorage(location=settings.IMPORT_UPLOAD_DIR)
+
+
+def import_upload_path(instance, filename):
+    return f'{instance.vendor}/{filename}'
+
+
+# ImportJob model (an uploaded vendor file queued for the import worker)
+class ImportJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCESS, 'Success'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    vendor = models.CharField(max_length=50)  # Vendor format to import the file with
+    file = models.FileField(upload_to=import_upload_path, storage=import_upload_storage, max_length=255)  # Uploaded spreadsheet
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    import_batch = models.ForeignKey(ImportBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')  # Batch the import wrote
+    report = models.JSONField(null=True, blank=True)  # Phase timings and row outcome counts of the import
+    message = models.TextField(null=True, blank=True)  # Summary or error of the import
+    created_at = models.DateTimeField(auto_now_add=True)  # When the file was uploaded
+    started_at = models.DateTimeField(null=True, blank=True)  # When a worker picked the job up
+    updated_at = models.DateTimeField(auto_now=True, null=True)  # When the job's status or progress was last saved
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def path(self):
+        """Path of the uploaded file as the import manifest records it."""
+        return os.path.relpath(self.file.path)
+
+    def __str__(self):
+        return f"Import job {self.pk}: {self.file.name} ({self.status})"
+
+    class Meta:
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+        ordering = ['-created_at']
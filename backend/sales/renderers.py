@@ -0,0 +1,131 @@
+from decimal import Decimal
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # Arrow IPC responses are only offered when pyarrow is installed
+    pyarrow = None
+
+
+def column_kind(values, numeric=False):
+    """How a column is encoded: 'number', 'plain' (booleans or all None), 'list' or 'string' (dictionary encoded)."""
+    present = [value for value in values if value is not None]
+    if not present or all(isinstance(value, bool) for value in present):
+        return 'plain'
+    if numeric or all(isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) for value in present):
+        return 'number'
+    if any(isinstance(value, list) for value in present):
+        return 'list'
+    return 'string'
+
+
+def as_number(value):
+    return value if value is None or isinstance(value, int) else float(value)
+
+
+def encode_column(values, numeric=False):
+    """
+    Encode a column's values: numbers as an array of numbers, strings (and other values, as
+    their string) as indices into a dictionary of the distinct strings, lists as lists of
+    such indices. None stays None.
+    """
+    kind = column_kind(values, numeric)
+    if kind == 'plain':
+        return values
+    if kind == 'number':
+        return [as_number(value) for value in values]
+
+    dictionary, positions = [], {}
+
+    def index(value):
+        value = str(value)
+        if value not in positions:
+            positions[value] = len(dictionary)
+            dictionary.append(value)
+        return positions[value]
+
+    if kind == 'list':
+        indices = [None if value is None else [index(item) for item in value] for value in values]
+    else:
+        indices = [None if value is None else index(value) for value in values]
+    return {'dictionary': dictionary, 'indices': indices}
+
+
+def rows_and_envelope(data):
+    """Split a list of rows, or a page of them, into the rows and the page's other keys; (None, data) otherwise."""
+    if isinstance(data, list):
+        return data, {}
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return data['results'], {key: value for key, value in data.items() if key != 'results'}
+    return None, data
+
+
+def row_columns(rows):
+    names = list(rows[0]) if rows else []
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+class ColumnarRenderer(JSONRenderer):
+    """
+    JSON of rows as columns, for ?format=columnar: {"length", "columns"} plus the keys of a
+    page (count, next, previous). Columns are encoded by encode_column; the view's
+    numeric_columns are sent as numbers even when serialized as strings.
+    """
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows, envelope = rows_and_envelope(data)
+        if rows is not None:
+            numeric_columns = getattr((renderer_context or {}).get('view'), 'numeric_columns', ())
+            data = {**envelope, 'length': len(rows), 'columns': {
+                name: encode_column(values, name in numeric_columns) for name, values in row_columns(rows).items()
+            }}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class ArrowRenderer(BaseRenderer):
+    """
+    Apache Arrow IPC stream of rows, for ?format=arrow, with dictionary-encoded string
+    columns. The keys of a page (count, next, previous) are in the schema metadata; data
+    other than rows (errors) is sent as a single row.
+    """
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def arrow_type(self, kind):
+        """Arrow type of a column_kind; None lets pyarrow infer it (int64, double or bool)."""
+        strings = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        return {'string': strings, 'list': pyarrow.list_(strings)}.get(kind)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows, envelope = rows_and_envelope(data)
+        if rows is None:
+            rows, envelope = [{key: str(value) for key, value in data.items()}] if isinstance(data, dict) else [], {}
+        numeric_columns = getattr((renderer_context or {}).get('view'), 'numeric_columns', ())
+
+        arrays = {}
+        for name, values in row_columns(rows).items():
+            kind = column_kind(values, name in numeric_columns)
+            if kind == 'number':
+                values = [as_number(value) for value in values]
+            elif kind == 'string':
+                values = [None if value is None else str(value) for value in values]
+            elif kind == 'list':
+                values = [None if value is None else [str(item) for item in value] for value in values]
+            arrays[name] = pyarrow.array(values, type=self.arrow_type(kind))
+
+        table = pyarrow.table(arrays)
+        if envelope:
+            table = table.replace_schema_metadata({key: str(value) for key, value in envelope.items() if value is not None})
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+# Renderers of the bulk analytics endpoints: the default ones, then the columnar formats
+BULK_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarRenderer, *([ArrowRenderer] if pyarrow else [])]
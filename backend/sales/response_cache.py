@@ -0,0 +1,84 @@
+import hashlib
+from functools import wraps
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.timezone import now
+from rest_framework.response import Response
+from .models import DataVersion
+
+# Responses of the analytics endpoints, cached until the sales data changes, and the
+# ETags of the large listings, which change with it.
+#
+# An entry is keyed by the data version, the endpoint, its query parameters, the requesting
+# user's permissions and the date, which the YTD and last-12-months figures depend on.
+# DataVersion is bumped whenever the sales, invoices, products, accounts, their hierarchy,
+# the sales reps or their users change (see sales.signals, and refresh_sales_facts for the imports' bulk
+# writes), after which no request looks the older entries up again; the cache culls them
+# as it fills up.
+
+
+def data_changed():
+    """Bump the data version once the current transaction commits."""
+    transaction.on_commit(DataVersion.bump)
+
+
+def permissions_key(user):
+    if user.is_superuser:
+        return 'superuser'
+    return ','.join(sorted(user.get_all_permissions())) + (':staff' if user.is_staff else '')
+
+
+def request_digest(request, *parts):
+    """Hash of the endpoint, query parameters and permissions of a request, and parts."""
+    params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+    return hashlib.sha256(repr((request.path, params, permissions_key(request.user), *parts)).encode()).hexdigest()
+
+
+def response_key(request, version):
+    return f'response:{version}:{request_digest(request, now().date())}'
+
+
+def cached_response(handler):
+    """Decorate a view's get/retrieve handler to serve its successful responses from the response cache."""
+    @wraps(handler)
+    def cached(view, request, *args, **kwargs):
+        cache = caches['responses']
+        key = response_key(request, DataVersion.current())
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
+    return cached
+
+
+def conditional_response(handler):
+    """
+    Decorate a view's GET handler to tag its responses with a strong ETag and Last-Modified
+    from the data version, and to answer requests for a copy that is still current with
+    304 Not Modified without running the handler. For endpoints that don't depend on the date.
+    """
+    @wraps(handler)
+    def conditional(view, request, *args, **kwargs):
+        version, changed_at = DataVersion.state()
+        etag = quote_etag(request_digest(request, version, request.accepted_renderer.format, request.accepted_media_type))
+        last_modified = int(changed_at.timestamp()) if changed_at else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response.headers['ETag'] = etag
+        if last_modified:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        # Browsers keep the response but check it is still current on every visit
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return conditional
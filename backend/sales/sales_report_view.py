@@ -3,8 +3,15 @@ from rest_framework.response import Response
 from django.db.models import F, Prefetch
 from sales.models import Sale
 from accounts.models import BranchAccount
+from sales.renderers import BULK_RENDERERS
+from sales.response_cache import conditional_response
 
 class SalesReportView(APIView):
+    # 'format' may also be 'columnar' or 'arrow' (see sales.renderers)
+    renderer_classes = BULK_RENDERERS
+    numeric_columns = ['quantity_sold', 'quantity_invoiced', 'sell_price']
+
+    @conditional_response
     def get(self, request, *args, **kwargs):
         # Query the sales data with related objects for efficient querying
         sales = Sale.objects.select_related(
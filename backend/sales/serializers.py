@@ -1,6 +1,7 @@
 
 from rest_framework import serializers
-from .models import Product, Invoice, Sale, Category, SubCategory, Tag
+from .models import Product, Invoice, Sale, Category, SubCategory, Tag, ImportedFile, ImportJob
+from .importers.adapters import FORMATS
 from django.db.models import Sum, F, DecimalField, Value, Count, Min, Max
 from brands.models import Brand
 from accounts.models import Account
@@ -105,13 +106,14 @@ class InvoiceSerializer(serializers.ModelSerializer):
         model = Invoice
         fields = [
             'id', 'invoice_date', 'invoice_number', 'customer_po', 
-            'sales_rep', 'account', 'notes', 'sales'
+            'sales_rep', 'account', 'notes', 'total_amount', 'line_count', 'sales'
         ]
 
 
 
 class SaleSerializer(serializers.ModelSerializer):
     product = ProductSerializer() 
+    line_price = serializers.SerializerMethodField()
 
     class Meta:
         model = Sale
@@ -122,11 +124,8 @@ class SaleSerializer(serializers.ModelSerializer):
         ]
 
     def get_line_price(self, obj):
-        quantity = (
-            obj.quantity_invoiced if obj.quantity_invoiced and obj.quantity_invoiced > 0
-            else obj.quantity_sold if obj.quantity_sold and obj.quantity_sold > 0 else 1
-        )
-        return float(quantity) * float(obj.sell_price) if obj.sell_price else 0
+        # The line total stored with the sale
+        return float(obj.line_total) if obj.line_total else 0
 
 
 
@@ -204,4 +203,28 @@ class AnalysisSerializer(serializers.ModelSerializer):
                 'time_since_last_purchase': time_since_last
             })
 
-        return product_reports
\ No newline at end of file
+        return product_reports
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    vendor = serializers.ChoiceField(choices=sorted(FORMATS))
+    file = serializers.FileField(write_only=True)
+    file_name = serializers.CharField(source='file.name', read_only=True)
+    committed_rows = serializers.SerializerMethodField()  # Progress: rows whose sales are committed so far
+
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'vendor', 'file', 'file_name', 'status', 'committed_rows', 'report', 'message',
+                  'import_batch', 'created_at', 'started_at', 'updated_at', 'finished_at']
+        read_only_fields = ['status', 'report', 'message', 'import_batch', 'created_at', 'started_at', 'updated_at',
+                            'finished_at']
+
+    def validate_file(self, file):
+        if not file.name.endswith(('.xlsx', '.csv')):
+            raise serializers.ValidationError("Upload an .xlsx or .csv file.")
+        return file
+
+    def get_committed_rows(self, obj):
+        # The import checkpoints every committed batch in the manifest
+        committed = ImportedFile.objects.filter(path=obj.path).values_list('committed_rows', flat=True).first()
+        return committed or 0
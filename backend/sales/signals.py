@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from accounts.models import Account, BranchAccount, RootAccount
+from accounts.signals import hierarchy_changed
+from brands.models import Brand
+from reps.models import SalesRep
+from .facts import sales_months, schedule_refresh
+from .models import Category, Invoice, Product, Sale, SubCategory, Tag
+from .response_cache import data_changed
+
+# Keep the invoice totals and the MonthlySales facts in step with edits made through the ORM.
+# The importers write with bulk SQL and refresh both themselves (see BulkImporter.run and
+# VendorImportCommand.refresh_facts).
+
+
+@receiver(pre_save, sender=Sale)
+@receiver(pre_delete, sender=Sale)
+def remember_stored_sale(sender, instance, raw=False, **kwargs):
+    # A sale moved to another invoice, or deleted, leaves the totals and facts of its stored invoice behind
+    stored = None
+    if instance.pk and not raw:
+        stored = Sale.objects.filter(pk=instance.pk).values_list('invoice', 'invoice__invoice_date').first()
+    instance._stored_invoice = stored[0] if stored else None
+    instance._fact_months = {stored[1].replace(day=1) if stored[1] else None} if stored else set()
+
+
+@receiver(post_save, sender=Sale)
+def refresh_sale_totals(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Invoice.refresh_totals({instance._stored_invoice, instance.invoice_id} - {None})
+    schedule_refresh(months=instance._fact_months | sales_months(Sale.objects.filter(pk=instance.pk)))
+
+
+@receiver(post_delete, sender=Sale)
+def refresh_deleted_sale_totals(sender, instance, **kwargs):
+    if instance._stored_invoice:
+        Invoice.refresh_totals([instance._stored_invoice])
+    schedule_refresh(months=instance._fact_months)
+
+
+@receiver(pre_save, sender=Invoice)
+def remember_invoice_months(sender, instance, raw=False, **kwargs):
+    instance._fact_months = sales_months(Sale.objects.filter(invoice=instance.pk)) if instance.pk and not raw else set()
+
+
+@receiver(post_save, sender=Invoice)
+def refresh_invoice_facts(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # The saved instance may hold totals from before its sales last changed
+    Invoice.refresh_totals([instance.pk])
+    if not instance._fact_months:
+        return  # Invoices without sales have no facts
+    months = instance._fact_months | {instance.invoice_date.replace(day=1) if instance.invoice_date else None}
+    schedule_refresh(months=months)
+
+
+@receiver(post_save, sender=Account)
+def refresh_account_facts(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        schedule_refresh(accounts=[instance.pk])
+
+
+@receiver(post_save, sender=BranchAccount)
+def refresh_branch_facts(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        schedule_refresh(accounts=instance.accounts.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=RootAccount)
+def refresh_root_facts(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        schedule_refresh(accounts=Account.objects.filter(branch_accounts__root_accounts=instance).values_list('pk', flat=True))
+
+
+@receiver(hierarchy_changed)
+def refresh_hierarchy_facts(sender, accounts, **kwargs):
+    # The accounts' sales moved between branches and roots
+    schedule_refresh(accounts=accounts)
+
+
+# Any change to the data the analytics endpoints read makes their cached responses stale
+@receiver([post_save, post_delete], sender=Sale)
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=Account)
+@receiver([post_save, post_delete], sender=BranchAccount)
+@receiver([post_save, post_delete], sender=RootAccount)
+@receiver([post_save, post_delete], sender=SalesRep)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SubCategory)
+@receiver([post_save, post_delete], sender=Tag)
+def bump_data_version(sender, **kwargs):
+    data_changed()
+
+
+@receiver(post_save, sender=get_user_model())
+def bump_user_version(sender, update_fields=None, **kwargs):
+    # Sales reps are shown by their user's name; logins only update last_login
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        data_changed()
+
+
+@receiver(m2m_changed, sender=BranchAccount.accounts.through)
+@receiver(m2m_changed, sender=RootAccount.branch_accounts.through)
+@receiver(m2m_changed, sender=Product.tags.through)
+def bump_relation_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        data_changed()
@@ -1,3 +1,579 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+import pandas as pd
+from django.core.management import call_command, load_command_class
+from django.test import SimpleTestCase, TestCase, override_settings
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from accounts.models import Account, BranchAccount, RootAccount
+from brands.models import Brand
+from reps.models import SalesRep
+from sales.facts import refresh_sales_facts
+from sales.importers.adapters import FORMATS, MissingColumns
+from sales.importers.bulk import BulkImporter
+from sales.importers.copy_loader import CopyImporter
+from sales.importers.manifest import file_fingerprint, resume_point
+from sales.importers.readers import read_batches
+from sales.models import DataVersion, ImportBatch, ImportedFile, Invoice, MonthlySales, Product, Sale
+from sales.renderers import ArrowRenderer, ColumnarRenderer, encode_column, pyarrow
+from users.models import UserProfile
+
+
+class VendorFormatCleanTests(SimpleTestCase):
+    """The records, skipped rows and warnings each vendor format cleans a batch into."""
+
+    def test_boss(self):
+        df = pd.DataFrame({
+            'Inv#': ['770426', '770427', None], 'Date': ['06/08/23', '13/45/23', '06/09/23'],
+            'C#': ['2599', '2600', '2601'], 'Name': ['st mary hosp', 'Acme', 'Bob'],
+            'CSV': ['Raleigh, NC 27607', 'Durham, NC 27701', 'Durham, NC 27701'],
+            'Item#': ['60-1258', '60-1274', '60-1300'], 'Desc': ['Rongeur', 'Forceps', 'Clamp'],
+            'Qty': [1, 2, 3], 'Ext Prc': [900, 844, 10], 'Comm': [180, 211, 2], '%': [0.2, 0.25, 0.2],
+        })
+        records, skipped, warnings = FORMATS['boss'].clean(df)
+
+        self.assertEqual(records, [{
+            'row': 1, 'invoice_number': '770426', 'invoice_date': pd.Timestamp('2023-06-08'),
+            'customer_number': '2599', 'customer_name': 'St Mary Hospital', 'product_code': '60-1258',
+            'product_description': 'Rongeur', 'quantity_sold': 1, 'sell_price': 900, 'commission_amount': 180,
+            'commission_percentage': 0.2, 'city': 'Raleigh', 'state': 'NC', 'zip_code': '27607',
+        }])
+        self.assertEqual([(row, reason) for row, reason, values in skipped], [
+            (2, "invalid 'Invoice Date'"),
+            (3, "missing 'Customer Number' or 'Invoice Number'"),
+        ])
+        self.assertEqual(skipped[0][2]['Date'], '13/45/23')
+        self.assertEqual(warnings, [])
+
+    def test_grace(self):
+        df = pd.DataFrame({
+            'Invoice Date': ['2023-01-05', '2023-01-05', '2023-01-06'], 'Sales Rep': ['A', 'A', 'A'],
+            'Sub Rep': ['jane doe', None, None], 'Customer Order': ['', '', ''], 'Customer ID': ['C1', 'C1', 'C2'],
+            'Customer Name': ['acme', 'acme', 'b'], 'City': ['Raleigh'] * 3, 'State': ['NC'] * 3, 'ZIP': ['27607'] * 3,
+            'Country': ['US'] * 3, 'Invoice Number': ['100', '100', '101'], 'Invoice Line': ['1', '2', '1'],
+            'Part ID': ['P-1', 'P-2', 'P-3'], 'Product': ['G-SURGICAL', 'G-SURGICAL', 'ZZ'],
+            'Reference': ['P-1 Retractor', 'Clamp', 'Gauze'], 'Invoice Quantity': [1, 2, 3],
+            'Invoice Amount': [10, 20, 30], 'Comm Percentage': [5, 5, 5], 'Commission Due': [0.5, 1, 1.5],
+        })
+        records, skipped, warnings = FORMATS['grace'].clean(df)
+
+        self.assertEqual([(record['row'], record['invoice_number'], record['line_number'], record['product_code'])
+                          for record in records], [(1, '100', 1, 'P-1'), (2, '100', 2, 'P-2')])
+        self.assertEqual(records[0]['sub_rep'], 'Jane Doe')
+        self.assertEqual(records[0]['product_description'], 'Retractor')
+        self.assertEqual(records[0]['category'], 'Surgical')
+        self.assertEqual(records[0]['sku_code'], '')
+        self.assertNotIn('_product', records[0])
+        self.assertEqual([(row, reason) for row, reason, values in skipped], [(3, "'ZZ' found in 'Product'")])
+        self.assertEqual(warnings, [])
+
+    def test_hemostasis(self):
+        df = pd.DataFrame({
+            'Order #': ['5001', '5002'], 'Customer': ['duke', 'unc'], 'City': ['durham', None], 'State': ['NC', 'NC'],
+            'Part': ['H1', 'H2'], 'Description': ['Gel', 'Gel'], 'Ship Date': ['2023-02-01', '2023-02-02'],
+            'Quantity': ['2', 'abc'], 'Part Price': ['12.50', '1'],
+        })
+        records, skipped, warnings = FORMATS['hemostasis'].clean(df)
+
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual((record['customer_number'], record['invoice_number']), ('5001', '5001'))
+        self.assertEqual((record['customer_name'], record['city']), ('Duke', 'Durham'))
+        self.assertEqual(record['invoice_date'], pd.Timestamp('2023-02-01'))
+        self.assertEqual(record['quantity_sold'], 2)
+        self.assertEqual(record['sell_price'], Decimal('12.50'))
+        self.assertEqual([(row, reason) for row, reason, values in skipped], [(2, "invalid 'Quantity' or 'Part Price'")])
+
+    def test_kirwan(self):
+        df = pd.DataFrame({
+            'Customer': ['D1', 'D1'], 'Name': ['unc rex', 'unc rex'], 'Item': ['24-1', '24-1'],
+            'Description': ['FCP', 'FCP'], 'Invoice': ['416115', '416115'], 'Invoice Date': ['2022-11-09', 'garbage'],
+            'Qty Invoiced': ['1', 'n/a'], 'Price': ['625', '10'], 'Commission Earned': ['156.25', '1'],
+            'Slsp Comm Base': ['625', '10'],
+        })
+        records, skipped, warnings = FORMATS['kirwan'].clean(df)
+
+        self.assertEqual(skipped, [])
+        self.assertEqual([record['invoice_date'] for record in records], [pd.Timestamp('2022-11-09'), None])
+        self.assertEqual([record['sale_date'] for record in records], [pd.Timestamp('2022-11-09'), None])
+        self.assertEqual([record['quantity_invoiced'] for record in records], [Decimal('1'), Decimal('0')])
+        self.assertEqual(records[0]['commission_amount'], Decimal('156.25'))
+        # Optional columns the file lacks take their defaults
+        self.assertEqual((records[0]['address'], records[0]['line_number']), ('', None))
+        self.assertEqual(warnings, [
+            (2, "invalid 'Qty Invoiced' value, setting to 0"),
+            (2, "unparseable 'Invoice Date' value, setting to blank"),
+        ])
+
+    def test_missing_columns(self):
+        with self.assertRaises(MissingColumns):
+            FORMATS['boss'].clean(pd.DataFrame({'Inv#': ['1']}))
+
+    def test_text_columns(self):
+        self.assertEqual(FORMATS['boss'].text_columns, ['C#', 'Inv#', 'Item#'])
+        self.assertEqual(FORMATS['kirwan'].text_columns, ['Customer', 'Invoice', 'Item', 'Line'])
+
+
+class NumberLinesTests(SimpleTestCase):
+
+    def test_occurrences_continue_across_batches(self):
+        kirwan = FORMATS['kirwan']
+        lines = Counter()
+        first = [{'invoice_number': '1', 'product_code': 'A'}, {'invoice_number': '1', 'product_code': 'B'}]
+        second = [{'invoice_number': '1', 'product_code': 'A'}, {'invoice_number': '2', 'product_code': 'A'}]
+        kirwan.number_lines(first, lines)
+        kirwan.number_lines(second, lines)
+
+        self.assertEqual([record['line_number'] for record in first + second], [1, 1, 2, 1])
+        self.assertEqual([record['occurrence'] for record in first + second], [1, 1, 2, 1])
+
+    def test_vendor_lines_are_kept(self):
+        records = [
+            {'invoice_number': '100', 'product_code': 'P-1', 'line_number': 3},
+            {'invoice_number': '100', 'product_code': 'P-1', 'line_number': 7},
+        ]
+        FORMATS['grace'].number_lines(records, Counter())
+
+        self.assertEqual([(record['line_number'], record['occurrence']) for record in records], [(3, 1), (7, 2)])
+
+
+class ReadBatchesTests(SimpleTestCase):
+    """Batches read from spreadsheets, with the key columns read as text."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_xlsx(self, rows):
+        path = os.path.join(self.directory, 'sales.xlsx')
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(path)
+        return path
+
+    def write_csv(self, text):
+        path = os.path.join(self.directory, 'sales.csv')
+        with open(path, 'w') as csv_file:
+            csv_file.write(text)
+        return path
+
+    def test_xlsx_batches(self):
+        path = self.write_xlsx([
+            ['Report'], [],
+            ['Invoice', 'Qty'],
+            [416115, 1], [None, 2], [416116, 3.5],
+        ])
+        frames = list(read_batches(path, 2, skiprows=2, text_columns=['Invoice']))
+
+        self.assertEqual([list(frame.index) for frame in frames], [[0, 1], [2]])
+        keys = pd.concat(frames)['Invoice'].tolist()
+        self.assertEqual([keys[0], keys[2]], ['416115', '416116'])
+        self.assertTrue(pd.isna(keys[1]))
+        # The other columns are typed per batch
+        self.assertEqual(list(frames[0]['Qty']), [1, 2])
+        self.assertEqual(list(frames[1]['Qty']), [3.5])
+
+    def test_xlsx_header_marker(self):
+        path = self.write_xlsx([['Exported'], [' Invoice ', 'Invoice Date'], [100, '2023-01-05']])
+        frame, = read_batches(path, 10, header_marker='Invoice Date', text_columns=['Invoice'])
+
+        self.assertEqual(list(frame.columns), [' Invoice ', 'Invoice Date'])
+        self.assertEqual(frame[' Invoice '].tolist(), ['100'])
+
+    def test_xlsx_without_header_marker(self):
+        path = self.write_xlsx([['Invoice'], [100]])
+        with self.assertRaises(ValueError):
+            list(read_batches(path, 10, header_marker='Invoice Date'))
+
+    def test_csv_batches(self):
+        path = self.write_csv('Exported\nInvoice,Qty\n416115,1\n,2\n0416116,3.5\n')
+        frames = list(read_batches(path, 2, header_marker='Invoice', text_columns=['Invoice']))
+
+        self.assertEqual([list(frame.index) for frame in frames], [[0, 1], [2]])
+        keys = pd.concat(frames)['Invoice'].tolist()
+        # Leading zeros are kept and a blank key doesn't turn the column into floats
+        self.assertEqual([keys[0], keys[2]], ['416115', '0416116'])
+        self.assertTrue(pd.isna(keys[1]))
+        self.assertEqual(frames[1]['Qty'].tolist(), [3.5])
+
+
+def sale_record(row=1, **values):
+    """A cleaned record of one sale line, as the vendor formats return them."""
+    record = {
+        'row': row, 'customer_number': 'C1', 'customer_name': 'Duke Hospital', 'invoice_number': '100',
+        'invoice_date': pd.Timestamp('2023-01-05'), 'product_code': 'P-1', 'product_description': 'Forceps',
+        'line_number': 1, 'occurrence': 1, 'quantity_sold': 2, 'sell_price': Decimal('10.00'),
+    }
+    record.update(values)
+    return record
+
+
+class BulkImporterTests(TestCase):
+    """Sales upserted on their natural key, counted as created, updated or unchanged."""
+    importer_class = BulkImporter
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Kirwan')
+        self.batch = ImportBatch.objects.create(path='files/kirwan/sales.xlsx', vendor='kirwan', content_hash='a' * 64)
+
+    def run_importer(self, records):
+        return self.importer_class(self.brand, import_batch=self.batch).run(records)
+
+    def test_upsert_counts(self):
+        records = [sale_record(1), sale_record(2, product_code='P-2')]
+        self.assertEqual(self.run_importer(records), (2, 0, 0))
+        self.assertEqual(self.run_importer(records), (0, 0, 2))
+
+        records[1]['sell_price'] = Decimal('12.00')
+        self.assertEqual(self.run_importer(records), (0, 1, 1))
+        self.assertEqual(Sale.objects.get(product__product_code='P-2').sell_price, Decimal('12.00'))
+        invoice = Invoice.objects.get()
+        self.assertEqual((invoice.line_count, invoice.total_amount), (2, Decimal('44.00')))
+
+    def test_repeated_line_is_written_once(self):
+        records = [sale_record(1), sale_record(2, sell_price=Decimal('11.00'))]
+        self.assertEqual(self.run_importer(records), (1, 0, 1))
+        sale = Sale.objects.get()
+        self.assertEqual((sale.sell_price, sale.source_row, sale.import_batch), (Decimal('11.00'), 2, self.batch))
+
+    def test_legacy_sale_is_renumbered_to_the_vendor_line(self):
+        self.run_importer([sale_record(1, line_number=4)])
+        sale = Sale.objects.get()
+        # Stored before the import keyed lines on the vendor's: no lineage, numbered by occurrence
+        Sale.objects.filter(pk=sale.pk).update(line_number=1, import_batch=None)
+
+        self.assertEqual(self.run_importer([sale_record(1, line_number=4)]), (0, 1, 0))
+        sale = Sale.objects.get()
+        self.assertEqual((sale.line_number, sale.import_batch), (4, self.batch))
+
+    def test_legacy_copy_of_a_stored_line_is_deleted(self):
+        self.run_importer([sale_record(1, line_number=4)])
+        legacy = Sale.objects.get()
+        legacy.pk, legacy.line_number, legacy.import_batch = None, 1, None
+        legacy.save()
+
+        self.assertEqual(self.run_importer([sale_record(1, line_number=4)]), (0, 0, 1))
+        self.assertEqual(list(Sale.objects.values_list('line_number', flat=True)), [4])
+
+
+class CopyImporterTests(BulkImporterTests):
+    importer_class = CopyImporter
+
+
+KIRWAN_HEADER = 'Customer,Name,Item,Description,Invoice,Invoice Date,Line,Qty Invoiced,Price,Commission Earned,Slsp Comm Base'
+
+
+class VendorImportTests(TestCase):
+    """Importing, resuming, rolling back and replacing a vendor file with the Kirwan commands."""
+    path = 'files/kirwan/sales.csv'
+
+    def setUp(self):
+        # The vendor folders are relative to the backend folder, so work from a copy of their layout
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        os.makedirs(os.path.join(directory.name, 'files', 'kirwan'))
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        settings = override_settings(IMPORT_CACHE_DIR=os.path.join(directory.name, 'cache'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        os.makedirs(os.path.join(directory.name, 'cache'))
+
+    def write_file(self, *lines):
+        """Write the Kirwan file with (invoice, item, line, price) rows."""
+        rows = [f'D1,Duke Hospital,{item},Forceps,{invoice},2023-01-05,{line},1,{price},0,{price}'
+                for invoice, item, line, price in lines]
+        with open(self.path, 'w') as csv_file:
+            csv_file.write('\n'.join([KIRWAN_HEADER, *rows]) + '\n')
+
+    def import_kirwan(self, *args):
+        call_command('import_kirwan', *args, stdout=StringIO())
+
+    def test_resume_from_checkpoint(self):
+        self.write_file(*[('100', f'P-{line}', line, 10) for line in range(1, 6)])
+        content_hash, size = file_fingerprint(self.path)
+        command = load_command_class('sales', 'import_kirwan')
+        command.stdout = StringIO()
+        command.batch_size = 2
+
+        def interrupted(file_path, content_hash, start_row):
+            for batch, parsed in enumerate(command.parse_file(file_path, content_hash, start_row)):
+                if batch == 2:
+                    raise OSError('connection lost')
+                yield parsed
+
+        self.assertFalse(command.import_file(self.path, command.get_brand(), content_hash, size, parse=interrupted))
+        self.assertEqual(Sale.objects.count(), 4)
+        self.assertEqual(resume_point(self.path, content_hash), 4)
+
+        self.import_kirwan('--resume')
+        self.assertEqual(sorted(Sale.objects.values_list('line_number', flat=True)), [1, 2, 3, 4, 5])
+        self.assertEqual(ImportBatch.objects.count(), 2)
+        self.assertEqual(ImportedFile.objects.get().status, ImportedFile.STATUS_SUCCESS)
+
+    def test_import_refreshes_facts(self):
+        self.write_file(('100', 'P-1', 1, 10), ('101', 'P-1', 1, 20))
+        version = DataVersion.current()
+        self.import_kirwan()
+
+        facts = sorted(MonthlySales.objects.values_list('month', 'account', 'revenue'))
+        self.assertEqual(sum(revenue for _, _, revenue in facts), Decimal('30'))
+        refresh_sales_facts()
+        self.assertEqual(sorted(MonthlySales.objects.values_list('month', 'account', 'revenue')), facts)
+        self.assertGreater(DataVersion.current(), version)
+
+    def test_rollback_import_batch(self):
+        self.write_file(('100', 'P-1', 1, 10), ('101', 'P-1', 1, 20))
+        self.import_kirwan()
+        batch = ImportBatch.objects.get()
+        self.assertEqual(batch.sales.count(), 2)
+
+        call_command('rollback_import_batch', batch.pk, stdout=StringIO())
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(Invoice.objects.exists())
+        self.assertEqual(ImportedFile.objects.get().status, ImportedFile.STATUS_ROLLED_BACK)
+
+        # The rolled back file isn't imported again until it changes
+        self.import_kirwan()
+        self.assertFalse(Sale.objects.exists())
+
+    def test_replace_import_file(self):
+        self.write_file(('100', 'P-1', 1, 10), ('100', 'P-2', 2, 20), ('101', 'P-1', 1, 30))
+        self.import_kirwan()
+        # A line stored before lineage was recorded, which the corrected file doesn't have
+        invoice = Invoice.objects.get(invoice_number='100')
+        Sale.objects.create(invoice=invoice, product=Product.objects.get(product_code='P-2'), line_number=3)
+
+        self.write_file(('100', 'P-1', 1, 15), ('101', 'P-1', 1, 30))
+        out = StringIO()
+        call_command('replace_import_file', self.path, stdout=out)
+
+        self.assertEqual(sorted(Sale.objects.values_list('invoice__invoice_number', 'line_number', 'sell_price')),
+                         [('100', 1, Decimal('15.00')), ('101', 1, Decimal('30.00'))])
+        self.assertEqual(set(Sale.objects.values_list('import_batch', flat=True)),
+                         {ImportBatch.objects.latest('pk').pk})
+        self.assertIn('Deleted 1 sales imported before lineage', out.getvalue())
+        self.assertEqual(Invoice.objects.get(invoice_number='100').line_count, 1)
+
+
+class SalesFactsTests(TestCase):
+    """MonthlySales rows aggregated from the sales through the account hierarchy."""
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Boss')
+        self.product = Product.objects.create(product_code='60-1258', brand=self.brand)
+        self.duke = Account.objects.create(name='Duke Hospital', customer_number='C1')
+        self.wake = Account.objects.create(name='Wake Med', customer_number='C2')
+        self.north = BranchAccount.objects.create(name='North')
+        self.south = BranchAccount.objects.create(name='South')
+        self.north.accounts.add(self.duke)
+        self.south.accounts.add(self.duke)
+
+        self.january = Invoice.objects.create(invoice_number='100', account=self.duke, invoice_date=date(2023, 1, 5))
+        self.february = Invoice.objects.create(invoice_number='101', account=self.wake, invoice_date=date(2023, 2, 7))
+        self.add_sale(self.january, 1, quantity_sold=2, sell_price=Decimal('10'))
+        self.add_sale(self.january, 2, quantity_invoiced=1, sell_price=Decimal('5'))
+        self.add_sale(self.february, 1, sell_price=Decimal('7'))
+
+    def add_sale(self, invoice, line_number, **values):
+        return Sale.objects.create(invoice=invoice, product=self.product, customer=invoice.account,
+                                   line_number=line_number, **values)
+
+    def facts(self):
+        return sorted((fact.month, fact.account_id, fact.branch_account_id, fact.sales_rep_id, fact.revenue, fact.lines)
+                      for fact in MonthlySales.objects.all())
+
+    def test_refresh_all(self):
+        self.assertEqual(refresh_sales_facts(), 3)
+
+        # Duke's sales are split between its two branches, Wake keeps its whole sales
+        self.assertEqual(self.facts(), [
+            (date(2023, 1, 1), self.duke.pk, self.north.pk, None, Decimal('12.5'), Decimal('1')),
+            (date(2023, 1, 1), self.duke.pk, self.south.pk, None, Decimal('12.5'), Decimal('1')),
+            (date(2023, 2, 1), self.wake.pk, None, None, Decimal('7'), Decimal('1')),
+        ])
+
+    def test_refresh_months(self):
+        refresh_sales_facts()
+        february = MonthlySales.objects.get(month=date(2023, 2, 1)).pk
+        # Bulk writes send no signals
+        Sale.objects.filter(invoice=self.january, line_number=2).update(line_total=Decimal('9'))
+
+        self.assertEqual(refresh_sales_facts(months={date(2023, 1, 1)}), 2)
+        self.assertEqual(MonthlySales.objects.get(month=date(2023, 2, 1)).pk, february)
+        facts = self.facts()
+        refresh_sales_facts()
+        self.assertEqual(facts, self.facts())
+        self.assertEqual(facts[0][4], Decimal('14.5'))
+
+    def test_refresh_accounts(self):
+        refresh_sales_facts()
+        rep = SalesRep.objects.create(user=UserProfile.objects.create_user(username='jane_doe'), code='JD')
+        Account.objects.filter(pk=self.wake.pk).update(sales_rep=rep)
+
+        self.assertEqual(refresh_sales_facts(accounts={self.wake.pk}), 1)
+        self.assertEqual(MonthlySales.objects.get(account=self.wake).sales_rep, rep)
+        self.assertEqual(refresh_sales_facts(accounts=set()), 0)
+
+    def test_refresh_bumps_data_version(self):
+        version = DataVersion.current()
+        refresh_sales_facts(months={date(2023, 2, 1)})
+        self.assertEqual(DataVersion.current(), version + 1)
+
+    def test_edits_refresh_facts_on_commit(self):
+        refresh_sales_facts()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_sale(self.february, 2, sell_price=Decimal('3'))
+        self.assertEqual(MonthlySales.objects.get(month=date(2023, 2, 1)).revenue, Decimal('10'))
+
+        # Moving an account to another branch moves its sales
+        with self.captureOnCommitCallbacks(execute=True):
+            self.north.accounts.add(self.wake)
+        self.assertEqual(MonthlySales.objects.get(month=date(2023, 2, 1)).branch_account, self.north)
+
+
+class AnalysisViewTests(TestCase):
+    """The filters, ordering and pages of the sales/analysis/ rows."""
+    url = '/marathon/api/sales/analysis/'
+
+    def setUp(self):
+        boss, grace = Brand.objects.create(name='Boss'), Brand.objects.create(name='Grace')
+        rongeur = Product.objects.create(product_code='60-1258', brand=boss)
+        retractor = Product.objects.create(product_code='P-1', brand=grace)
+        self.duke = Account.objects.create(name='Duke Hospital', customer_number='C1', state='NC')
+        self.wake = Account.objects.create(name='Wake Med', customer_number='C2', state='SC')
+        self.north = BranchAccount.objects.create(name='North')
+        self.atrium = RootAccount.objects.create(name='Atrium')
+        self.north.accounts.add(self.duke)
+        self.atrium.branch_accounts.add(self.north)
+
+        january = Invoice.objects.create(invoice_number='100', account=self.duke, invoice_date=date(2023, 1, 5))
+        february = Invoice.objects.create(invoice_number='101', account=self.wake, invoice_date=date(2023, 2, 7))
+        self.sales = [
+            Sale.objects.create(invoice=january, product=rongeur, line_number=1, sell_price=Decimal('30')),
+            Sale.objects.create(invoice=january, product=retractor, line_number=1, sell_price=Decimal('10')),
+            Sale.objects.create(invoice=february, product=rongeur, line_number=1, sell_price=Decimal('20')),
+        ]
+        self.boss = boss
+
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(UserProfile.objects.create_user(username='analyst'))
+
+    def ids(self, params=None):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_filters(self):
+        first, second, third = (sale.pk for sale in self.sales)
+        self.assertEqual(self.ids(), [first, second, third])
+        self.assertEqual(self.ids({'brand': self.boss.pk}), [first, third])
+        self.assertEqual(self.ids({'account': f'{self.duke.pk},{self.wake.pk}', 'brand': self.boss.pk}), [first, third])
+        self.assertEqual(self.ids({'branch_account': self.north.pk}), [first, second])
+        self.assertEqual(self.ids({'root_account': self.atrium.pk}), [first, second])
+        self.assertEqual(self.ids({'state': 'SC'}), [third])
+        self.assertEqual(self.ids({'start_date': '2023-02-01'}), [third])
+        self.assertEqual(self.ids({'end_date': '2023-01-31'}), [first, second])
+
+    def test_ordering(self):
+        first, second, third = (sale.pk for sale in self.sales)
+        self.assertEqual(self.ids({'ordering': '-sell_price'}), [first, third, second])
+        self.assertEqual(self.ids({'ordering': 'account,-product_code'}), [second, first, third])
+
+    def test_invalid_parameters(self):
+        for params in [{'brand': 'boss'}, {'start_date': '01/05/2023'}, {'ordering': 'customer_po'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
+
+    def test_pagination(self):
+        response = self.client.get(self.url, {'page_size': 2, 'ordering': 'sell_price'})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([row['sell_price'] for row in response.data['results']], ['10.00', '20.00'])
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(self.url, {'page': 2, 'page_size': 2, 'ordering': 'sell_price'})
+        self.assertEqual([row['sell_price'] for row in response.data['results']], ['30.00'])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(self.client.get(self.url, {'page': 3, 'page_size': 2}).status_code, 404)
+
+    def test_columnar_format(self):
+        response = self.client.get(self.url, {'format': 'columnar', 'page_size': 2, 'ordering': 'id'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = json.loads(response.content)
+        self.assertEqual((data['count'], data['length']), (3, 2))
+        self.assertEqual(data['columns']['id'], [sale.pk for sale in self.sales[:2]])
+        # Decimals serialized as strings are sent as numbers, strings as a dictionary and indices
+        self.assertEqual(data['columns']['sell_price'], [30, 10])
+        self.assertEqual(data['columns']['brand'], {'dictionary': ['Boss', 'Grace'], 'indices': [0, 1]})
+        self.assertEqual(data['columns']['root_accounts'], {'dictionary': ['Atrium'], 'indices': [[0], [0]]})
+
+    @skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_arrow_format(self):
+        response = self.client.get(self.url, {'format': 'arrow', 'ordering': 'id'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.arrow.stream')
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.column('id').to_pylist(), [sale.pk for sale in self.sales])
+        self.assertEqual(table.column('sell_price').to_pylist(), [30.0, 10.0, 20.0])
+        self.assertEqual(table.column('account').to_pylist(), ['Duke Hospital', 'Duke Hospital', 'Wake Med'])
+
+
+class RendererTests(SimpleTestCase):
+    """The columnar encodings of rows and pages of rows."""
+    rows = [
+        {'id': 1, 'price': '10.50', 'brand': 'Boss', 'tags': ['a', 'b'], 'active': True, 'note': None},
+        {'id': 2, 'price': None, 'brand': 'Boss', 'tags': [], 'active': False, 'note': None},
+        {'id': 3, 'price': '7', 'brand': None, 'tags': ['b'], 'active': None, 'note': None},
+    ]
+    context = {'view': type('View', (), {'numeric_columns': ['price']})()}
+
+    def test_encode_column(self):
+        self.assertEqual(encode_column([1, Decimal('2.5'), None]), [1, 2.5, None])
+        self.assertEqual(encode_column(['x', 'y', 'x', None]), {'dictionary': ['x', 'y'], 'indices': [0, 1, 0, None]})
+        self.assertEqual(encode_column([True, None]), [True, None])
+
+    def test_columnar_rows(self):
+        data = json.loads(ColumnarRenderer().render(self.rows, renderer_context=self.context))
+        self.assertEqual(data, {'length': 3, 'columns': {
+            'id': [1, 2, 3],
+            'price': [10.5, None, 7],
+            'brand': {'dictionary': ['Boss'], 'indices': [0, 0, None]},
+            'tags': {'dictionary': ['a', 'b'], 'indices': [[0, 1], [], [1]]},
+            'active': [True, False, None],
+            'note': [None, None, None],
+        }})
+
+    def test_columnar_page_and_errors(self):
+        page = {'count': 10, 'next': 'http://localhost/?page=2', 'previous': None, 'results': self.rows[:1]}
+        data = json.loads(ColumnarRenderer().render(page, renderer_context=self.context))
+        self.assertEqual((data['count'], data['next'], data['length']), (10, 'http://localhost/?page=2', 1))
+
+        # Data other than rows is rendered as JSON
+        self.assertEqual(json.loads(ColumnarRenderer().render({'error': 'bad'})), {'error': 'bad'})
+
+    @skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_arrow(self):
+        page = {'count': 10, 'next': None, 'previous': None, 'results': self.rows}
+        table = pyarrow.ipc.open_stream(ArrowRenderer().render(page, renderer_context=self.context)).read_all()
+
+        self.assertEqual(table.schema.metadata, {b'count': b'10'})
+        self.assertEqual(table.column('price').to_pylist(), [10.5, None, 7.0])
+        self.assertEqual(table.column('brand').type, pyarrow.dictionary(pyarrow.int32(), pyarrow.string()))
+        self.assertEqual(table.column('brand').to_pylist(), ['Boss', 'Boss', None])
+        self.assertEqual(table.column('tags').to_pylist(), [['a', 'b'], [], ['b']])
+        self.assertEqual(table.column('active').to_pylist(), [True, False, None])
+
+    @skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_arrow_error(self):
+        table = pyarrow.ipc.open_stream(ArrowRenderer().render({'error': 'bad'})).read_all()
+        self.assertEqual(table.to_pylist(), [{'error': 'bad'}])
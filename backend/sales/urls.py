@@ -10,9 +10,11 @@ from .category_views import (
 )
 from .analysis_view import AnalysisView  
 from .sales_report_view import SalesReportView
+from .import_views import ImportJobListCreateView, ImportJobDetailView
 from .dashboard_view import (
     GrossSalesYearlyYTDView, TopTenBranchAccountsYTDView, 
-    TopTenSalesRepYTDView, TopBrandsYTDView, MonthlySalesBySalesRepView
+    TopTenSalesRepYTDView, TopBrandsYTDView, MonthlySalesBySalesRepView,
+    DashboardSummaryView,
 )
 
 urlpatterns = [
@@ -47,4 +49,11 @@ urlpatterns = [
 
     # New Monthly Sales by Sales Rep URL
     path('dashboard/monthly-sales-by-sales-rep/', MonthlySalesBySalesRepView.as_view(), name='monthly-sales-by-sales-rep'),
+
+    # Every dashboard widget in one response
+    path('dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
+
+    # Import job URLs (uploads processed by the run_import_worker command)
+    path('imports/', ImportJobListCreateView.as_view(), name='import-job-list-create'),
+    path('imports/<int:pk>/', ImportJobDetailView.as_view(), name='import-job-detail'),
 ]
@@ -1,12 +1,12 @@
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Sum, F
-from django.db.models.functions import TruncMonth
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
-from .models import Product, Invoice, Sale
+from .models import Product, Invoice, Sale, MonthlySales
 from .serializers import ProductSerializer, InvoiceSerializer, SaleSerializer
+from .response_cache import cached_response
 from accounts.models import Account
 from django.conf import settings
 
@@ -48,25 +48,23 @@ class SaleDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # Monthly sales grouped by brand
 class MonthlySalesByBrandView(APIView):
+    @cached_response
     def get(self, request, *args, **kwargs):
-        # Filter sales with valid sell_price, invoice, and product brand
-        sales_by_brand = Sale.objects.filter(
-            sell_price__isnull=False, 
-            invoice__invoice_date__isnull=False, 
-            product__brand__isnull=False
-        ).annotate(
-            month=TruncMonth('invoice__invoice_date')
+        # Monthly sales facts of dated sales of branded products
+        sales_by_brand = MonthlySales.objects.filter(
+            month__isnull=False,
+            brand__isnull=False
         ).values(
-            'month', 'product__brand__name'
+            'month', 'brand__name'
         ).annotate(
-            total_sales=Sum('sell_price')
-        ).order_by('month', 'product__brand__name')
+            total_sales=Sum('amount')
+        ).order_by('month', 'brand__name')
 
         # Format the response data
         result = {}
         for sale in sales_by_brand:
             month = sale['month'].strftime('%Y-%m')
-            brand_name = sale['product__brand__name']
+            brand_name = sale['brand__name']
             total_sales = sale['total_sales']
 
             # Build the monthly sales data grouped by brand
@@ -82,28 +80,30 @@ class MonthlySalesByBrandView(APIView):
 
 # View for retrieving top products and top accounts
 class TopProductsView(APIView):
+    @cached_response
     def get(self, request):
-        current_date = timezone.now()
-        one_year_ago = current_date - timedelta(days=365)
-        two_years_ago = current_date - timedelta(days=730)
+        # The facts are monthly, so the periods start on the first of the month a year (two years) ago
+        current_date = timezone.now().date()
+        one_year_ago = (current_date - timedelta(days=365)).replace(day=1)
+        two_years_ago = (current_date - timedelta(days=730)).replace(day=1)
 
         # Top products for the last 12 months
-        top_products = Sale.objects.filter(
-            invoice__invoice_date__gte=one_year_ago
+        top_products = MonthlySales.objects.filter(
+            month__gte=one_year_ago
         ).values(
             'product__product_code', 'product__product_description'
         ).annotate(
-            total_sales=Sum(F('sell_price') * F('quantity_invoiced'))
-        )
+            total_sales=Sum('revenue')
+        ).order_by('-total_sales')[:10]
 
         # Previous year's product sales
-        previous_sales = Sale.objects.filter(
-            invoice__invoice_date__gte=two_years_ago, 
-            invoice__invoice_date__lt=one_year_ago
+        previous_sales = MonthlySales.objects.filter(
+            month__gte=two_years_ago,
+            month__lt=one_year_ago
         ).values(
             'product__product_code'
         ).annotate(
-            previous_total_sales=Sum(F('sell_price') * F('quantity_invoiced'))
+            previous_total_sales=Sum('revenue')
         )
 
         # Mapping previous sales by product code for easy lookup
@@ -120,46 +120,45 @@ class TopProductsView(APIView):
             product['total_sales'] = product['total_sales'] or 0
             product_data.append(product)
 
-        # Sort and limit the products to top 10
-        product_data = sorted(product_data, key=lambda x: x['total_sales'], reverse=True)[:10]
-
         # Top accounts for the last 12 months
-        top_accounts = Sale.objects.filter(
-            invoice__invoice_date__gte=one_year_ago
+        top_accounts = MonthlySales.objects.filter(
+            month__gte=one_year_ago
         ).values(
-            'customer__name', 'customer__logo', 
-            'customer__sales_rep__user__first_name', 
-            'customer__sales_rep__user__last_name'
+            'account__name', 'account__logo', 
+            'account__sales_rep__user__first_name', 
+            'account__sales_rep__user__last_name'
         ).annotate(
-            total_sales=Sum(F('sell_price') * F('quantity_invoiced'))
-        )
+            total_sales=Sum('revenue')
+        ).order_by('-total_sales')[:10]
 
         # Previous year's account sales
-        previous_account_sales = Sale.objects.filter(
-            invoice__invoice_date__gte=two_years_ago, 
-            invoice__invoice_date__lt=one_year_ago
+        previous_account_sales = MonthlySales.objects.filter(
+            month__gte=two_years_ago,
+            month__lt=one_year_ago
         ).values(
-            'customer__name'
+            'account__name'
         ).annotate(
-            previous_total_sales=Sum(F('sell_price') * F('quantity_invoiced'))
+            previous_total_sales=Sum('revenue')
         )
 
         # Mapping previous sales by customer name for easy lookup
         previous_account_sales_dict = {
-            sale['customer__name']: sale['previous_total_sales'] 
+            sale['account__name']: sale['previous_total_sales'] 
             for sale in previous_account_sales
         }
 
         # Adding previous total sales and sales_rep name to the top accounts
         account_data = []
         for account in top_accounts:
-            customer_name = account['customer__name']
+            # The response keeps the customer__ keys it had when read from the sales
+            customer_name = account['customer__name'] = account.pop('account__name')
+            account['customer__logo'] = account.pop('account__logo')
             account['total_sales'] = account['total_sales'] or 0
             account['previous_total_sales'] = previous_account_sales_dict.get(customer_name, 0)
 
             # Handle the sales_rep field
-            first_name = account.pop('customer__sales_rep__user__first_name', '')
-            last_name = account.pop('customer__sales_rep__user__last_name', '')
+            first_name = account.pop('account__sales_rep__user__first_name', '')
+            last_name = account.pop('account__sales_rep__user__last_name', '')
             account['sales_rep'] = f"{first_name} {last_name}".strip() if first_name or last_name else "Unknown"
 
             # Construct the full URL for the logo
@@ -168,9 +167,6 @@ class TopProductsView(APIView):
 
             account_data.append(account)
 
-        # Sort and limit the accounts to top 10
-        account_data = sorted(account_data, key=lambda x: x['total_sales'], reverse=True)[:10]
-
         return Response({
             'top_products': product_data,
             'top_accounts': account_data